@@ -0,0 +1,57 @@
+from typing import Any, Callable, Dict, Optional
+from agents import FunctionTool
+
+class AgentRegistry:
+    """Process-wide cache of specialist agents, their function tools and as_tool() wrappers.
+
+    Agents are built lazily on first use. Tools are keyed by the wrapped function, so a
+    function used by several agents (check_inventory_levels) is wrapped and has its JSON
+    schema derived exactly once.
+    """
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._agents: Dict[str, Any] = {}
+        self._agent_tools: Dict[str, Any] = {}
+        self._function_tools: Dict[Callable, FunctionTool] = {}
+
+    def register(self, domain: str, factory: Callable[[], Any]):
+        self._factories[domain] = factory
+        self._agents.pop(domain, None)
+        self._agent_tools.pop(domain, None)
+
+    def function_tool(self, function: Callable, description: str) -> FunctionTool:
+        """Return the shared FunctionTool for a function, creating it on first use"""
+        tool = self._function_tools.get(function)
+        if tool is None:
+            tool = FunctionTool(function=function, description=description)
+            self._function_tools[function] = tool
+        return tool
+
+    def get(self, domain: str) -> Any:
+        agent = self._agents.get(domain)
+        if agent is None:
+            agent = self._factories[domain]()
+            self._agents[domain] = agent
+        return agent
+
+    def as_tool(self, domain: str) -> Any:
+        tool = self._agent_tools.get(domain)
+        if tool is None:
+            tool = self.get(domain).as_tool()
+            self._agent_tools[domain] = tool
+        return tool
+
+    def specialists(self) -> Dict[str, Any]:
+        return {domain: self.get(domain) for domain in self._factories}
+
+    def clear(self, domain: Optional[str] = None):
+        """Drop cached agents and tools so they are rebuilt on next use"""
+        if domain is not None:
+            self._agents.pop(domain, None)
+            self._agent_tools.pop(domain, None)
+            return
+        self._agents.clear()
+        self._agent_tools.clear()
+        self._function_tools.clear()
+
+registry = AgentRegistry()
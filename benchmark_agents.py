@@ -0,0 +1,29 @@
+import sys
+import time
+from agent_registry import registry
+from erp_agents import create_coordinator_agent
+
+def time_builds(iterations: int, cold: bool) -> float:
+    """Average seconds per create_coordinator_agent() call"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        if cold:
+            # Same work as before the registry: new agents, tools and schemas every time
+            registry.clear()
+        create_coordinator_agent()
+    return (time.perf_counter() - start) / iterations
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    print(f"=== Coordinator build time ({iterations} builds) ===")
+    cold = time_builds(iterations, cold=True)
+    print(f"Without registry (rebuild everything): {cold * 1000:.3f} ms per build")
+
+    registry.clear()
+    create_coordinator_agent()
+    warm = time_builds(iterations, cold=False)
+    print(f"With registry (shared agents and tools): {warm * 1000:.3f} ms per build")
+
+    if warm > 0:
+        print(f"Speedup: {cold / warm:.1f}x")
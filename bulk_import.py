@@ -0,0 +1,479 @@
+"""Bulk import of ledger, inventory and employee data from CSV or JSONL files.
+
+    python bulk_import.py transactions ledger_2025_12.csv
+    python bulk_import.py inventory stock_take.jsonl
+    python bulk_import.py employees staff.csv --rejects staff_rejects.jsonl
+
+Rows are validated in batches against FinancialTransaction, InventoryItem or EmployeeRecord,
+loaded into a staging table with COPY and merged into the ERP tables in one transaction per
+batch, while the next batch is parsed and validated. Rows that fail validation, refer to
+unknown accounts, products, warehouses, departments or positions, fall in a closed financial
+period or repeat an existing transaction are written with the reason to a rejects file
+(<input>.rejects.jsonl by default) instead of stopping the import.
+
+- transactions: FinancialTransaction fields; amounts also update the cached account balance
+- inventory: InventoryItem fields; sets counted stock levels (warehouse_id defaults to
+  ERP_DEFAULT_WAREHOUSE); products must already exist
+- employees: EmployeeRecord fields, department and position by ID or name, plus optional
+  email, phone, address and hire_date columns; existing employees are updated
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from itertools import islice
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Type
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from database import DatabaseBackend, close_database, get_database, is_unique_violation
+from load_env import get_env
+from models import EmployeeRecord, FinancialTransaction, InventoryItem
+from query_catalog import query_catalog
+from repository import DEFAULT_WAREHOUSE, TRANSACTION_ID_TABLES, as_date, money
+
+IMPORT_BATCH_SIZE = int(get_env("ERP_IMPORT_BATCH_SIZE", "20000"))
+# Processes validating batches in parallel; 1 validates on a thread of the importing process
+IMPORT_WORKERS = int(get_env("ERP_IMPORT_WORKERS", str(os.cpu_count() or 1)))
+
+class RowRejected(Exception):
+    """A valid record the ERP tables cannot take, e.g. one for an unknown account"""
+
+class ImportSpec:
+    """How one kind of record is checked, staged and merged into its tables"""
+    model: Type[BaseModel]
+    table: str
+    columns: Tuple[str, ...]
+    key_size = 1
+    writes: Tuple[str, ...] = ()
+
+    async def load_references(self, db: DatabaseBackend):
+        """Read the reference data to_record() checks rows against"""
+
+    def to_record(self, item: BaseModel, raw: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Staging row for a validated item, in column order; the first key_size values identify it"""
+        raise NotImplementedError
+
+    def duplicates_sql(self, stage: str) -> Optional[str]:
+        """Statement deleting staged rows that already exist, returning their key columns"""
+        return None
+
+    def merge_sql(self, stage: str) -> List[str]:
+        raise NotImplementedError
+
+class TransactionImport(ImportSpec):
+    model = FinancialTransaction
+    table = "transactions"
+    columns = ("transaction_id", "account_id", "amount", "transaction_type", "description", "transaction_date")
+    writes = ("transactions", "accounts")
+
+    async def load_references(self, db: DatabaseBackend):
+        rows = await db.fetch(
+            """SELECT a.account_id, MAX(s.as_of_date) AS closed_through
+FROM accounts a LEFT JOIN account_balance_snapshots s ON s.account_id = a.account_id
+GROUP BY a.account_id"""
+        )
+        self.closed_through = {row["account_id"]: as_date(row["closed_through"]) for row in rows}
+        self.id_table = TRANSACTION_ID_TABLES[db.dialect]
+
+    def to_record(self, item: FinancialTransaction, raw: Dict[str, Any]) -> Tuple[Any, ...]:
+        amount = money(item.amount)
+        if not amount:
+            raise RowRejected("amount must not be 0")
+        try:
+            transaction_date = date.fromisoformat(item.date)
+        except ValueError:
+            raise RowRejected("date must be YYYY-MM-DD")
+        if item.account_code not in self.closed_through:
+            raise RowRejected(f"Account {item.account_code} not found")
+        closed = self.closed_through[item.account_code]
+        if closed is not None and transaction_date <= closed:
+            raise RowRejected(f"{item.date} falls in a closed financial period for {item.account_code}")
+        return (
+            item.transaction_id, item.account_code, amount,
+            "credit" if amount > 0 else "debit", item.description, transaction_date
+        )
+
+    def duplicates_sql(self, stage: str) -> Optional[str]:
+        return f"""DELETE FROM {stage}
+WHERE EXISTS (SELECT 1 FROM {self.id_table} t WHERE t.transaction_id = {stage}.transaction_id)
+RETURNING transaction_id"""
+
+    def merge_sql(self, stage: str) -> List[str]:
+        columns = ", ".join(self.columns)
+        return [
+            f"INSERT INTO transactions ({columns}) SELECT {columns} FROM {stage}",
+            f"""UPDATE accounts SET balance = accounts.balance + d.delta, updated_at = CURRENT_TIMESTAMP
+FROM (SELECT account_id, SUM(amount) AS delta FROM {stage} GROUP BY account_id) d
+WHERE accounts.account_id = d.account_id"""
+        ]
+
+class InventoryImport(ImportSpec):
+    model = InventoryItem
+    table = "inventory"
+    columns = ("product_id", "warehouse_id", "quantity", "reorder_point", "unit_cost", "last_count_date")
+    key_size = 2
+    writes = ("inventory",)
+
+    async def load_references(self, db: DatabaseBackend):
+        self.products = {row["product_id"] for row in await db.fetch("SELECT product_id FROM products")}
+        self.warehouses = {row["warehouse_id"] for row in await db.fetch("SELECT warehouse_id FROM warehouses")}
+        self.count_date = date.today()
+
+    def to_record(self, item: InventoryItem, raw: Dict[str, Any]) -> Tuple[Any, ...]:
+        warehouse_id = item.warehouse_id or DEFAULT_WAREHOUSE
+        if item.item_id not in self.products:
+            raise RowRejected(f"Product {item.item_id} not found")
+        if warehouse_id not in self.warehouses:
+            raise RowRejected(f"Warehouse {warehouse_id} not found")
+        if item.quantity < 0:
+            raise RowRejected("quantity must not be negative")
+        return (item.item_id, warehouse_id, item.quantity, item.reorder_point, money(item.unit_cost), self.count_date)
+
+    def merge_sql(self, stage: str) -> List[str]:
+        columns = ", ".join(self.columns)
+        # "WHERE true" keeps SQLite from reading ON CONFLICT as part of the SELECT. Rows are
+        # locked in the order the order pipeline and purchase receipts lock them in
+        return [
+            f"""INSERT INTO inventory ({columns}) SELECT {columns} FROM {stage} WHERE true
+ORDER BY product_id, warehouse_id
+ON CONFLICT (product_id, warehouse_id) DO UPDATE SET
+    quantity = excluded.quantity, reorder_point = excluded.reorder_point, unit_cost = excluded.unit_cost,
+    last_count_date = excluded.last_count_date, updated_at = CURRENT_TIMESTAMP"""
+        ]
+
+class EmployeeImport(ImportSpec):
+    model = EmployeeRecord
+    table = "employees"
+    columns = ("employee_id", "name", "email", "phone", "address", "department_id", "position_id", "salary", "hire_date")
+    writes = ("employees",)
+
+    async def load_references(self, db: DatabaseBackend):
+        self.departments: Dict[str, str] = {}
+        for row in await db.fetch("SELECT department_id, name FROM departments"):
+            self.departments[row["name"].lower()] = row["department_id"]
+            self.departments[row["department_id"]] = row["department_id"]
+        self.positions: Dict[Tuple[str, str], str] = {}
+        for row in await db.fetch("SELECT position_id, title, department_id FROM positions"):
+            self.positions[(row["department_id"], row["title"].lower())] = row["position_id"]
+            self.positions[(row["department_id"], row["position_id"])] = row["position_id"]
+        self.hire_date = date.today()
+
+    def to_record(self, item: EmployeeRecord, raw: Dict[str, Any]) -> Tuple[Any, ...]:
+        department_id = self.departments.get(item.department) or self.departments.get(item.department.lower())
+        if department_id is None:
+            raise RowRejected(f"Department {item.department} not found")
+        position_id = (
+            self.positions.get((department_id, item.position))
+            or self.positions.get((department_id, item.position.lower()))
+        )
+        if position_id is None:
+            raise RowRejected(f"Position {item.position} not found in department {department_id}")
+        try:
+            hire_date = date.fromisoformat(raw["hire_date"]) if raw.get("hire_date") else self.hire_date
+        except ValueError:
+            raise RowRejected("hire_date must be YYYY-MM-DD")
+        return (
+            item.employee_id, item.name, raw.get("email") or "", raw.get("phone") or None, raw.get("address") or None,
+            department_id, position_id, money(item.salary), hire_date
+        )
+
+    def merge_sql(self, stage: str) -> List[str]:
+        columns = ", ".join(self.columns)
+        return [
+            f"""INSERT INTO employees ({columns}) SELECT {columns} FROM {stage} WHERE true
+ON CONFLICT (employee_id) DO UPDATE SET
+    name = excluded.name, department_id = excluded.department_id, position_id = excluded.position_id,
+    salary = excluded.salary,
+    email = CASE WHEN excluded.email <> '' THEN excluded.email ELSE employees.email END,
+    phone = COALESCE(excluded.phone, employees.phone),
+    address = COALESCE(excluded.address, employees.address),
+    updated_at = CURRENT_TIMESTAMP"""
+        ]
+
+IMPORTS: Dict[str, Type[ImportSpec]] = {
+    "transactions": TransactionImport,
+    "inventory": InventoryImport,
+    "employees": EmployeeImport
+}
+
+_ADAPTERS: Dict[Type[BaseModel], TypeAdapter] = {}
+
+def _adapter(model: Type[BaseModel]) -> TypeAdapter:
+    if model not in _ADAPTERS:
+        _ADAPTERS[model] = TypeAdapter(List[model])
+    return _ADAPTERS[model]
+
+class RowReader:
+    """Reads a CSV or JSONL file in chunks of (line number, raw row) pairs.
+
+    CSV rows stay lists of strings and JSONL rows stay text until validate_chunk() turns
+    them into dicts, so that work happens wherever the chunk is validated.
+    """
+    def __init__(self, path: str, file_format: str):
+        self.file_format = file_format
+        self._file = open(path, "r", newline="", encoding="utf-8")
+        self.header: Optional[List[str]] = None
+        self._line = 0
+        if file_format == "csv":
+            self._csv = csv.reader(self._file)
+            self.header = next(self._csv, [])
+
+    def next_chunk(self, size: int) -> List[Tuple[int, Any]]:
+        chunk = []
+        if self.file_format == "csv":
+            for row in islice(self._csv, size):
+                chunk.append((self._csv.line_num, row))
+            return chunk
+        for text in self._file:
+            self._line += 1
+            if text.strip():
+                chunk.append((self._line, text))
+                if len(chunk) == size:
+                    break
+        return chunk
+
+    def close(self):
+        self._file.close()
+
+@dataclass
+class Batch:
+    records: List[Tuple[Any, ...]] = field(default_factory=list)
+    lines: List[int] = field(default_factory=list)
+    raws: List[Any] = field(default_factory=list)
+    rejects: List[Tuple[int, Any, str]] = field(default_factory=list)
+    rows_read: int = 0
+
+def validate_chunk(spec: ImportSpec, header: Optional[List[str]], chunk: List[Tuple[int, Any]]) -> Batch:
+    """Parse one chunk, validate it with a single pydantic call and turn it into staging records"""
+    batch = Batch(rows_read=len(chunk))
+    candidates = []
+    for line, row in chunk:
+        if header is not None:
+            candidates.append((line, dict(zip(header, row))))
+            continue
+        try:
+            raw = json.loads(row)
+        except json.JSONDecodeError:
+            raw = row.rstrip("\n")
+        if isinstance(raw, dict):
+            candidates.append((line, raw))
+        else:
+            batch.rejects.append((line, raw, "not a JSON object"))
+
+    adapter = _adapter(spec.model)
+    try:
+        items = adapter.validate_python([raw for _, raw in candidates])
+    except ValidationError as e:
+        errors: Dict[int, List[str]] = {}
+        for error in e.errors():
+            location = ".".join(str(part) for part in error["loc"][1:])
+            errors.setdefault(error["loc"][0], []).append(f"{location}: {error['msg']}")
+        for index, messages in errors.items():
+            line, raw = candidates[index]
+            batch.rejects.append((line, raw, "; ".join(messages)))
+        candidates = [candidate for index, candidate in enumerate(candidates) if index not in errors]
+        items = adapter.validate_python([raw for _, raw in candidates])
+
+    first_line: Dict[Tuple[Any, ...], int] = {}
+    for (line, raw), item in zip(candidates, items):
+        try:
+            record = spec.to_record(item, raw)
+        except RowRejected as e:
+            batch.rejects.append((line, raw, str(e)))
+            continue
+        key = record[:spec.key_size]
+        if key in first_line:
+            batch.rejects.append((line, raw, f"duplicate of line {first_line[key]}"))
+            continue
+        first_line[key] = line
+        batch.records.append(record)
+        batch.lines.append(line)
+        batch.raws.append(raw)
+    return batch
+
+# Validation worker processes get the spec, with its reference data, once at start-up
+_worker_spec: Optional[ImportSpec] = None
+
+def _init_worker(spec: ImportSpec):
+    global _worker_spec
+    _worker_spec = spec
+
+def _validate_in_worker(header: Optional[List[str]], chunk: List[Tuple[int, Any]]) -> Batch:
+    return validate_chunk(_worker_spec, header, chunk)
+
+@dataclass
+class ImportResult:
+    kind: str
+    rows_read: int = 0
+    imported: int = 0
+    rejected: int = 0
+    seconds: float = 0.0
+    rejects_path: Optional[str] = None
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.seconds if self.seconds else 0.0
+
+class BulkImporter:
+    """Reads, validates and loads one file, overlapping validation with database writes"""
+    def __init__(self, kind: str, path: str, rejects_path: Optional[str] = None,
+                 batch_size: int = IMPORT_BATCH_SIZE, file_format: Optional[str] = None,
+                 workers: int = IMPORT_WORKERS, database: Optional[DatabaseBackend] = None,
+                 progress: Optional[Callable[[ImportResult], None]] = None):
+        if kind not in IMPORTS:
+            raise ValueError(f"Unknown import kind {kind}, expected one of {', '.join(IMPORTS)}")
+        self.spec = IMPORTS[kind]()
+        self.path = path
+        self.rejects_path = rejects_path or f"{os.path.splitext(path)[0]}.rejects.jsonl"
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+        self.file_format = file_format or ("csv" if path.lower().endswith(".csv") else "jsonl")
+        self.database = database or get_database()
+        self.progress = progress
+        self.result = ImportResult(kind)
+        self._rejects_file = None
+
+    def _reject(self, line: int, raw: Any, reason: str):
+        if self._rejects_file is None:
+            self._rejects_file = open(self.rejects_path, "w", encoding="utf-8")
+            self.result.rejects_path = self.rejects_path
+        self._rejects_file.write(json.dumps({"line": line, "reason": reason, "row": raw}, default=str) + "\n")
+        self.result.rejected += 1
+
+    async def _write(self, batch: Batch):
+        try:
+            duplicates = await self._merge(batch)
+        except Exception as e:
+            if not is_unique_violation(e):
+                raise
+            # A concurrent write took one of the keys after the duplicate check; the retry
+            # finds it and rejects that row instead of failing the import
+            duplicates = await self._merge(batch)
+
+        spec = self.spec
+        for record, line, raw in zip(batch.records, batch.lines, batch.raws):
+            if tuple(str(value) for value in record[:spec.key_size]) in duplicates:
+                self._reject(line, raw, "already imported")
+        self.result.imported += len(batch.records) - len(duplicates)
+
+    async def _merge(self, batch: Batch) -> set:
+        """Stage a batch and merge it in one transaction, returning the keys of rows already present"""
+        spec = self.spec
+        stage = f"import_{spec.table}"
+        columns = ", ".join(spec.columns)
+        async with self.database.transaction() as db:
+            if db.dialect == "postgres":
+                await db.execute(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {columns} FROM {spec.table} WITH NO DATA")
+            else:
+                await db.execute(f"CREATE TEMP TABLE {stage} AS SELECT {columns} FROM {spec.table} WHERE 0")
+            await db.copy_records(stage, spec.columns, batch.records)
+
+            duplicates = set()
+            duplicates_sql = spec.duplicates_sql(stage)
+            if duplicates_sql:
+                for row in await db.fetch(duplicates_sql):
+                    duplicates.add(tuple(str(row[column]) for column in spec.columns[:spec.key_size]))
+            for sql in spec.merge_sql(stage):
+                await db.execute(sql)
+            if db.dialect != "postgres":
+                await db.execute(f"DROP TABLE temp.{stage}")
+        return duplicates
+
+    async def run(self) -> ImportResult:
+        start = time.perf_counter()
+        await self.spec.load_references(self.database)
+        reader = RowReader(self.path, self.file_format)
+        loop = asyncio.get_running_loop()
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self.spec,))
+
+        def validate(chunk: List[Tuple[int, Any]]) -> Awaitable[Batch]:
+            if executor is not None:
+                return loop.run_in_executor(executor, _validate_in_worker, reader.header, chunk)
+            return asyncio.to_thread(validate_chunk, self.spec, reader.header, chunk)
+
+        # Chunks are validated ahead (on worker processes, or a thread) while earlier ones are
+        # written; the bounded queue keeps memory to a few batches and the file order intact
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(2, self.workers + 1))
+
+        async def produce():
+            try:
+                while True:
+                    chunk = await asyncio.to_thread(reader.next_chunk, self.batch_size)
+                    if not chunk:
+                        await queue.put(None)
+                        return
+                    await queue.put(asyncio.ensure_future(validate(chunk)))
+            except Exception as e:
+                # Handed to the consumer, which re-raises it
+                await queue.put(e)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                pending = await queue.get()
+                if pending is None:
+                    break
+                if isinstance(pending, Exception):
+                    raise pending
+                batch = await pending
+                for line, raw, reason in batch.rejects:
+                    self._reject(line, raw, reason)
+                if batch.records:
+                    await self._write(batch)
+                self.result.rows_read += batch.rows_read
+                self.result.seconds = time.perf_counter() - start
+                if self.progress:
+                    self.progress(self.result)
+        finally:
+            producer.cancel()
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            reader.close()
+            if self._rejects_file is not None:
+                self._rejects_file.close()
+            query_catalog.invalidate_tables(*self.spec.writes)
+        self.result.seconds = time.perf_counter() - start
+        return self.result
+
+async def import_file(kind: str, path: str, **options) -> ImportResult:
+    """Import a CSV or JSONL file of transactions, inventory or employees"""
+    return await BulkImporter(kind, path, **options).run()
+
+def print_progress(result: ImportResult):
+    print(
+        f"\r{result.rows_read:,} rows read, {result.imported:,} imported, {result.rejected:,} rejected "
+        f"({result.rows_per_second:,.0f} rows/s)",
+        end="", flush=True
+    )
+
+async def main(args) -> int:
+    try:
+        result = await import_file(
+            args.kind, args.path, rejects_path=args.rejects, batch_size=args.batch_size,
+            file_format=args.format, workers=args.workers, progress=print_progress
+        )
+    finally:
+        await close_database()
+    print(f"\n✅ Imported {result.imported:,} of {result.rows_read:,} {args.kind} rows in {result.seconds:.1f} s")
+    if result.rejected:
+        print(f"❌ {result.rejected:,} rows rejected, see {result.rejects_path}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import ERP data from CSV or JSONL")
+    parser.add_argument("kind", choices=sorted(IMPORTS), help="kind of records in the file")
+    parser.add_argument("path", help="CSV or JSONL (.jsonl, .ndjson) file")
+    parser.add_argument("--rejects", help="where to write rejected rows (default: <path>.rejects.jsonl)")
+    parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="rows per validation and COPY batch")
+    parser.add_argument("--workers", type=int, default=IMPORT_WORKERS, help="validation processes (default: CPU count)")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="file format (default: from the extension)")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args)))
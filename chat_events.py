@@ -0,0 +1,262 @@
+"""Websocket message schema shared by the chat servers and their browser client.
+
+Every message the server sends is a JSON object with a "type", the "run_id" of the agent run
+it belongs to (null outside a run) and a "timestamp":
+
+- thinking: a run started; "agent" is the agent handling it
+- agent: the run moved to another agent (a handoff); "agent", "previous_agent"
+- delta: text the current agent just produced; "agent", "text"
+- tool_start / tool_end: a tool call began or returned; "agent", "tool", "call_id"
+- message: a complete chat message, "role" (user, assistant or system) and "content"; an
+  assistant or system message ends its run
+- job: background job progress, see job_queue.py
+
+Chat history holds the same message objects. Deltas are only forwarded once the agent's
+guardrails have passed (see GuardedStream), so the client can render them as they arrive.
+
+The client sends {"message": ..., "request_id": ...} to start a run, with the request ID
+becoming the run_id of everything the run sends back, and {"type": "cancel", "request_id": ...}
+to stop one. Each connection runs up to ERP_WS_MAX_INFLIGHT requests at once (see RequestTasks).
+A frame that is not one of these gets a system message back and the connection stays open.
+"""
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from typing import Any, Coroutine, Dict, Optional
+from load_env import get_env
+
+WS_MAX_INFLIGHT = int(get_env("ERP_WS_MAX_INFLIGHT", "3"))
+
+def new_run_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+def chat_event(event_type: str, run_id: Optional[str] = None, **fields: Any) -> Dict[str, Any]:
+    return {"type": event_type, "run_id": run_id, **fields, "timestamp": datetime.now().isoformat()}
+
+def chat_message(role: str, content: Any, run_id: Optional[str] = None) -> Dict[str, Any]:
+    return chat_event("message", run_id, role=role, content=content if isinstance(content, str) else str(content))
+
+def parse_client_frame(data: str) -> Dict[str, Any]:
+    """The "type", "request_id" and "message" of a client frame, or ValueError saying what is wrong"""
+    try:
+        frame = json.loads(data)
+    except ValueError:
+        raise ValueError("Messages must be JSON objects") from None
+    if not isinstance(frame, dict):
+        raise ValueError("Messages must be JSON objects")
+    request_id = frame.get("request_id")
+    if request_id is not None and (isinstance(request_id, bool) or not isinstance(request_id, (str, int))):
+        raise ValueError("request_id must be a string")
+    if frame.get("type") == "cancel":
+        if not request_id:
+            raise ValueError("A cancel needs the request_id of the request to stop")
+        return {"type": "cancel", "request_id": str(request_id), "message": None}
+    message = frame.get("message")
+    if not isinstance(message, str) or not message.strip():
+        raise ValueError("message must be non-empty text")
+    return {"type": "message", "request_id": str(request_id or new_run_id()), "message": message}
+
+def _field(item: Any, name: str) -> Any:
+    # Tool calls are SDK objects, tool outputs plain dicts
+    if isinstance(item, dict):
+        return item.get(name)
+    return getattr(item, name, None)
+
+class StreamTranslator:
+    """Turns the events of a streamed agent run into chat messages"""
+    def __init__(self, run_id: str, agent_name: str):
+        self.run_id = run_id
+        self.agent = agent_name
+        self._tools: Dict[str, Optional[str]] = {}
+
+    def translate(self, event: Any) -> Optional[Dict[str, Any]]:
+        """The chat message for one stream event, or None for events the client does not show"""
+        event_type = getattr(event, "type", None)
+        if event_type == "raw_response_event":
+            data = event.data
+            if getattr(data, "type", None) == "response.output_text.delta" and data.delta:
+                return chat_event("delta", self.run_id, agent=self.agent, text=data.delta)
+        elif event_type == "agent_updated_stream_event":
+            name = event.new_agent.name
+            if name != self.agent:
+                previous, self.agent = self.agent, name
+                return chat_event("agent", self.run_id, agent=name, previous_agent=previous)
+        elif event_type == "run_item_stream_event":
+            item = event.item
+            if item.type == "tool_call_item":
+                call_id, tool = _field(item.raw_item, "call_id"), _field(item.raw_item, "name")
+                self._tools[call_id] = tool
+                return chat_event("tool_start", self.run_id, agent=self.agent, tool=tool, call_id=call_id)
+            if item.type == "tool_call_output_item":
+                call_id = _field(item.raw_item, "call_id")
+                return chat_event("tool_end", self.run_id, agent=self.agent, tool=self._tools.pop(call_id, None), call_id=call_id)
+        return None
+
+class RequestTasks:
+    """The in-flight agent runs of one websocket connection, by request ID"""
+    def __init__(self, limit: int = WS_MAX_INFLIGHT):
+        self.limit = limit
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start(self, request_id: str, run: Coroutine[Any, Any, Any]) -> Optional[str]:
+        """Run a request in its own task, or return why it cannot start"""
+        if request_id in self._tasks:
+            run.close()
+            return f"Request {request_id} is already running"
+        if len(self._tasks) >= self.limit:
+            run.close()
+            return f"At most {self.limit} requests can run at once; wait for one to finish or cancel it"
+        task = asyncio.ensure_future(run)
+        self._tasks[request_id] = task
+        task.add_done_callback(lambda done: self._finished(request_id, done))
+        return None
+
+    def _finished(self, request_id: str, task: asyncio.Task):
+        self._tasks.pop(request_id, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Typically the socket closing under a run; the reader handles the disconnect
+            print(f"Request {request_id} ended with {type(task.exception()).__name__}: {task.exception()}")
+
+    def cancel(self, request_id: str) -> bool:
+        task = self._tasks.get(request_id)
+        if task is None:
+            return False
+        return task.cancel()
+
+    async def cancel_all(self):
+        """Cancel every run and wait for them to stop, e.g. when the client disconnects"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+# Renders the messages above; included in the embedded index.html of both chat servers
+CLIENT_SCRIPT = """
+        // Every message sent gets a request ID, which the server uses as the run_id of its replies
+        function newRequestId() {
+            return 'req_' + Math.random().toString(36).substring(2, 10);
+        }
+
+        function cancelRequest(requestId) {
+            socket.send(JSON.stringify({type: 'cancel', request_id: requestId}));
+        }
+
+        // One bubble per run fills in as text arrives; tool calls show as lines above it
+        function createMessageDiv(className, id) {
+            const div = document.createElement('div');
+            div.className = className;
+            if (id) {
+                div.id = id;
+            }
+            document.getElementById('messages').appendChild(div);
+            return div;
+        }
+
+        function setTimestamp(div, value) {
+            const timestamp = document.createElement('div');
+            timestamp.className = 'timestamp';
+            timestamp.textContent = new Date(value).toLocaleTimeString();
+            div.appendChild(timestamp);
+        }
+
+        function appendChatMessage(message) {
+            const roleClass = message.role === 'user' ? 'user-message'
+                : message.role === 'assistant' ? 'assistant-message' : 'system-message';
+            // The final answer replaces the text streamed for its run
+            let div = message.run_id && message.role === 'assistant'
+                ? document.getElementById(`run-${message.run_id}`) : null;
+            if (!div) {
+                div = createMessageDiv(`message ${roleClass}`);
+            }
+            div.classList.remove('streaming');
+            div.removeAttribute('id');
+            div.textContent = message.content;
+            setTimestamp(div, message.timestamp);
+        }
+
+        function renderChatEvent(data) {
+            if (data.type === 'job') {
+                // Background job events update one line per job in place
+                const jobDiv = document.getElementById(`job-${data.job_id}`)
+                    || createMessageDiv('message job-message', `job-${data.job_id}`);
+                const percent = Math.round(data.progress * 100);
+                jobDiv.textContent = `Job ${data.job_id} (${data.kind}): ${data.status}, ${percent}% - ${data.error || data.message}`;
+                scrollToBottom();
+                return;
+            }
+            if (data.type === 'thinking') {
+                // Stays above the run's output, with its cancel button, until the run ends
+                const thinkingDiv = createMessageDiv('message thinking', `thinking-${data.run_id}`);
+                thinkingDiv.textContent = `${data.agent} is working... `;
+                const cancelButton = document.createElement('button');
+                cancelButton.className = 'cancel-button';
+                cancelButton.textContent = 'Cancel';
+                cancelButton.onclick = () => cancelRequest(data.run_id);
+                thinkingDiv.appendChild(cancelButton);
+                scrollToBottom();
+                return;
+            }
+
+            if (data.type === 'message') {
+                const thinkingIndicator = document.getElementById(`thinking-${data.run_id}`);
+                if (thinkingIndicator) {
+                    thinkingIndicator.remove();
+                }
+            }
+            if (data.type === 'delta') {
+                const runDiv = document.getElementById(`run-${data.run_id}`)
+                    || createMessageDiv('message assistant-message streaming', `run-${data.run_id}`);
+                runDiv.textContent += data.text;
+            } else if (data.type === 'tool_start') {
+                createMessageDiv('message tool-message', `tool-${data.call_id}`).textContent = `${data.agent}: running ${data.tool}...`;
+            } else if (data.type === 'tool_end') {
+                const toolDiv = document.getElementById(`tool-${data.call_id}`);
+                if (toolDiv) {
+                    toolDiv.textContent = `${data.agent}: ${data.tool} done`;
+                    toolDiv.removeAttribute('id');
+                }
+            } else if (data.type === 'agent') {
+                createMessageDiv('message tool-message').textContent = `Handed off to ${data.agent}`;
+            } else if (data.type === 'message') {
+                if (data.role !== 'assistant') {
+                    // A failed or blocked run keeps what it streamed, but no longer as the live bubble
+                    const runDiv = document.getElementById(`run-${data.run_id}`);
+                    if (runDiv) {
+                        runDiv.classList.remove('streaming');
+                        runDiv.removeAttribute('id');
+                    }
+                }
+                appendChatMessage(data);
+            }
+            scrollToBottom();
+        }
+"""
+
+# Styles for the streamed bubble and the tool and job lines
+CLIENT_STYLES = """
+        .streaming {
+            opacity: 0.85;
+        }
+        .tool-message, .job-message {
+            align-self: flex-start;
+            font-size: 0.8rem;
+            color: #555;
+        }
+        .tool-message {
+            padding: 0.2rem 1rem;
+        }
+        .cancel-button {
+            border: none;
+            background: none;
+            color: #1a73e8;
+            cursor: pointer;
+            font-style: normal;
+        }
+        .job-message {
+            background-color: #e8f5e9;
+        }
+"""
@@ -1,18 +1,32 @@
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from typing import List, Dict, Optional, Any
 import asyncio
 import json
+from contextlib import aclosing
 import os
 import uvicorn
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
 from agents import Runner
 from agents import create_coordinator_agent
-from mcp_integration import setup_mcp_tools
+from erp_agents import create_specialist_agents
+from intent_router import create_intent_router
+from mcp_integration import start_mcp_tools, shutdown_mcp_tools
+from mcp_session_manager import mcp_manager
 from load_env import load_env_file, check_required_vars, get_env
+from guardrail_runner import guardrail_runner, GuardedStream, GuardrailTripped
+from chat_events import (
+    CLIENT_SCRIPT, CLIENT_STYLES, RequestTasks, StreamTranslator, chat_event, chat_message, parse_client_frame
+)
+from database import get_database, close_database
+from financial_reports import REPORT_TYPES, report_engine
+from job_queue import JOB_STATUSES, current_user, job_queue
+from query_catalog import query_catalog
+from repository import RepositoryError, repository
 
 # Load environment variables
 load_env_file()
@@ -55,19 +69,24 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
-# Setup ERP agent coordinator
-async def get_coordinator_agent():
-    # Set up MCP tools for database integration
-    try:
-        mcp_tools = await setup_mcp_tools()
-        print(f"Successfully set up {len(mcp_tools)} MCP tools")
-    except Exception as e:
-        print(f"Warning: Error setting up MCP tools: {e}")
-        mcp_tools = []
-    
-    # Create the coordinator agent
-    coordinator = create_coordinator_agent(mcp_tools)
-    return coordinator
+# Push background job progress to the user who started the job
+async def send_job_event(user_id: str, event: Dict[str, Any]):
+    await manager.send_message(json.dumps(event), user_id)
+
+# Rebuild the coordinator with every MCP tool set available so far
+def attach_mcp_tools(server_name: str, tools: Optional[list], live: bool):
+    if live:
+        app.state.mcp_live.add(server_name)
+    if tools is None:
+        # The live server matches its cached manifest, the attached tools stay as they are
+        return
+    app.state.mcp_tools[server_name] = tools
+    mcp_tools = [tool for tool_set in app.state.mcp_tools.values() for tool in tool_set]
+    app.state.coordinator = create_coordinator_agent(mcp_tools)
+    if app.state.router:
+        app.state.router.fallback_agent = app.state.coordinator
+    source = "server" if live else "manifest cache"
+    print(f"Attached {len(tools)} MCP tools from '{server_name}' ({source})")
 
 # Initialize agent on startup
 @app.on_event("startup")
@@ -77,72 +96,135 @@ async def startup_event():
     if not check_required_vars(required_vars):
         raise Exception("Missing required environment variables")
     
-    # Initialize coordinator agent
-    app.state.coordinator = await get_coordinator_agent()
+    # Serve traffic with the local function tools right away
+    app.state.coordinator = create_coordinator_agent()
     app.state.runner = Runner()
+    app.state.mcp_tools = {}
+    app.state.mcp_live = set()
+    
+    # Clear single-domain requests skip the coordinator's routing turn
+    app.state.router = None
+    if get_env("ERP_ROUTER_ENABLED", "true").lower() == "true":
+        app.state.router = create_intent_router(app.state.coordinator, create_specialist_agents())
+    
+    # MCP servers start concurrently and attach their tools as each one comes up
+    app.state.mcp_startup = start_mcp_tools(attach_mcp_tools)
+    
+    # Payroll runs, long reports and order batches run in worker processes
+    await job_queue.start(send_job_event)
+
+# Close pooled MCP sessions and database connections on shutdown
+@app.on_event("shutdown")
+async def shutdown_event():
+    for task in app.state.mcp_startup:
+        task.cancel()
+    await asyncio.gather(*app.state.mcp_startup, return_exceptions=True)
+    await shutdown_mcp_tools()
+    await job_queue.close()
+    await close_database()
+
+# Readiness of the local tools and each MCP tool set
+@app.get("/ready")
+async def get_readiness():
+    tool_sets = {"local": "ready"}
+    for server_name, status in mcp_manager.status().items():
+        if server_name in app.state.mcp_live:
+            tool_sets[server_name] = "ready"
+        elif server_name in app.state.mcp_tools and status != "failed":
+            # Tools attached from the manifest cache, calls wait for the server
+            tool_sets[server_name] = "cached"
+        else:
+            tool_sets[server_name] = "starting" if status == "ready" else status
+    return {"ready": True, "tool_sets": tool_sets}
+
+# One chat request: stream the agent run to the user and record its outcome
+async def run_chat_request(user_id: str, request_id: str, text: str):
+    try:
+        # Pick the specialist directly when the request is unambiguous
+        agent = app.state.coordinator
+        if app.state.router:
+            agent = app.state.router.route(text).agent
+        
+        # Send "thinking" message to indicate processing
+        await manager.send_message(json.dumps(chat_event("thinking", request_id, agent=agent.name)), user_id)
+        
+        # Stream the run as it happens, guardrails overlap the first model turn where allowed
+        stream = GuardedStream(app.state.runner, agent, text)
+        translator = StreamTranslator(request_id, agent.name)
+        async with aclosing(stream.stream_events()) as events:
+            async for event in events:
+                update = translator.translate(event)
+                if update:
+                    await manager.send_message(json.dumps(update), user_id)
+        
+        # Store and send the complete agent response
+        assistant_message = chat_message("assistant", stream.final_output, request_id)
+        chat_histories[user_id].append(assistant_message)
+        await manager.send_message(json.dumps(assistant_message), user_id)
+    except asyncio.CancelledError:
+        # Cancelled by the user, or by their disconnect; closing the stream stopped the run
+        cancelled_message = chat_message("system", "Request cancelled", request_id)
+        chat_histories[user_id].append(cancelled_message)
+        await manager.send_message(json.dumps(cancelled_message), user_id)
+        raise
+    except GuardrailTripped as e:
+        # The run was blocked before anything was shown to the user
+        guardrail_message = chat_message("system", e.message or str(e), request_id)
+        chat_histories[user_id].append(guardrail_message)
+        await manager.send_message(json.dumps(guardrail_message), user_id)
+    except Exception as e:
+        # Handle errors in agent processing
+        error_message = chat_message("system", f"Error processing request: {str(e)}", request_id)
+        chat_histories[user_id].append(error_message)
+        await manager.send_message(json.dumps(error_message), user_id)
 
 # WebSocket endpoint for chat
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
     await manager.connect(websocket, user_id)
+    # Jobs started by tool calls in this conversation report back to this user
+    current_user.set(user_id)
     
     # Initialize chat history for this user if it doesn't exist
     if user_id not in chat_histories:
         chat_histories[user_id] = []
     
+    # Requests run in their own tasks, so frames keep being read while agents work
+    requests = RequestTasks()
     try:
         while True:
             # Receive message from websocket
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            try:
+                frame = parse_client_frame(data)
+            except ValueError as e:
+                # A bad frame is answered, not fatal: the connection and its runs carry on
+                await manager.send_message(json.dumps(chat_message("system", str(e))), user_id)
+                continue
+            request_id = frame["request_id"]
             
-            # Store user message in history
-            timestamp = datetime.now().isoformat()
-            user_message = {
-                "role": "user",
-                "content": message_data["message"],
-                "timestamp": timestamp
-            }
-            chat_histories[user_id].append(user_message)
+            if frame["type"] == "cancel":
+                requests.cancel(request_id)
+                continue
             
-            # Process message with ERP agent
-            try:
-                # Send "thinking" message to indicate processing
-                await manager.send_message(
-                    json.dumps({"status": "thinking", "timestamp": timestamp}),
-                    user_id
-                )
-                
-                # Process with agent
-                result = await app.state.runner.run(
-                    app.state.coordinator, 
-                    message_data["message"]
-                )
-                
-                # Store and send agent response
-                assistant_message = {
-                    "role": "assistant",
-                    "content": result.final_output,
-                    "timestamp": datetime.now().isoformat()
-                }
-                chat_histories[user_id].append(assistant_message)
-                
-                await manager.send_message(
-                    json.dumps(assistant_message),
-                    user_id
-                )
-            except Exception as e:
-                # Handle errors in agent processing
-                error_message = {
-                    "role": "system",
-                    "content": f"Error processing request: {str(e)}",
-                    "timestamp": datetime.now().isoformat()
-                }
-                chat_histories[user_id].append(error_message)
-                await manager.send_message(json.dumps(error_message), user_id)
+            # Process message with ERP agent, unless it repeats a running request or the
+            # connection is at its limit; refused messages stay out of the history
+            refused = requests.start(request_id, run_chat_request(user_id, request_id, frame["message"]))
+            if refused:
+                await manager.send_message(json.dumps(chat_message("system", refused, request_id)), user_id)
+                continue
+            
+            # Store user message in history; the run's task has not started yet, so it comes first
+            user_message = chat_message("user", frame["message"], request_id)
+            chat_histories[user_id].append(user_message)
     
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Whatever ended the loop, the connection is gone
         manager.disconnect(user_id)
+        # Abandoned runs stop using model, MCP and database capacity
+        await requests.cancel_all()
 
 # REST API endpoints for chat history
 @app.get("/chat_history/{user_id}")
@@ -151,6 +233,58 @@ async def get_chat_history(user_id: str):
         return {"messages": []}
     return {"messages": chat_histories[user_id]}
 
+# Guardrail verdict cache counters
+@app.get("/metrics/guardrails")
+async def get_guardrail_metrics():
+    return guardrail_runner.stats()
+
+# Local intent routing confidence and fallback rate
+@app.get("/metrics/routing")
+async def get_routing_metrics():
+    if not app.state.router:
+        return {"enabled": False}
+    return {"enabled": True, **app.state.router.metrics()}
+
+# Database connection pool usage, query cache and lookup batching counters
+@app.get("/metrics/database")
+async def get_database_metrics():
+    return {
+        "pool": get_database().stats(),
+        "query_cache": query_catalog.stats(),
+        "loaders": repository.loader_stats()
+    }
+
+# Financial statements streamed as plain text while they are computed
+@app.get("/reports/{report_type}")
+async def get_financial_report(report_type: str, start_date: str, end_date: str):
+    if report_type not in REPORT_TYPES:
+        raise HTTPException(status_code=404, detail=f"Unknown report type {report_type}")
+    try:
+        start, end = date.fromisoformat(start_date), date.fromisoformat(end_date)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    try:
+        # Checked before the response starts, so a refused range is a 400 rather than a cut-off stream
+        await report_engine.check_report(report_type, start, end)
+    except RepositoryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StreamingResponse(report_engine.stream_report(report_type, start, end), media_type="text/plain")
+
+# Background job status, with the result once finished; only the user who started it sees it
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, user_id: str):
+    job = await job_queue.get(job_id, user_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return job
+
+# A user's recent background jobs, optionally with one status
+@app.get("/jobs")
+async def get_jobs(user_id: str, status: Optional[str] = None, limit: int = 20):
+    if status is not None and status not in JOB_STATUSES:
+        raise HTTPException(status_code=400, detail=f"status must be one of {', '.join(JOB_STATUSES)}")
+    return {"jobs": await job_queue.list(user_id, status, limit)}
+
 # Serve static files (HTML/CSS/JS for chat interface)
 app.mount("/", StaticFiles(directory="static", html=True), name="static")
 
@@ -226,6 +360,7 @@ if __name__ == "__main__":
             font-style: italic;
             font-size: 0.9rem;
         }
+""" + CLIENT_STYLES + """
         .thinking {
             background-color: #f1f1f1;
             align-self: flex-start;
@@ -326,52 +461,7 @@ if __name__ == "__main__":
             };
 
             socket.onmessage = function(event) {
-                const data = JSON.parse(event.data);
-                
-                // Handle "thinking" status
-                if (data.status === "thinking") {
-                    const thinkingDiv = document.createElement('div');
-                    thinkingDiv.className = 'message thinking';
-                    thinkingDiv.id = 'thinking-indicator';
-                    thinkingDiv.textContent = 'Thinking...';
-                    document.getElementById('messages').appendChild(thinkingDiv);
-                    scrollToBottom();
-                    return;
-                }
-                
-                // Remove thinking indicator if exists
-                const thinkingIndicator = document.getElementById('thinking-indicator');
-                if (thinkingIndicator) {
-                    thinkingIndicator.remove();
-                }
-                
-                // Create message element
-                const messageDiv = document.createElement('div');
-                
-                // Set class based on role
-                if (data.role === 'user') {
-                    messageDiv.className = 'message user-message';
-                } else if (data.role === 'assistant') {
-                    messageDiv.className = 'message assistant-message';
-                } else {
-                    messageDiv.className = 'message system-message';
-                }
-                
-                // Set content
-                messageDiv.textContent = data.content;
-                
-                // Add timestamp
-                const timestamp = document.createElement('div');
-                timestamp.className = 'timestamp';
-                const date = new Date(data.timestamp);
-                timestamp.textContent = date.toLocaleTimeString();
-                messageDiv.appendChild(timestamp);
-                
-                // Add to messages
-                document.getElementById('messages').appendChild(messageDiv);
-                
-                // Scroll to bottom
-                scrollToBottom();
+                renderChatEvent(JSON.parse(event.data));
             };
 
             socket.onclose = function(event) {
@@ -392,27 +482,7 @@ if __name__ == "__main__":
                 .then(response => response.json())
                 .then(data => {
                     // Display existing messages
-                    data.messages.forEach(message => {
-                        const messageDiv = document.createElement('div');
-                        
-                        if (message.role === 'user') {
-                            messageDiv.className = 'message user-message';
-                        } else if (message.role === 'assistant') {
-                            messageDiv.className = 'message assistant-message';
-                        } else {
-                            messageDiv.className = 'message system-message';
-                        }
-                        
-                        messageDiv.textContent = message.content;
-                        
-                        const timestamp = document.createElement('div');
-                        timestamp.className = 'timestamp';
-                        const date = new Date(message.timestamp);
-                        timestamp.textContent = date.toLocaleTimeString();
-                        messageDiv.appendChild(timestamp);
-                        
-                        document.getElementById('messages').appendChild(messageDiv);
-                    });
+                    data.messages.forEach(appendChatMessage);
                     
                     scrollToBottom();
                 });
@@ -436,7 +506,8 @@ if __name__ == "__main__":
             
             // Create message object
             const messageObj = {
-                message: message
+                message: message,
+                request_id: newRequestId()
             };
             
             // Send message to server
@@ -461,6 +532,7 @@ if __name__ == "__main__":
             scrollToBottom();
         }
 
+""" + CLIENT_SCRIPT + """
         function scrollToBottom() {
             const messages = document.getElementById('messages');
             messages.scrollTop = messages.scrollHeight;
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Sequence
+
+class DataLoader:
+    """Coalesces single-key lookups into batched queries.
+
+    Keys requested during one event-loop tick are collected and fetched with one call to
+    batch_fn(keys), which returns {key: value} for the keys it found. Identical keys,
+    including keys already being fetched by an earlier batch, share one future. Nothing is
+    cached once a batch completes, so results are never staler than a direct query.
+    """
+    def __init__(self, name: str, batch_fn: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+                 max_batch_size: int = 500):
+        self.name = name
+        self.max_batch_size = max_batch_size
+        self._batch_fn = batch_fn
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._scheduled = False
+        self.requests = 0
+        self.batches = 0
+        self.keys_fetched = 0
+
+    async def load(self, key: Hashable) -> Optional[Any]:
+        """Value for one key, or None if batch_fn did not return it"""
+        self.requests += 1
+        future = self._inflight.get(key) or self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if not self._scheduled:
+                self._scheduled = True
+                loop.call_soon(self._dispatch)
+        # Shielded so one cancelled caller does not cancel the lookup for everyone sharing it
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Sequence[Hashable]) -> List[Optional[Any]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _dispatch(self):
+        self._scheduled = False
+        pending, self._pending = self._pending, {}
+        self._inflight.update(pending)
+        keys = list(pending)
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[start:start + self.max_batch_size]}
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: Dict[Hashable, asyncio.Future]):
+        self.batches += 1
+        self.keys_fetched += len(batch)
+        try:
+            values = await self._batch_fn(list(batch))
+        except asyncio.CancelledError:
+            for future in self._finish(batch):
+                future.cancel()
+            raise
+        except Exception as e:
+            for future in self._finish(batch):
+                future.set_exception(e)
+                # Retrieved here so callers that were cancelled meanwhile do not log a warning
+                future.exception()
+            return
+        for key, future in batch.items():
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.set_result(values.get(key))
+
+    def _finish(self, batch: Dict[Hashable, asyncio.Future]) -> List[asyncio.Future]:
+        for key in batch:
+            self._inflight.pop(key, None)
+        return [future for future in batch.values() if not future.done()]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "keys_fetched": self.keys_fetched,
+            "requests_per_batch": self.requests / self.batches if self.batches else 0.0
+        }
@@ -0,0 +1,442 @@
+-- ERP System SQLite Schema
+-- Embedded mirror of db_schema.sql for tests and demos without a PostgreSQL server.
+-- Keep table and column names in sync with db_schema.sql.
+
+-- Finance Tables
+CREATE TABLE IF NOT EXISTS accounts (
+    account_id VARCHAR(20) PRIMARY KEY,
+    account_name VARCHAR(100) NOT NULL,
+    account_type VARCHAR(50) NOT NULL,
+    balance DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    currency VARCHAR(3) NOT NULL DEFAULT 'USD',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS transactions (
+    transaction_id VARCHAR(20) PRIMARY KEY,
+    account_id VARCHAR(20) NOT NULL REFERENCES accounts(account_id),
+    amount DECIMAL(15, 2) NOT NULL,
+    transaction_type VARCHAR(50) NOT NULL,
+    description TEXT,
+    transaction_date DATE NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT valid_amount CHECK (amount != 0)
+);
+
+CREATE TABLE IF NOT EXISTS financial_periods (
+    period_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'open',
+    CONSTRAINT valid_period CHECK (end_date > start_date)
+);
+
+CREATE TABLE IF NOT EXISTS tax_rates (
+    tax_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tax_name VARCHAR(100) NOT NULL,
+    rate DECIMAL(5, 2) NOT NULL,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS currencies (
+    currency_code VARCHAR(3) PRIMARY KEY,
+    currency_name VARCHAR(50) NOT NULL,
+    exchange_rate DECIMAL(10, 6) NOT NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Inventory Tables
+CREATE TABLE IF NOT EXISTS products (
+    product_id VARCHAR(20) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    description TEXT,
+    unit_price DECIMAL(10, 2) NOT NULL,
+    category VARCHAR(50),
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS warehouses (
+    warehouse_id VARCHAR(10) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    location VARCHAR(200),
+    is_active BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS inventory (
+    inventory_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id VARCHAR(20) NOT NULL REFERENCES products(product_id),
+    warehouse_id VARCHAR(10) NOT NULL REFERENCES warehouses(warehouse_id),
+    quantity INT NOT NULL DEFAULT 0,
+    reorder_point INT NOT NULL DEFAULT 10,
+    unit_cost DECIMAL(10, 2) NOT NULL,
+    last_count_date DATE,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT unique_product_warehouse UNIQUE (product_id, warehouse_id)
+);
+
+CREATE TABLE IF NOT EXISTS purchase_orders (
+    po_id VARCHAR(20) PRIMARY KEY,
+    supplier_id VARCHAR(20) NOT NULL,
+    order_date DATE NOT NULL,
+    expected_delivery DATE,
+    status VARCHAR(20) NOT NULL DEFAULT 'draft',
+    total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS stock_movements (
+    movement_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    product_id VARCHAR(20) NOT NULL REFERENCES products(product_id),
+    warehouse_id VARCHAR(10) NOT NULL REFERENCES warehouses(warehouse_id),
+    quantity INT NOT NULL,
+    movement_type VARCHAR(20) NOT NULL,
+    reference_id VARCHAR(20),
+    movement_date TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT valid_quantity CHECK (quantity != 0)
+);
+
+-- Sales Tables
+CREATE TABLE IF NOT EXISTS customers (
+    customer_id VARCHAR(20) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(100),
+    phone VARCHAR(20),
+    address TEXT,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS sales_orders (
+    order_id VARCHAR(20) PRIMARY KEY,
+    customer_id VARCHAR(20) NOT NULL REFERENCES customers(customer_id),
+    order_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    status VARCHAR(20) NOT NULL DEFAULT 'draft',
+    total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    tax_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    item_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    order_id VARCHAR(20) NOT NULL REFERENCES sales_orders(order_id),
+    product_id VARCHAR(20) NOT NULL REFERENCES products(product_id),
+    quantity INT NOT NULL,
+    unit_price DECIMAL(10, 2) NOT NULL,
+    line_total DECIMAL(15, 2) NOT NULL,
+    CONSTRAINT valid_quantity CHECK (quantity > 0)
+);
+
+CREATE TABLE IF NOT EXISTS invoices (
+    invoice_id VARCHAR(20) PRIMARY KEY,
+    order_id VARCHAR(20) NOT NULL REFERENCES sales_orders(order_id),
+    invoice_date DATE NOT NULL DEFAULT CURRENT_DATE,
+    due_date DATE NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'unpaid',
+    total_amount DECIMAL(15, 2) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS payments (
+    payment_id VARCHAR(20) PRIMARY KEY,
+    invoice_id VARCHAR(20) NOT NULL REFERENCES invoices(invoice_id),
+    payment_date DATE NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    payment_method VARCHAR(50) NOT NULL,
+    reference_number VARCHAR(50),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- HR Tables
+-- SQLite cannot add constraints later, so the manager foreign key is declared inline
+CREATE TABLE IF NOT EXISTS departments (
+    department_id VARCHAR(10) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    manager_id VARCHAR(20) REFERENCES employees(employee_id),
+    is_active BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS positions (
+    position_id VARCHAR(10) PRIMARY KEY,
+    title VARCHAR(100) NOT NULL,
+    department_id VARCHAR(10) NOT NULL REFERENCES departments(department_id),
+    salary_min DECIMAL(10, 2),
+    salary_max DECIMAL(10, 2),
+    is_active BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS employees (
+    employee_id VARCHAR(20) PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    email VARCHAR(100) NOT NULL,
+    phone VARCHAR(20),
+    address TEXT,
+    department_id VARCHAR(10) NOT NULL REFERENCES departments(department_id),
+    position_id VARCHAR(10) NOT NULL REFERENCES positions(position_id),
+    salary DECIMAL(10, 2) NOT NULL,
+    hire_date DATE NOT NULL,
+    termination_date DATE,
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS payroll (
+    payroll_id VARCHAR(20) PRIMARY KEY,
+    employee_id VARCHAR(20) NOT NULL REFERENCES employees(employee_id),
+    pay_period_start DATE NOT NULL,
+    pay_period_end DATE NOT NULL,
+    basic_salary DECIMAL(10, 2) NOT NULL,
+    allowances DECIMAL(10, 2) NOT NULL DEFAULT 0,
+    deductions DECIMAL(10, 2) NOT NULL DEFAULT 0,
+    net_pay DECIMAL(10, 2) NOT NULL,
+    payment_date DATE NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT valid_period CHECK (pay_period_end > pay_period_start)
+);
+
+CREATE TABLE IF NOT EXISTS attendance (
+    attendance_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    employee_id VARCHAR(20) NOT NULL REFERENCES employees(employee_id),
+    date DATE NOT NULL,
+    time_in TIME,
+    time_out TIME,
+    status VARCHAR(20) NOT NULL,
+    CONSTRAINT unique_employee_date UNIQUE (employee_id, date)
+);
+
+-- Performance indexes (migrations/001_performance_indexes.sql)
+-- Finance: ledger lookups per account, in date order
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions (account_id, transaction_date);
+
+-- Inventory: valuation and low stock per warehouse, movement history per product
+CREATE INDEX IF NOT EXISTS idx_inventory_warehouse ON inventory (warehouse_id);
+CREATE INDEX IF NOT EXISTS idx_inventory_low_stock ON inventory (warehouse_id, product_id)
+    WHERE quantity < reorder_point;
+CREATE INDEX IF NOT EXISTS idx_stock_movements_product_date ON stock_movements (product_id, movement_date);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_warehouse ON stock_movements (warehouse_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_orders_status ON purchase_orders (status, order_date);
+
+-- Sales: order lines, sales per customer and per period, unpaid invoices by due date
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items (product_id);
+CREATE INDEX IF NOT EXISTS idx_sales_orders_customer ON sales_orders (customer_id, total_amount);
+CREATE INDEX IF NOT EXISTS idx_sales_orders_date ON sales_orders (order_date, total_amount);
+CREATE INDEX IF NOT EXISTS idx_invoices_order ON invoices (order_id);
+CREATE INDEX IF NOT EXISTS idx_invoices_unpaid_due ON invoices (due_date)
+    WHERE status != 'paid';
+CREATE INDEX IF NOT EXISTS idx_payments_invoice ON payments (invoice_id);
+
+-- HR: active staff per department, payroll runs per employee and period
+CREATE INDEX IF NOT EXISTS idx_employees_department ON employees (department_id)
+    WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_positions_department ON positions (department_id);
+CREATE INDEX IF NOT EXISTS idx_payroll_employee_period ON payroll (employee_id, pay_period_start);
+
+-- Sales rollups (migrations/002_sales_rollups.sql), kept current by the triggers below
+CREATE TABLE IF NOT EXISTS sales_by_customer (
+    customer_id VARCHAR(20) PRIMARY KEY REFERENCES customers(customer_id),
+    order_count INT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS sales_by_month (
+    month DATE PRIMARY KEY,
+    order_count INT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_sales_by_customer_total ON sales_by_customer (total_amount DESC);
+
+CREATE TRIGGER IF NOT EXISTS sales_orders_rollups_insert
+AFTER INSERT ON sales_orders
+BEGIN
+    INSERT INTO sales_by_customer (customer_id, order_count, total_amount)
+    VALUES (NEW.customer_id, 1, NEW.total_amount)
+    ON CONFLICT (customer_id) DO UPDATE
+    SET order_count = order_count + excluded.order_count,
+        total_amount = total_amount + excluded.total_amount,
+        updated_at = CURRENT_TIMESTAMP;
+    INSERT INTO sales_by_month (month, order_count, total_amount)
+    VALUES (strftime('%Y-%m-01', NEW.order_date), 1, NEW.total_amount)
+    ON CONFLICT (month) DO UPDATE
+    SET order_count = order_count + excluded.order_count,
+        total_amount = total_amount + excluded.total_amount,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS sales_orders_rollups_delete
+AFTER DELETE ON sales_orders
+BEGIN
+    UPDATE sales_by_customer
+    SET order_count = order_count - 1, total_amount = total_amount - OLD.total_amount, updated_at = CURRENT_TIMESTAMP
+    WHERE customer_id = OLD.customer_id;
+    UPDATE sales_by_month
+    SET order_count = order_count - 1, total_amount = total_amount - OLD.total_amount, updated_at = CURRENT_TIMESTAMP
+    WHERE month = strftime('%Y-%m-01', OLD.order_date);
+END;
+
+CREATE TRIGGER IF NOT EXISTS sales_orders_rollups_update
+AFTER UPDATE OF customer_id, order_date, total_amount ON sales_orders
+BEGIN
+    UPDATE sales_by_customer
+    SET order_count = order_count - 1, total_amount = total_amount - OLD.total_amount, updated_at = CURRENT_TIMESTAMP
+    WHERE customer_id = OLD.customer_id;
+    UPDATE sales_by_month
+    SET order_count = order_count - 1, total_amount = total_amount - OLD.total_amount, updated_at = CURRENT_TIMESTAMP
+    WHERE month = strftime('%Y-%m-01', OLD.order_date);
+    INSERT INTO sales_by_customer (customer_id, order_count, total_amount)
+    VALUES (NEW.customer_id, 1, NEW.total_amount)
+    ON CONFLICT (customer_id) DO UPDATE
+    SET order_count = order_count + excluded.order_count,
+        total_amount = total_amount + excluded.total_amount,
+        updated_at = CURRENT_TIMESTAMP;
+    INSERT INTO sales_by_month (month, order_count, total_amount)
+    VALUES (strftime('%Y-%m-01', NEW.order_date), 1, NEW.total_amount)
+    ON CONFLICT (month) DO UPDATE
+    SET order_count = order_count + excluded.order_count,
+        total_amount = total_amount + excluded.total_amount,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+
+-- Warehouse valuation (migrations/003_warehouse_valuation.sql), kept current by the triggers below
+CREATE TABLE IF NOT EXISTS warehouse_valuation (
+    warehouse_id VARCHAR(10) PRIMARY KEY REFERENCES warehouses(warehouse_id),
+    item_count INT NOT NULL DEFAULT 0,
+    total_quantity BIGINT NOT NULL DEFAULT 0,
+    total_value DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS inventory_valuation_insert
+AFTER INSERT ON inventory
+BEGIN
+    INSERT INTO warehouse_valuation (warehouse_id, item_count, total_quantity, total_value)
+    VALUES (NEW.warehouse_id, 1, NEW.quantity, NEW.quantity * NEW.unit_cost)
+    ON CONFLICT (warehouse_id) DO UPDATE
+    SET item_count = item_count + excluded.item_count,
+        total_quantity = total_quantity + excluded.total_quantity,
+        total_value = total_value + excluded.total_value,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+
+CREATE TRIGGER IF NOT EXISTS inventory_valuation_delete
+AFTER DELETE ON inventory
+BEGIN
+    UPDATE warehouse_valuation
+    SET item_count = item_count - 1,
+        total_quantity = total_quantity - OLD.quantity,
+        total_value = total_value - OLD.quantity * OLD.unit_cost,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE warehouse_id = OLD.warehouse_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS inventory_valuation_update
+AFTER UPDATE OF warehouse_id, quantity, unit_cost ON inventory
+BEGIN
+    UPDATE warehouse_valuation
+    SET item_count = item_count - 1,
+        total_quantity = total_quantity - OLD.quantity,
+        total_value = total_value - OLD.quantity * OLD.unit_cost,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE warehouse_id = OLD.warehouse_id;
+    INSERT INTO warehouse_valuation (warehouse_id, item_count, total_quantity, total_value)
+    VALUES (NEW.warehouse_id, 1, NEW.quantity, NEW.quantity * NEW.unit_cost)
+    ON CONFLICT (warehouse_id) DO UPDATE
+    SET item_count = item_count + excluded.item_count,
+        total_quantity = total_quantity + excluded.total_quantity,
+        total_value = total_value + excluded.total_value,
+        updated_at = CURRENT_TIMESTAMP;
+END;
+
+-- Ledger balance snapshots (migrations/004_ledger_balance_snapshots.sql)
+CREATE TABLE IF NOT EXISTS account_balance_snapshots (
+    account_id VARCHAR(20) NOT NULL REFERENCES accounts(account_id),
+    as_of_date DATE NOT NULL,
+    period_id INT REFERENCES financial_periods(period_id),
+    closing_balance DECIMAL(15, 2) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (account_id, as_of_date)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_financial_periods_end ON financial_periods (end_date);
+
+-- Transaction idempotency keys (migrations/006_transaction_idempotency.sql)
+CREATE TABLE IF NOT EXISTS transaction_idempotency_keys (
+    idempotency_key VARCHAR(100) PRIMARY KEY,
+    transaction_id VARCHAR(20) NOT NULL,
+    account_id VARCHAR(20) NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    transaction_date DATE NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_transaction_idempotency_keys_created ON transaction_idempotency_keys (created_at);
+
+-- Sales orders waiting to be processed (migrations/007_pending_order_index.sql)
+CREATE INDEX IF NOT EXISTS idx_sales_orders_pending ON sales_orders (order_date, order_id)
+    WHERE status IN ('draft', 'confirmed');
+
+-- Insert sample data
+INSERT INTO warehouses (warehouse_id, name, location)
+VALUES 
+    ('WH001', 'Main Warehouse', 'New York'),
+    ('WH002', 'West Coast Warehouse', 'Los Angeles');
+
+INSERT INTO products (product_id, name, description, unit_price, category)
+VALUES 
+    ('ITM001', 'Laptop', 'Business laptop with 16GB RAM', 1200.00, 'Electronics'),
+    ('ITM002', 'Mouse', 'Wireless mouse', 25.00, 'Accessories');
+
+INSERT INTO inventory (product_id, warehouse_id, quantity, reorder_point, unit_cost)
+VALUES 
+    ('ITM001', 'WH001', 15, 10, 1000.00),
+    ('ITM002', 'WH001', 5, 20, 20.00),
+    ('ITM001', 'WH002', 8, 10, 1000.00),
+    ('ITM002', 'WH002', 25, 20, 20.00);
+
+INSERT INTO departments (department_id, name)
+VALUES 
+    ('DEPT001', 'IT'),
+    ('DEPT002', 'Sales'),
+    ('DEPT003', 'Finance');
+
+INSERT INTO positions (position_id, title, department_id, salary_min, salary_max)
+VALUES 
+    ('POS001', 'Developer', 'DEPT001', 70000.00, 120000.00),
+    ('POS002', 'Sales Representative', 'DEPT002', 50000.00, 90000.00),
+    ('POS003', 'Accountant', 'DEPT003', 60000.00, 100000.00);
+
+INSERT INTO employees (employee_id, name, email, department_id, position_id, salary, hire_date)
+VALUES 
+    ('EMP001', 'John Doe', 'john.doe@example.com', 'DEPT001', 'POS001', 85000.00, '2022-01-15'),
+    ('EMP002', 'Jane Smith', 'jane.smith@example.com', 'DEPT002', 'POS002', 65000.00, '2022-02-20'),
+    ('EMP003', 'Bob Johnson', 'bob.johnson@example.com', 'DEPT003', 'POS003', 75000.00, '2022-03-10');
+
+UPDATE departments SET manager_id = 'EMP001' WHERE department_id = 'DEPT001';
+UPDATE departments SET manager_id = 'EMP002' WHERE department_id = 'DEPT002';
+UPDATE departments SET manager_id = 'EMP003' WHERE department_id = 'DEPT003';
+
+INSERT INTO customers (customer_id, name, email, phone, address)
+VALUES 
+    ('CUST001', 'Acme Corp', 'contact@acmecorp.com', '555-123-4567', '123 Business St, Commerce City'),
+    ('CUST002', 'TechStart Inc', 'info@techstart.com', '555-987-6543', '456 Innovation Ave, Tech Park');
+
+INSERT INTO accounts (account_id, account_name, account_type, balance)
+VALUES 
+    ('ACC001', 'Operating Account', 'Checking', 25000.00),
+    ('ACC002', 'Payroll Account', 'Checking', 50000.00),
+    ('ACC003', 'Tax Reserve', 'Savings', 15000.00);
+
+-- Opening balances for the ledger
+INSERT INTO account_balance_snapshots (account_id, as_of_date, closing_balance)
+SELECT account_id, '1900-01-01', balance FROM accounts;
@@ -6,11 +6,15 @@ import json
 import os
 import uvicorn
 import asyncio
-from datetime import datetime
+from datetime import date, datetime
 from pathlib import Path
 
 from agents import Agent, Runner, FunctionTool
+from chat_events import (
+    CLIENT_SCRIPT, CLIENT_STYLES, RequestTasks, StreamTranslator, chat_event, chat_message, parse_client_frame
+)
 from load_env import load_env_file, check_required_vars, get_env
+from payroll_engine import PayrollInputs, compute_by_department, cents_to_decimal, period_end_for
 
 # Sample data (in-memory instead of using PostgreSQL)
 SAMPLE_INVENTORY = [
@@ -19,8 +23,8 @@ SAMPLE_INVENTORY = [
 ]
 
 SAMPLE_EMPLOYEES = [
-    {"employee_id": "EMP001", "name": "John Doe", "department": "IT", "position": "Developer", "salary": 85000.0},
-    {"employee_id": "EMP002", "name": "Jane Smith", "department": "Sales", "position": "Sales Manager", "salary": 90000.0}
+    {"employee_id": "EMP001", "name": "John Doe", "department": "IT", "position": "Developer", "salary": 85000.0, "hire_date": "2022-01-15"},
+    {"employee_id": "EMP002", "name": "Jane Smith", "department": "Sales", "position": "Sales Manager", "salary": 90000.0, "hire_date": "2022-02-20"}
 ]
 
 SAMPLE_CUSTOMERS = [
@@ -58,13 +62,39 @@ def create_purchase_order(items):
 
 def process_payroll(department=None):
     """Process payroll for all employees or a specific department"""
-    if department:
-        employees = [emp for emp in SAMPLE_EMPLOYEES if emp["department"] == department]
-        if not employees:
-            return {"error": f"No employees found in department {department}"}
-        return {"status": "success", "message": f"Payroll processed for department: {department}", "employees": len(employees)}
-    
-    return {"status": "success", "message": "Payroll processed for all employees", "employees": len(SAMPLE_EMPLOYEES)}
+    employees = [emp for emp in SAMPLE_EMPLOYEES if not department or emp["department"] == department]
+    if not employees:
+        return {"error": f"No employees found in department {department}"}
+
+    # Same pay rules as the database-backed tool, on the sample data with no attendance recorded
+    period_start = date.today().replace(day=1)
+    inputs = PayrollInputs.from_rows(period_start, period_end_for(period_start), [
+        {
+            "employee_id": emp["employee_id"], "department_id": emp["department"],
+            "salary_cents": round(emp["salary"] * 100), "hire_date": emp["hire_date"],
+            "absent_days": 0, "overtime_minutes": 0
+        }
+        for emp in employees
+    ])
+    amounts = compute_by_department(inputs)
+    payslips = [
+        {
+            "employee_id": employee_id,
+            "basic_salary": float(cents_to_decimal(basic)),
+            "allowances": float(cents_to_decimal(allowances)),
+            "deductions": float(cents_to_decimal(deductions)),
+            "net_pay": float(cents_to_decimal(net_pay))
+        }
+        for employee_id, basic, allowances, deductions, net_pay in zip(
+            inputs.employee_ids, amounts.basic_salary, amounts.allowances, amounts.deductions, amounts.net_pay
+        )
+    ]
+    message = f"Payroll processed for department: {department}" if department else "Payroll processed for all employees"
+    return {
+        "status": "success", "message": message, "employees": len(employees),
+        "pay_period_start": inputs.period_start.isoformat(), "pay_period_end": inputs.period_end.isoformat(),
+        "total_net_pay": float(cents_to_decimal(amounts.net_pay.sum())), "payslips": payslips
+    }
 
 # Initialize FastAPI app
 app = FastAPI(title="Simple ERP Chat Interface")
@@ -158,6 +188,50 @@ async def startup_event():
     app.state.agent = create_erp_agent()
     app.state.runner = Runner()
 
+# One chat request: stream the agent run to the user and record its outcome
+async def run_chat_request(user_id: str, request_id: str, text: str):
+    try:
+        # Send "thinking" message to indicate processing
+        await manager.send_message(
+            json.dumps(chat_event("thinking", request_id, agent=app.state.agent.name)),
+            user_id
+        )
+        
+        # Stream the run, forwarding text and tool calls as they happen
+        result = app.state.runner.run_streamed(
+            app.state.agent, 
+            text
+        )
+        translator = StreamTranslator(request_id, app.state.agent.name)
+        try:
+            async for event in result.stream_events():
+                update = translator.translate(event)
+                if update:
+                    await manager.send_message(json.dumps(update), user_id)
+        finally:
+            if not result.is_complete:
+                result.cancel()
+        
+        # Store and send the complete agent response
+        assistant_message = chat_message("assistant", result.final_output, request_id)
+        chat_histories[user_id].append(assistant_message)
+        
+        await manager.send_message(
+            json.dumps(assistant_message),
+            user_id
+        )
+    except asyncio.CancelledError:
+        # Cancelled by the user, or by their disconnect
+        cancelled_message = chat_message("system", "Request cancelled", request_id)
+        chat_histories[user_id].append(cancelled_message)
+        await manager.send_message(json.dumps(cancelled_message), user_id)
+        raise
+    except Exception as e:
+        # Handle errors in agent processing
+        error_message = chat_message("system", f"Error processing request: {str(e)}", request_id)
+        chat_histories[user_id].append(error_message)
+        await manager.send_message(json.dumps(error_message), user_id)
+
 # WebSocket endpoint for chat
 @app.websocket("/ws/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: str):
@@ -167,59 +241,42 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
     if user_id not in chat_histories:
         chat_histories[user_id] = []
     
+    # Requests run in their own tasks, so frames keep being read while the agent works
+    requests = RequestTasks()
     try:
         while True:
             # Receive message from websocket
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            try:
+                frame = parse_client_frame(data)
+            except ValueError as e:
+                # A bad frame is answered, not fatal: the connection and its runs carry on
+                await manager.send_message(json.dumps(chat_message("system", str(e))), user_id)
+                continue
+            request_id = frame["request_id"]
             
-            # Store user message in history
-            timestamp = datetime.now().isoformat()
-            user_message = {
-                "role": "user",
-                "content": message_data["message"],
-                "timestamp": timestamp
-            }
-            chat_histories[user_id].append(user_message)
+            if frame["type"] == "cancel":
+                requests.cancel(request_id)
+                continue
             
-            # Process message with ERP agent
-            try:
-                # Send "thinking" message to indicate processing
-                await manager.send_message(
-                    json.dumps({"status": "thinking", "timestamp": timestamp}),
-                    user_id
-                )
-                
-                # Process with agent
-                result = await app.state.runner.run(
-                    app.state.agent, 
-                    message_data["message"]
-                )
-                
-                # Store and send agent response
-                assistant_message = {
-                    "role": "assistant",
-                    "content": result.final_output,
-                    "timestamp": datetime.now().isoformat()
-                }
-                chat_histories[user_id].append(assistant_message)
-                
-                await manager.send_message(
-                    json.dumps(assistant_message),
-                    user_id
-                )
-            except Exception as e:
-                # Handle errors in agent processing
-                error_message = {
-                    "role": "system",
-                    "content": f"Error processing request: {str(e)}",
-                    "timestamp": datetime.now().isoformat()
-                }
-                chat_histories[user_id].append(error_message)
-                await manager.send_message(json.dumps(error_message), user_id)
+            # Process message with ERP agent, unless it repeats a running request or the
+            # connection is at its limit; refused messages stay out of the history
+            refused = requests.start(request_id, run_chat_request(user_id, request_id, frame["message"]))
+            if refused:
+                await manager.send_message(json.dumps(chat_message("system", refused, request_id)), user_id)
+                continue
+            
+            # Store user message in history; the run's task has not started yet, so it comes first
+            user_message = chat_message("user", frame["message"], request_id)
+            chat_histories[user_id].append(user_message)
     
     except WebSocketDisconnect:
+        pass
+    finally:
+        # Whatever ended the loop, the connection is gone
         manager.disconnect(user_id)
+        # Abandoned runs stop using model capacity
+        await requests.cancel_all()
 
 # REST API endpoints for chat history
 @app.get("/chat_history/{user_id}")
@@ -240,10 +297,9 @@ def ensure_static_dir():
     
     chat_html = static_dir / "index.html"
     
-    # Create the HTML file if it doesn't exist
-    if not chat_html.exists():
-        with open(chat_html, "w") as f:
-            f.write("""
+    # Rewrite the HTML file so the client matches the server's message schema
+    with open(chat_html, "w") as f:
+        f.write("""
 <!DOCTYPE html>
 <html lang="en">
 <head>
@@ -307,6 +363,7 @@ def ensure_static_dir():
             font-style: italic;
             font-size: 0.9rem;
         }
+""" + CLIENT_STYLES + """
         .thinking {
             background-color: #f1f1f1;
             align-self: flex-start;
@@ -407,52 +464,7 @@ def ensure_static_dir():
             };
 
             socket.onmessage = function(event) {
-                const data = JSON.parse(event.data);
-                
-                // Handle "thinking" status
-                if (data.status === "thinking") {
-                    const thinkingDiv = document.createElement('div');
-                    thinkingDiv.className = 'message thinking';
-                    thinkingDiv.id = 'thinking-indicator';
-                    thinkingDiv.textContent = 'Thinking...';
-                    document.getElementById('messages').appendChild(thinkingDiv);
-                    scrollToBottom();
-                    return;
-                }
-                
-                // Remove thinking indicator if exists
-                const thinkingIndicator = document.getElementById('thinking-indicator');
-                if (thinkingIndicator) {
-                    thinkingIndicator.remove();
-                }
-                
-                // Create message element
-                const messageDiv = document.createElement('div');
-                
-                // Set class based on role
-                if (data.role === 'user') {
-                    messageDiv.className = 'message user-message';
-                } else if (data.role === 'assistant') {
-                    messageDiv.className = 'message assistant-message';
-                } else {
-                    messageDiv.className = 'message system-message';
-                }
-                
-                // Set content
-                messageDiv.textContent = data.content;
-                
-                // Add timestamp
-                const timestamp = document.createElement('div');
-                timestamp.className = 'timestamp';
-                const date = new Date(data.timestamp);
-                timestamp.textContent = date.toLocaleTimeString();
-                messageDiv.appendChild(timestamp);
-                
-                // Add to messages
-                document.getElementById('messages').appendChild(messageDiv);
-                
-                // Scroll to bottom
-                scrollToBottom();
+                renderChatEvent(JSON.parse(event.data));
             };
 
             socket.onclose = function(event) {
@@ -473,27 +485,7 @@ def ensure_static_dir():
                 .then(response => response.json())
                 .then(data => {
                     // Display existing messages
-                    data.messages.forEach(message => {
-                        const messageDiv = document.createElement('div');
-                        
-                        if (message.role === 'user') {
-                            messageDiv.className = 'message user-message';
-                        } else if (message.role === 'assistant') {
-                            messageDiv.className = 'message assistant-message';
-                        } else {
-                            messageDiv.className = 'message system-message';
-                        }
-                        
-                        messageDiv.textContent = message.content;
-                        
-                        const timestamp = document.createElement('div');
-                        timestamp.className = 'timestamp';
-                        const date = new Date(message.timestamp);
-                        timestamp.textContent = date.toLocaleTimeString();
-                        messageDiv.appendChild(timestamp);
-                        
-                        document.getElementById('messages').appendChild(messageDiv);
-                    });
+                    data.messages.forEach(appendChatMessage);
                     
                     scrollToBottom();
                 });
@@ -517,7 +509,8 @@ def ensure_static_dir():
             
             // Create message object
             const messageObj = {
-                message: message
+                message: message,
+                request_id: newRequestId()
             };
             
             // Send message to server
@@ -542,6 +535,7 @@ def ensure_static_dir():
             scrollToBottom();
         }
 
+""" + CLIENT_SCRIPT + """
         function scrollToBottom() {
             const messages = document.getElementById('messages');
             messages.scrollTop = messages.scrollHeight;
@@ -555,7 +549,7 @@ def ensure_static_dir():
     </script>
 </body>
 </html>
-            """)
+        """)
     
     return static_dir
 
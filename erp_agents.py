@@ -1,27 +1,82 @@
-from agents import Agent, FunctionTool
+from agents import Agent
 from tools import (
-    get_account_balance, record_transaction, generate_financial_report,
-    check_inventory_levels, create_purchase_order, receive_inventory,
-    get_customer_info, create_sales_order, process_sales_order,
-    get_employee_data, update_employee_info, process_payroll
+    get_account_balance, record_transaction, record_transactions, create_financial_period, close_financial_period,
+    generate_financial_report,
+    check_inventory_levels, check_inventory_levels_bulk, get_reorder_recommendations, get_inventory_value,
+    create_purchase_order, receive_inventory,
+    get_customer_info, get_customers, create_sales_order, process_sales_order, process_sales_orders,
+    get_employee_data, get_employees, update_employee_info, process_payroll,
+    start_payroll_job, start_report_job, start_order_processing_job, get_job_status, list_jobs, cancel_job
 )
 from guardrails import FinanceGuardrail, HRGuardrail, SecurityGuardrail
+from guardrail_runner import set_guardrail_mode, OPTIMISTIC, SEQUENTIAL
+from agent_registry import registry
+from query_catalog import ERP_QUERIES, get_low_stock_items, get_overdue_invoices, get_top_customers, get_monthly_sales
+
+# Guardrails run alongside the first model turn, except where an agent must stay strictly
+# sequential. Override per agent with ERP_GUARDRAIL_MODES="Finance Agent=sequential".
+set_guardrail_mode("ERP Coordinator", OPTIMISTIC)
+set_guardrail_mode("Finance Agent", OPTIMISTIC)
+set_guardrail_mode("Inventory Agent", OPTIMISTIC)
+set_guardrail_mode("Sales Agent", OPTIMISTIC)
+set_guardrail_mode("HR Agent", SEQUENTIAL)
+
+# Status tools shared by every agent that can start background jobs
+def create_job_tools():
+    return [
+        registry.function_tool(
+            function=get_job_status,
+            description="Get the status, progress and result of a background job"
+        ),
+        registry.function_tool(
+            function=list_jobs,
+            description="List the user's recent background jobs, optionally by status"
+        ),
+        registry.function_tool(
+            function=cancel_job,
+            description="Cancel a background job that has not started yet"
+        )
+    ]
+
+# Predefined catalog queries, registered on the agents that own them independently of MCP
+def create_catalog_tools(*queries):
+    return [
+        registry.function_tool(function=query, description=ERP_QUERIES[query.__name__].description)
+        for query in queries
+    ]
 
 # Finance Agent
 def create_finance_agent():
     finance_tools = [
-        FunctionTool(
+        registry.function_tool(
             function=get_account_balance,
-            description="Get the current balance of a financial account"
+            description="Get the balance of a financial account, currently or as of a date"
         ),
-        FunctionTool(
+        registry.function_tool(
             function=record_transaction,
             description="Record a financial transaction in the system"
         ),
-        FunctionTool(
+        registry.function_tool(
+            function=record_transactions,
+            description="Record several transactions (e.g. a journal entry) in one call; repeated idempotency keys are not posted twice"
+        ),
+        registry.function_tool(
+            function=create_financial_period,
+            description="Open a new financial period"
+        ),
+        registry.function_tool(
+            function=close_financial_period,
+            description="Close a financial period and record closing balances"
+        ),
+        registry.function_tool(
             function=generate_financial_report,
-            description="Generate a financial report for a specified period"
-        )
+            description="Generate an income_statement, balance_sheet or cash_flow report for a period"
+        ),
+        registry.function_tool(
+            function=start_report_job,
+            description="Generate a report in the background for long periods; returns a job ID at once"
+        ),
+        *create_job_tools()
     ]
 
     return Agent(
@@ -30,7 +85,8 @@ def create_finance_agent():
 You have access to financial data and can process transactions, check balances, and generate reports.
 Always ensure compliance with accounting principles and financial regulations.
 For complex analyses, collect all relevant data before making conclusions.
-When handling financial data, always verify account codes and transaction amounts.""",
+When handling financial data, always verify account codes and transaction amounts.
+For reports over a year or more, start a background job and tell the user its job ID.""",
         tools=finance_tools,
         guardrails=[FinanceGuardrail(), SecurityGuardrail()]
     )
@@ -38,18 +94,31 @@ When handling financial data, always verify account codes and transaction amount
 # Inventory Agent
 def create_inventory_agent():
     inventory_tools = [
-        FunctionTool(
+        registry.function_tool(
             function=check_inventory_levels,
             description="Check current inventory levels for a product"
         ),
-        FunctionTool(
+        registry.function_tool(
+            function=check_inventory_levels_bulk,
+            description="Check current inventory levels for several products in one call"
+        ),
+        registry.function_tool(
+            function=get_reorder_recommendations,
+            description="Rank the products and warehouses most in need of reordering, with suggested order quantities"
+        ),
+        registry.function_tool(
+            function=get_inventory_value,
+            description="Get the total value of stock held in each warehouse"
+        ),
+        registry.function_tool(
             function=create_purchase_order,
             description="Create a purchase order for inventory"
         ),
-        FunctionTool(
+        registry.function_tool(
             function=receive_inventory,
             description="Record receipt of inventory items"
-        )
+        ),
+        *create_catalog_tools(get_low_stock_items)
     ]
 
     return Agent(
@@ -57,7 +126,8 @@ def create_inventory_agent():
         instructions="""You are a specialized inventory management agent for an ERP system.
 You monitor stock levels, suggest reorders, and optimize inventory.
 When checking inventory, always verify if items are below reorder points.
-For purchase orders, prioritize items below reorder threshold.
+For purchase orders, prioritize items below reorder threshold: get_reorder_recommendations
+returns them ranked by urgency with suggested quantities, so use it instead of checking items one by one.
 When receiving inventory, validate quantities against purchase orders.
 Always calculate total costs for purchase decisions.""",
         tools=inventory_tools,
@@ -67,22 +137,40 @@ Always calculate total costs for purchase decisions.""",
 # Sales Agent
 def create_sales_agent():
     sales_tools = [
-        FunctionTool(
+        registry.function_tool(
             function=get_customer_info,
             description="Get information about a customer"
         ),
-        FunctionTool(
+        registry.function_tool(
+            function=get_customers,
+            description="Get information about several customers in one call"
+        ),
+        registry.function_tool(
             function=create_sales_order,
             description="Create a new sales order"
         ),
-        FunctionTool(
+        registry.function_tool(
             function=process_sales_order,
             description="Process and fulfill a sales order"
         ),
-        FunctionTool(
+        registry.function_tool(
+            function=process_sales_orders,
+            description="Process and fulfill several sales orders, or the oldest pending ones, in one batch"
+        ),
+        registry.function_tool(
+            function=start_order_processing_job,
+            description="Process every pending sales order in the background; returns a job ID at once"
+        ),
+        *create_job_tools(),
+        registry.function_tool(
             function=check_inventory_levels,
             description="Check current inventory levels for a product"
-        )
+        ),
+        registry.function_tool(
+            function=check_inventory_levels_bulk,
+            description="Check current inventory levels for several products in one call"
+        ),
+        *create_catalog_tools(get_overdue_invoices, get_top_customers, get_monthly_sales)
     ]
 
     return Agent(
@@ -92,7 +180,8 @@ You handle customer interactions, create and process sales orders, and check pro
 Always verify inventory levels before confirming orders.
 For new orders, collect all necessary customer information.
 Calculate accurate totals for all orders.
-Provide estimated delivery dates based on inventory status.""",
+Provide estimated delivery dates based on inventory status.
+To work through the whole backlog of pending orders, start a background job and tell the user its job ID.""",
         tools=sales_tools,
         guardrails=[SecurityGuardrail()]
     )
@@ -100,18 +189,27 @@ Provide estimated delivery dates based on inventory status.""",
 # HR Agent
 def create_hr_agent():
     hr_tools = [
-        FunctionTool(
+        registry.function_tool(
             function=get_employee_data,
             description="Get information about an employee"
         ),
-        FunctionTool(
+        registry.function_tool(
+            function=get_employees,
+            description="Get information about several employees in one call"
+        ),
+        registry.function_tool(
             function=update_employee_info,
             description="Update employee information"
         ),
-        FunctionTool(
+        registry.function_tool(
             function=process_payroll,
-            description="Process payroll for employees"
-        )
+            description="Process payroll for employees, optionally for one department and pay period (YYYY-MM)"
+        ),
+        registry.function_tool(
+            function=start_payroll_job,
+            description="Run payroll in the background, optionally for one department and pay period (YYYY-MM); returns a job ID at once"
+        ),
+        *create_job_tools()
     ]
 
     return Agent(
@@ -120,26 +218,31 @@ def create_hr_agent():
 You manage employee data, process payroll, and handle HR-related requests.
 Maintain strict confidentiality for all employee information.
 For payroll processing, verify all calculations before submission.
+Run payroll for the whole company as a background job and tell the user its job ID; progress is shown to them as it runs.
 When updating employee records, confirm the changes before committing.
 Always follow company policies and legal requirements for HR operations.""",
         tools=hr_tools,
         guardrails=[HRGuardrail(), SecurityGuardrail()]
     )
 
+# Specialized agents are built once per process and shared by every coordinator
+registry.register("finance", create_finance_agent)
+registry.register("inventory", create_inventory_agent)
+registry.register("sales", create_sales_agent)
+registry.register("hr", create_hr_agent)
+
+# Specialized agents keyed by domain, shared by the coordinator and the intent router
+def create_specialist_agents():
+    return registry.specialists()
+
 # Coordinator Agent (Main ERP agent)
 def create_coordinator_agent(mcp_tools=None):
-    # Create specialized agents
-    finance_agent = create_finance_agent()
-    inventory_agent = create_inventory_agent()
-    sales_agent = create_sales_agent()
-    hr_agent = create_hr_agent()
-    
-    # Tools for the coordinator
+    # Tools for the coordinator, cached wrappers around the shared specialized agents
     coordinator_tools = [
-        finance_agent.as_tool(),
-        inventory_agent.as_tool(),
-        sales_agent.as_tool(),
-        hr_agent.as_tool()
+        registry.as_tool("finance"),
+        registry.as_tool("inventory"),
+        registry.as_tool("sales"),
+        registry.as_tool("hr")
     ]
     
     # Add MCP tools if provided
@@ -3,7 +3,10 @@ import os
 import sys
 from agents import Runner
 from agents import create_coordinator_agent
-from mcp_integration import setup_mcp_tools
+from erp_agents import create_specialist_agents
+from intent_router import create_intent_router
+from mcp_integration import setup_mcp_tools, shutdown_mcp_tools
+from database import close_database
 from load_env import load_env_file, check_required_vars, get_env
 
 async def main():
@@ -32,6 +35,11 @@ async def main():
     print("Creating ERP coordinator agent...")
     coordinator = create_coordinator_agent(mcp_tools)
     
+    # Clear single-domain requests skip the coordinator's routing turn
+    router = None
+    if get_env("ERP_ROUTER_ENABLED", "true").lower() == "true":
+        router = create_intent_router(coordinator, create_specialist_agents())
+    
     # Set up runner
     runner = Runner()
     
@@ -39,28 +47,34 @@ async def main():
     print("\n=== ERP Agent System ===")
     print("Type 'exit' to quit\n")
     
-    while True:
-        # Get user input
-        user_input = input("\nERP Request: ")
-        
-        # Check for exit command
-        if user_input.lower() in ['exit', 'quit', 'q']:
-            break
-        
-        # Process the request
-        print("\nProcessing request...")
-        try:
-            result = await runner.run(coordinator, user_input)
-            print("\nResponse:")
-            print(result.final_output)
-        except Exception as e:
-            print(f"Error processing request: {e}")
+    try:
+        while True:
+            # Get user input
+            user_input = input("\nERP Request: ")
+            
+            # Check for exit command
+            if user_input.lower() in ['exit', 'quit', 'q']:
+                break
+            
+            # Process the request
+            print("\nProcessing request...")
+            try:
+                agent = router.route(user_input).agent if router else coordinator
+                result = await runner.run(agent, user_input)
+                print("\nResponse:")
+                print(result.final_output)
+            except Exception as e:
+                print(f"Error processing request: {e}")
+    finally:
+        # Close pooled MCP sessions and database connections
+        await shutdown_mcp_tools()
+        await close_database()
 
 if __name__ == "__main__":
     # Check Python version
     import sys
-    if sys.version_info < (3, 7):
-        print("This application requires Python 3.7 or higher")
+    if sys.version_info < (3, 10):
+        print("This application requires Python 3.10 or higher")
         sys.exit(1)
     
     # Run the main function
@@ -0,0 +1,273 @@
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, AsyncIterator, Callable, Dict, List
+from database import DatabaseBackend, get_database
+from load_env import get_env
+from repository import LEDGER_BALANCES_SQL, LEDGER_EPOCH, RepositoryError, as_date, money
+
+REPORT_CURRENCY = get_env("ERP_REPORT_CURRENCY", "USD")
+REPORT_BATCH_SIZE = int(get_env("ERP_REPORT_BATCH_SIZE", "5000"))
+REPORT_CHUNK_LINES = int(get_env("ERP_REPORT_CHUNK_LINES", "200"))
+# Year-long reports over millions of transactions outlive the pool-wide statement timeout
+REPORT_TIMEOUT_MS = int(get_env("ERP_REPORT_TIMEOUT_MS", "600000"))
+
+# Statement section for each (lower-case) accounts.account_type; other types are left out
+ACCOUNT_SECTIONS = {
+    "assets": ("asset", "cash", "checking", "savings", "receivable", "accounts receivable",
+               "inventory", "fixed asset", "prepaid expense"),
+    "liabilities": ("liability", "payable", "accounts payable", "credit card", "loan",
+                    "accrued liability", "tax payable"),
+    "equity": ("equity", "owner's equity", "retained earnings"),
+    "revenue": ("revenue", "income", "sales", "other income"),
+    "expenses": ("expense", "cost of goods sold", "cogs", "payroll expense", "other expense")
+}
+# The ledger is single-entry: a transaction only records its own account and whether it is a
+# credit or a debit, so cash flow is reported per cash account, not per activity
+CASH_ACCOUNT_TYPES = ("cash", "checking", "savings")
+REPORT_TYPES = ("income_statement", "balance_sheet", "cash_flow")
+
+# Report queries; {account_types} is the dialect's match_any() condition on the account type.
+# check_query_plans.py EXPLAINs the same strings
+INCOME_STATEMENT_SQL = """SELECT a.account_id, a.account_name, a.currency, SUM(t.amount) AS amount
+FROM accounts a
+JOIN transactions t ON t.account_id = a.account_id
+WHERE {account_types}
+  AND t.transaction_date BETWEEN :start_date AND :end_date
+GROUP BY a.account_id, a.account_name, a.currency
+ORDER BY a.account_id"""
+BALANCE_SHEET_SQL = """SELECT b.account_id, b.account_name, b.currency, b.balance AS amount
+FROM (""" + LEDGER_BALANCES_SQL + """
+WHERE {account_types}) b
+ORDER BY b.account_id"""
+EARNINGS_TO_DATE_SQL = """SELECT b.currency, LOWER(b.account_type) AS account_type, SUM(b.balance) AS amount
+FROM (""" + LEDGER_BALANCES_SQL + """
+WHERE {account_types}) b
+GROUP BY b.currency, LOWER(b.account_type)"""
+# One row per cash account, with its opening balance and the period's flows
+CASH_FLOW_SQL = """SELECT b.account_id, b.account_name, b.currency, b.balance AS opening_balance,
+       f.inflow, f.outflow
+FROM (""" + LEDGER_BALANCES_SQL + """
+WHERE {account_types}) b
+LEFT JOIN (
+    SELECT t.account_id,
+           SUM(CASE WHEN t.amount > 0 THEN t.amount ELSE 0 END) AS inflow,
+           SUM(CASE WHEN t.amount < 0 THEN -t.amount ELSE 0 END) AS outflow
+    FROM transactions t
+    WHERE t.transaction_date BETWEEN :start_date AND :end_date
+      AND t.account_id IN (SELECT a.account_id FROM accounts a WHERE {account_types})
+    GROUP BY t.account_id
+) f ON f.account_id = b.account_id
+ORDER BY b.account_id"""
+
+LINE_WIDTH = 72
+
+def _amount_line(label: str, amount: Decimal, indent: int = 2) -> str:
+    label = label[:LINE_WIDTH - indent - 20]
+    return f"{' ' * indent}{label:<{LINE_WIDTH - indent - 20}}{amount:>20,.2f}\n"
+
+class ReportWriter:
+    """Buffers report lines and hands them out in chunks of REPORT_CHUNK_LINES lines"""
+    def __init__(self, chunk_lines: int = REPORT_CHUNK_LINES):
+        self.chunk_lines = chunk_lines
+        self._lines: List[str] = []
+
+    def add(self, line: str):
+        self._lines.append(line)
+
+    def ready(self) -> bool:
+        return len(self._lines) >= self.chunk_lines
+
+    def flush(self) -> str:
+        chunk, self._lines = "".join(self._lines), []
+        return chunk
+
+class FinancialReportEngine:
+    """Income statement, balance sheet and cash flow computed from the ledger.
+
+    The database aggregates transactions per account; those rows are streamed through a
+    server-side cursor and converted, classified and totalled one at a time, so memory
+    stays flat however many transactions or accounts the period covers. Every query of a
+    report reads the same snapshot, and the report text is yielded in chunks as it is built.
+    """
+    def __init__(self, database_provider: Callable[[], DatabaseBackend] = get_database,
+                 currency: str = REPORT_CURRENCY):
+        self._database_provider = database_provider
+        self.currency = currency
+
+    @property
+    def database(self) -> DatabaseBackend:
+        return self._database_provider()
+
+    def _check_request(self, report_type: str, start_date: date, end_date: date):
+        if report_type not in REPORT_TYPES:
+            raise RepositoryError(f"Unknown report type {report_type}, expected one of {', '.join(REPORT_TYPES)}")
+        if end_date < start_date:
+            raise RepositoryError("end_date must not be before start_date")
+
+    async def check_report(self, report_type: str, start_date: date, end_date: date):
+        """Raise RepositoryError for a report that cannot be built, before any of it is streamed"""
+        self._check_request(report_type, start_date, end_date)
+        await self._check_archive(self.database, report_type, start_date, end_date)
+
+    async def _check_archive(self, db: DatabaseBackend, report_type: str, start_date: date, end_date: date):
+        """Refuse reports that would need transactions from archived (detached) partitions.
+
+        Archived months are no longer part of the transactions table (see
+        migrations/005_monthly_partitions.sql), so a report reading them would silently omit
+        their rows. Period totals need every transaction from start_date on; balances need
+        those after the latest closing snapshot on or before their date.
+        """
+        if db.dialect != "postgres":
+            return
+        archived_through = as_date((await db.fetchrow("SELECT archived_through('transactions') AS day"))["day"])
+        if archived_through is None:
+            return
+        if report_type != "balance_sheet" and start_date < archived_through:
+            raise RepositoryError(
+                f"Transactions before {archived_through.isoformat()} are archived; start the report on or after that date"
+            )
+        as_of = end_date if report_type == "balance_sheet" else start_date - timedelta(days=1)
+        if report_type != "income_statement":
+            row = await db.fetchrow(
+                "SELECT MAX(as_of_date) AS as_of_date FROM account_balance_snapshots WHERE as_of_date <= :as_of",
+                {"as_of": as_of}
+            )
+            snapshot = as_date(row["as_of_date"])
+            if snapshot is None or snapshot + timedelta(days=1) < archived_through:
+                raise RepositoryError(
+                    f"Balances as of {as_of.isoformat()} would need transactions archived before {archived_through.isoformat()}, "
+                    "as no closed financial period ends between the two"
+                )
+
+    async def stream_report(self, report_type: str, start_date: date, end_date: date) -> AsyncIterator[str]:
+        """Yield the report text in chunks"""
+        self._check_request(report_type, start_date, end_date)
+        build = getattr(self, f"_{report_type}")
+        async with self.database.snapshot(REPORT_TIMEOUT_MS) as db:
+            await self._check_archive(db, report_type, start_date, end_date)
+            rates = await self._exchange_rates(db)
+            writer = ReportWriter()
+            async for _ in build(db, rates, writer, start_date, end_date):
+                yield writer.flush()
+            rest = writer.flush()
+            if rest:
+                yield rest
+
+    async def generate_report(self, report_type: str, start_date: date, end_date: date) -> str:
+        return "".join([chunk async for chunk in self.stream_report(report_type, start_date, end_date)])
+
+    async def _exchange_rates(self, db: DatabaseBackend) -> Dict[str, Decimal]:
+        rows = await db.fetch("SELECT currency_code, exchange_rate FROM currencies")
+        rates = {row["currency_code"]: Decimal(str(row["exchange_rate"])) for row in rows}
+        rates.setdefault(self.currency, Decimal(1))
+        return rates
+
+    def _convert(self, rates: Dict[str, Decimal], amount: Any, currency: str) -> Decimal:
+        """Amount in the report currency; exchange rates share one reference currency"""
+        if amount is None:
+            return Decimal(0)
+        amount = Decimal(str(amount))
+        if currency == self.currency:
+            return amount
+        if currency not in rates:
+            raise RepositoryError(f"No exchange rate for {currency} in currencies")
+        return amount * rates[currency] / rates[self.currency]
+
+    def _types_condition(self, db: DatabaseBackend) -> str:
+        return db.match_any("LOWER(a.account_type)", "account_types")
+
+    async def _stream(self, db: DatabaseBackend, sql: str, params: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        async for rows in db.stream(sql, params, REPORT_BATCH_SIZE):
+            for row in rows:
+                yield row
+
+    async def _section(self, db: DatabaseBackend, rates: Dict[str, Decimal], writer: ReportWriter,
+                       title: str, sql: str, params: Dict[str, Any], totals: Dict[str, Decimal]):
+        """Stream one section's per-account rows into the writer; yields whenever a chunk is ready"""
+        writer.add(f"\n{title}\n")
+        total = Decimal(0)
+        async for row in self._stream(db, sql, params):
+            amount = self._convert(rates, row["amount"], row["currency"])
+            total += amount
+            writer.add(_amount_line(f"{row['account_id']}  {row['account_name']}", money(amount), indent=4))
+            if writer.ready():
+                yield
+        writer.add(_amount_line(f"Total {title.lower()}", money(total)))
+        totals[title] = total
+
+    def _header(self, writer: ReportWriter, title: str, period: str):
+        writer.add(f"{title}\n{period} (amounts in {self.currency})\n{'=' * LINE_WIDTH}\n")
+
+    async def _income_statement(self, db: DatabaseBackend, rates: Dict[str, Decimal], writer: ReportWriter,
+                                start_date: date, end_date: date):
+        self._header(writer, "Income Statement", f"{start_date.isoformat()} to {end_date.isoformat()}")
+        sql = INCOME_STATEMENT_SQL.format(account_types=self._types_condition(db))
+        totals: Dict[str, Decimal] = {}
+        for title, section in (("Revenue", "revenue"), ("Expenses", "expenses")):
+            params = {"account_types": list(ACCOUNT_SECTIONS[section]), "start_date": start_date, "end_date": end_date}
+            async for _ in self._section(db, rates, writer, title, sql, params, totals):
+                yield
+        writer.add(f"{'-' * LINE_WIDTH}\n")
+        writer.add(_amount_line("Net income", money(totals["Revenue"] - totals["Expenses"]), indent=0))
+
+    async def _balance_sheet(self, db: DatabaseBackend, rates: Dict[str, Decimal], writer: ReportWriter,
+                             start_date: date, end_date: date):
+        """Balances as of end_date; start_date only has to be a valid date"""
+        self._header(writer, "Balance Sheet", f"As of {end_date.isoformat()}")
+        sql = BALANCE_SHEET_SQL.format(account_types=self._types_condition(db))
+        totals: Dict[str, Decimal] = {}
+        for title, section in (("Assets", "assets"), ("Liabilities", "liabilities"), ("Equity", "equity")):
+            params = {"account_types": list(ACCOUNT_SECTIONS[section]), "as_of": end_date, "epoch": LEDGER_EPOCH}
+            async for _ in self._section(db, rates, writer, title, sql, params, totals):
+                yield
+
+        # Revenue less expenses to date belongs to the owners until it is closed into equity
+        earnings = Decimal(0)
+        income_types = list(ACCOUNT_SECTIONS["revenue"]) + list(ACCOUNT_SECTIONS["expenses"])
+        sql = EARNINGS_TO_DATE_SQL.format(account_types=self._types_condition(db))
+        async for row in self._stream(db, sql, {"account_types": income_types, "as_of": end_date, "epoch": LEDGER_EPOCH}):
+            amount = self._convert(rates, row["amount"], row["currency"])
+            earnings += amount if row["account_type"] in ACCOUNT_SECTIONS["revenue"] else -amount
+        writer.add(_amount_line("Earnings to date", money(earnings)))
+        writer.add(f"{'-' * LINE_WIDTH}\n")
+        writer.add(_amount_line("Total assets", money(totals["Assets"]), indent=0))
+        writer.add(_amount_line(
+            "Total liabilities and equity",
+            money(totals["Liabilities"] + totals["Equity"] + earnings),
+            indent=0
+        ))
+
+    async def _cash_flow(self, db: DatabaseBackend, rates: Dict[str, Decimal], writer: ReportWriter,
+                         start_date: date, end_date: date):
+        self._header(writer, "Cash Flow Statement", f"{start_date.isoformat()} to {end_date.isoformat()}")
+        sql = CASH_FLOW_SQL.format(account_types=self._types_condition(db))
+        params = {
+            "account_types": list(CASH_ACCOUNT_TYPES),
+            "as_of": start_date - timedelta(days=1),
+            "epoch": LEDGER_EPOCH,
+            "start_date": start_date,
+            "end_date": end_date
+        }
+        opening_total = inflow_total = outflow_total = Decimal(0)
+        writer.add("\nCash accounts\n")
+        async for row in self._stream(db, sql, params):
+            opening = self._convert(rates, row["opening_balance"], row["currency"])
+            inflow = self._convert(rates, row["inflow"], row["currency"])
+            outflow = self._convert(rates, row["outflow"], row["currency"])
+            opening_total += opening
+            inflow_total += inflow
+            outflow_total += outflow
+            writer.add(f"    {row['account_id']}  {row['account_name']}\n")
+            writer.add(_amount_line("Opening balance", money(opening), indent=6))
+            writer.add(_amount_line("Inflows", money(inflow), indent=6))
+            writer.add(_amount_line("Outflows", money(-outflow), indent=6))
+            writer.add(_amount_line("Closing balance", money(opening + inflow - outflow), indent=6))
+            if writer.ready():
+                yield
+
+        writer.add(f"{'-' * LINE_WIDTH}\n")
+        writer.add(_amount_line("Opening cash", money(opening_total), indent=0))
+        writer.add(_amount_line("Net change in cash", money(inflow_total - outflow_total), indent=0))
+        writer.add(_amount_line("Closing cash", money(opening_total + inflow_total - outflow_total), indent=0))
+
+report_engine = FinancialReportEngine()
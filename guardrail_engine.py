@@ -0,0 +1,137 @@
+import json
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from load_env import get_env
+
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse whitespace runs so phrases match across line breaks"""
+    return _WHITESPACE.sub(" ", text.lower())
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton mapping phrases to the guardrails that registered them"""
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[frozenset] = [frozenset()]
+        self._phrases: List[Tuple[str, str]] = []
+        self._compiled = True
+
+    def add(self, phrase: str, label: str):
+        phrase = normalize_text(phrase).strip()
+        if phrase:
+            self._phrases.append((phrase, label))
+            self._compiled = False
+
+    def compile(self):
+        """Build the trie and failure links for every phrase added so far"""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[set] = [set()]
+        for phrase, label in self._phrases:
+            state = 0
+            for char in phrase:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    output.append(set())
+                state = next_state
+            output[state].add(label)
+
+        # Failure links only: a miss follows them at scan time, so memory stays linear in
+        # the phrase text rather than states x alphabet
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            output[state] |= output[fail[state]]
+            for char, next_state in goto[state].items():
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                queue.append(next_state)
+
+        self._goto = goto
+        self._fail = fail
+        self._output = [frozenset(labels) for labels in output]
+        self._compiled = True
+
+    def scan(self, normalized_text: str, stop_after: Optional[int] = None) -> set:
+        """Return the labels whose phrases occur in already-normalized text"""
+        if not self._compiled:
+            self.compile()
+        goto, fail, output = self._goto, self._fail, self._output
+        found = set()
+        state = 0
+        for char in normalized_text:
+            # Each failure step moves back at least one character, so the scan stays linear
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+                # Every guardrail has already tripped, no need to read the rest
+                if stop_after is not None and len(found) >= stop_after:
+                    break
+        return found
+
+class GuardrailEngine:
+    """Evaluates every registered phrase guardrail in a single pass over the input"""
+    def __init__(self):
+        self._automaton = PhraseAutomaton()
+        self._messages: Dict[str, str] = {}
+        self._last_input: Optional[str] = None
+        self._last_verdicts: Dict[str, Tuple[bool, Optional[str]]] = {}
+
+    def register(self, name: str, phrases: Iterable[str], message: str):
+        """Register (or extend) a guardrail with the phrases that make it fail"""
+        self._messages[name] = message
+        for phrase in phrases:
+            self._automaton.add(phrase, name)
+        self._last_input = None
+
+    def load_config(self, config_path: str):
+        """Load extra phrases from a JSON file of {"GuardrailName": ["phrase", ...]}"""
+        with open(config_path, "r") as f:
+            config = json.load(f)
+        for name, phrases in config.items():
+            if name not in self._messages:
+                print(f"Warning: guardrail config references unknown guardrail {name}")
+                continue
+            self.register(name, phrases, self._messages[name])
+        self._automaton.compile()
+
+    def evaluate(self, input_text: str) -> Dict[str, Tuple[bool, Optional[str]]]:
+        """Return a (passed, message) verdict for every registered guardrail"""
+        # Stacked guardrails on the same agent ask about the same text back to back
+        if input_text == self._last_input:
+            return self._last_verdicts
+        tripped = self._automaton.scan(normalize_text(input_text), stop_after=len(self._messages))
+        verdicts = {
+            name: (False, message) if name in tripped else (True, None)
+            for name, message in self._messages.items()
+        }
+        self._last_input = input_text
+        self._last_verdicts = verdicts
+        return verdicts
+
+    def check(self, name: str, input_text: str) -> Tuple[bool, Optional[str]]:
+        return self.evaluate(input_text)[name]
+
+def create_guardrail_engine(phrase_lists: Dict[str, Tuple[List[str], str]]) -> GuardrailEngine:
+    """Build an engine from the built-in phrase lists plus the optional compliance config file"""
+    engine = GuardrailEngine()
+    for name, (phrases, message) in phrase_lists.items():
+        engine.register(name, phrases, message)
+
+    config_path = get_env("ERP_GUARDRAIL_PHRASES_FILE")
+    if config_path:
+        try:
+            engine.load_config(config_path)
+        except Exception as e:
+            print(f"Error loading guardrail phrases from {config_path}: {e}")
+    return engine
@@ -0,0 +1,215 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple
+from guardrail_engine import normalize_text
+from load_env import get_env
+
+Verdict = Tuple[bool, Optional[str]]
+
+SEQUENTIAL = "sequential"
+OPTIMISTIC = "optimistic"
+
+class GuardrailTripped(Exception):
+    """Raised when an agent's guardrail rejects the input"""
+    def __init__(self, message: Optional[str]):
+        super().__init__(message or "Request blocked by guardrail")
+        self.message = message
+
+class GuardrailRunner:
+    """Runs an agent's guardrails concurrently and memoizes verdicts in a bounded LRU"""
+    def __init__(self, cache_size: int = 4096):
+        self.cache_size = cache_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: "OrderedDict[Tuple[Hashable, str], Verdict]" = OrderedDict()
+        self._last_text: Optional[str] = None
+        self._last_digest: Optional[str] = None
+
+    def digest(self, input_text: str) -> str:
+        """SHA-256 of the normalized input, remembered for the string last asked about"""
+        # The SDK hands every guardrail of an agent the same string object, so an identity
+        # check keeps later guardrails from re-normalizing and re-hashing it
+        if input_text is not self._last_text:
+            self._last_digest = hashlib.sha256(normalize_text(input_text).encode("utf-8")).hexdigest()
+            self._last_text = input_text
+        return self._last_digest
+
+    async def check(self, guardrail: Any, input_text: str, digest: Optional[str] = None) -> Verdict:
+        """Return a guardrail's verdict, evaluating it only on a cache miss"""
+        key = (type(guardrail), digest or self.digest(input_text))
+        verdict = self._cache.get(key)
+        if verdict is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return verdict
+
+        self.misses += 1
+        verdict = await guardrail.evaluate(input_text)
+        self._cache[key] = verdict
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return verdict
+
+    async def run(self, guardrails: List[Any], input_text: str) -> Verdict:
+        """Evaluate guardrails concurrently, stopping at the first failure"""
+        if not guardrails:
+            return True, None
+        # Normalized and hashed once for every guardrail, hit or miss
+        digest = self.digest(input_text)
+        tasks = [asyncio.ensure_future(self.check(guardrail, input_text, digest)) for guardrail in guardrails]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                passed, message = await next_done
+                if not passed:
+                    return False, message
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        return True, None
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self._cache),
+            "capacity": self.cache_size
+        }
+
+# Shared by every agent so delegated inputs hit the verdicts cached at the coordinator
+guardrail_runner = GuardrailRunner(cache_size=int(get_env("ERP_GUARDRAIL_CACHE_SIZE", "4096")))
+
+async def check_agent_guardrails(agent: Any, input_text: str) -> Verdict:
+    """Run every guardrail attached to an agent against the input"""
+    return await guardrail_runner.run(list(getattr(agent, "guardrails", None) or []), input_text)
+
+def _parse_mode_overrides(value: str) -> Dict[str, str]:
+    """Parse "Agent Name=mode,Other Agent=mode" into a dict"""
+    overrides = {}
+    for entry in value.split(","):
+        if "=" in entry:
+            name, mode = entry.split("=", 1)
+            overrides[name.strip()] = mode.strip().lower()
+    return overrides
+
+_agent_modes: Dict[str, str] = {}
+_mode_overrides = _parse_mode_overrides(get_env("ERP_GUARDRAIL_MODES", ""))
+_unguarded_agents: Dict[int, Tuple[Any, Any]] = {}
+
+def set_guardrail_mode(agent_name: str, mode: str):
+    """Choose whether an agent's guardrails run before or alongside its first model turn"""
+    if mode not in (SEQUENTIAL, OPTIMISTIC):
+        raise ValueError(f"Unknown guardrail mode: {mode}")
+    _agent_modes[agent_name] = mode
+
+def get_guardrail_mode(agent: Any) -> str:
+    name = getattr(agent, "name", None)
+    return _mode_overrides.get(name) or _agent_modes.get(name, SEQUENTIAL)
+
+def _unguarded(agent: Any) -> Any:
+    """Copy of the agent without guardrails, used once they are being enforced here instead"""
+    cached = _unguarded_agents.get(id(agent))
+    if cached is None or cached[0] is not agent:
+        cached = (agent, agent.clone(guardrails=[]))
+        _unguarded_agents[id(agent)] = cached
+    return cached[1]
+
+async def run_guarded(runner: Any, agent: Any, input_text: str, mode: Optional[str] = None) -> Any:
+    """Run an agent behind its guardrails.
+
+    Sequential mode finishes every guardrail before the run starts. Optimistic mode starts
+    the run immediately and checks guardrails alongside the first model turn; if one trips,
+    the run is cancelled and its output is never returned.
+    """
+    mode = mode or get_guardrail_mode(agent)
+    guardrails = list(getattr(agent, "guardrails", None) or [])
+
+    if mode != OPTIMISTIC or not guardrails:
+        passed, message = await guardrail_runner.run(guardrails, input_text)
+        if not passed:
+            raise GuardrailTripped(message)
+        # The agent re-checks its own guardrails, which are now cache hits
+        return await runner.run(agent, input_text)
+
+    run_task = asyncio.ensure_future(runner.run(_unguarded(agent), input_text))
+    try:
+        passed, message = await guardrail_runner.run(guardrails, input_text)
+    except BaseException:
+        run_task.cancel()
+        raise
+    if not passed:
+        run_task.cancel()
+        raise GuardrailTripped(message)
+    return await run_task
+
+class GuardedStream:
+    """A streamed agent run behind the agent's guardrails.
+
+    Iterate stream_events() for the run's events, then read final_output. Sequential mode
+    finishes every guardrail before the run starts. Optimistic mode starts the run at once
+    and holds its events back until the guardrails pass, so a blocked run never shows the
+    user any of its output.
+    """
+    _END = object()
+
+    def __init__(self, runner: Any, agent: Any, input_text: str, mode: Optional[str] = None):
+        self.runner = runner
+        self.agent = agent
+        self.input_text = input_text
+        self.mode = mode or get_guardrail_mode(agent)
+        self._result: Any = None
+
+    @property
+    def final_output(self) -> Any:
+        return self._result.final_output
+
+    async def stream_events(self) -> AsyncIterator[Any]:
+        guardrails = list(getattr(self.agent, "guardrails", None) or [])
+        if self.mode != OPTIMISTIC or not guardrails:
+            passed, message = await guardrail_runner.run(guardrails, self.input_text)
+            if not passed:
+                raise GuardrailTripped(message)
+            self._result = self.runner.run_streamed(self.agent, self.input_text)
+            try:
+                async for event in self._result.stream_events():
+                    yield event
+            finally:
+                self._stop()
+            return
+
+        self._result = self.runner.run_streamed(_unguarded(self.agent), self.input_text)
+        held: asyncio.Queue = asyncio.Queue()
+        pump = asyncio.ensure_future(self._pump(held))
+        try:
+            passed, message = await guardrail_runner.run(guardrails, self.input_text)
+            if not passed:
+                raise GuardrailTripped(message)
+            while True:
+                event = await held.get()
+                if event is self._END:
+                    break
+                yield event
+            # Re-raises the run's error, if it failed
+            await pump
+        finally:
+            if not pump.done():
+                pump.cancel()
+            self._stop()
+
+    async def _pump(self, held: asyncio.Queue):
+        try:
+            async for event in self._result.stream_events():
+                held.put_nowait(event)
+        finally:
+            held.put_nowait(self._END)
+
+    def _stop(self):
+        # The client left or a guardrail tripped before the run finished
+        if not self._result.is_complete:
+            self._result.cancel()
@@ -1,28 +1,49 @@
 from agents import Guardrail
+from guardrail_engine import create_guardrail_engine
+from guardrail_runner import guardrail_runner
+
+# Phrase lists for every guardrail, compiled once into a shared single-pass matcher.
+# Compliance can extend these through ERP_GUARDRAIL_PHRASES_FILE without code changes.
+GUARDRAIL_PHRASES = {
+    "FinanceGuardrail": (
+        ["transfer all", "maximum amount", "bypass approval", "override limit"],
+        "Potentially suspicious financial request detected"
+    ),
+    "HRGuardrail": (
+        ["salary", "personal", "ssn", "social security", "health", "medical"],
+        "Request may involve sensitive personal information, requires additional authorization"
+    ),
+    "SecurityGuardrail": (
+        ["admin access", "override security", "full access", "system privileges"],
+        "Request may involve security-sensitive operations"
+    ),
+}
+
+guardrail_engine = create_guardrail_engine(GUARDRAIL_PHRASES)
 
 class FinanceGuardrail(Guardrail):
     """Validate financial transactions for compliance"""
     async def check(self, input_text):
+        return await guardrail_runner.check(self, input_text)
+
+    async def evaluate(self, input_text):
         # Check for suspicious patterns in financial requests
-        red_flags = ["transfer all", "maximum amount", "bypass approval", "override limit"]
-        if any(flag in input_text.lower() for flag in red_flags):
-            return False, "Potentially suspicious financial request detected"
-        return True, None
+        return guardrail_engine.check("FinanceGuardrail", input_text)
 
 class HRGuardrail(Guardrail):
     """Validate HR data access for privacy compliance"""
     async def check(self, input_text):
+        return await guardrail_runner.check(self, input_text)
+
+    async def evaluate(self, input_text):
         # Check for sensitive information requests
-        sensitive_terms = ["salary", "personal", "ssn", "social security", "health", "medical"]
-        if any(term in input_text.lower() for term in sensitive_terms):
-            return False, "Request may involve sensitive personal information, requires additional authorization"
-        return True, None
+        return guardrail_engine.check("HRGuardrail", input_text)
 
 class SecurityGuardrail(Guardrail):
     """General security guardrail for all agents"""
     async def check(self, input_text):
+        return await guardrail_runner.check(self, input_text)
+
+    async def evaluate(self, input_text):
         # Check for security-related issues
-        security_flags = ["admin access", "override security", "full access", "system privileges"]
-        if any(flag in input_text.lower() for flag in security_flags):
-            return False, "Request may involve security-sensitive operations"
-        return True, None 
\ No newline at end of file
+        return guardrail_engine.check("SecurityGuardrail", input_text)
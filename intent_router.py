@@ -0,0 +1,163 @@
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+from guardrail_engine import normalize_text
+from load_env import get_env
+
+# Hand-picked vocabulary per domain, on top of the words found in each agent's tool names
+# and descriptions. Record ID prefixes are the strongest signal we get from a short request.
+DOMAIN_KEYWORDS = {
+    "finance": [
+        "account", "balance", "transaction", "ledger", "journal", "financial", "finance",
+        "income statement", "balance sheet", "cash flow", "revenue", "expense", "tax", "budget"
+    ],
+    "inventory": [
+        "inventory", "stock", "warehouse", "reorder", "purchase order", "supplier",
+        "restock", "product", "item", "receive", "shipment"
+    ],
+    "sales": [
+        "customer", "client", "sales", "sale", "sales order", "quote", "invoice",
+        "fulfill", "delivery", "ship"
+    ],
+    "hr": [
+        "employee", "payroll", "staff", "hire", "hiring", "department", "attendance",
+        "position", "leave", "hr", "salary"
+    ]
+}
+
+DOMAIN_ID_PATTERNS = {
+    "finance": [r"\bacc\d+\b", r"\btxn?\d+\b"],
+    "inventory": [r"\bitm\d+\b", r"\bpo-?\d+\b", r"\bwh\d+\b"],
+    "sales": [r"\bcust\d+\b", r"\bso-?\d+\b", r"\binv-?\d+\b"],
+    "hr": [r"\bemp\d+\b", r"\bdept\d+\b"]
+}
+
+KEYWORD_WEIGHT = 1.0
+TOOL_WORD_WEIGHT = 0.5
+ID_WEIGHT = 3.0
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "the", "for", "and", "or", "of", "to", "in", "on", "an", "a", "is", "me", "my", "our", "all",
+    "get", "check", "create", "update", "process", "record", "about", "information", "current",
+    "new", "system", "specified", "show", "list", "what", "how", "please", "can", "you"
+}
+
+def _stem(token: str) -> str:
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def _terms(text: str) -> List[str]:
+    """Stemmed unigrams and bigrams of a piece of text"""
+    tokens = [
+        _stem(token) for token in _TOKEN.findall(normalize_text(text))
+        if len(token) > 1 and token not in _STOPWORDS
+    ]
+    return tokens + [f"{first} {second}" for first, second in zip(tokens, tokens[1:])]
+
+def _tool_words(tool: Any) -> List[str]:
+    function = getattr(tool, "function", None)
+    name = getattr(tool, "name", None) or getattr(function, "__name__", "")
+    description = getattr(tool, "description", None) or ""
+    return _terms(name.replace("_", " ") + " " + description)
+
+@dataclass
+class RouteDecision:
+    agent: Any
+    domain: Optional[str]
+    confidence: float
+    fallback: bool
+    scores: Dict[str, float] = field(default_factory=dict)
+
+class IntentRouter:
+    """Routes clear single-domain requests straight to a specialist agent.
+
+    Requests the router is unsure about, or that span several domains, go to the
+    coordinator, which still decides with an LLM turn.
+    """
+    def __init__(self, fallback_agent: Any, min_confidence: float = 0.8, min_score: float = 1.0):
+        self.fallback_agent = fallback_agent
+        self.min_confidence = min_confidence
+        self.min_score = min_score
+        self._agents: Dict[str, Any] = {}
+        self._vocab: Dict[str, Dict[str, float]] = {}
+        self._id_patterns: Dict[str, List[re.Pattern]] = {}
+        self._weights: Dict[str, Dict[str, float]] = {}
+        self._routed = Counter()
+        self._fallbacks = 0
+        self._confidence_total = 0.0
+
+    def add_route(self, domain: str, agent: Any, keywords: Iterable[str] = (), id_patterns: Iterable[str] = ()):
+        """Register a specialist with its keywords; its tools contribute vocabulary too"""
+        vocab = {}
+        for tool in getattr(agent, "tools", None) or []:
+            for word in _tool_words(tool):
+                vocab.setdefault(word, TOOL_WORD_WEIGHT)
+        for keyword in keywords:
+            for word in _terms(keyword)[-1:]:
+                vocab[word] = KEYWORD_WEIGHT
+        self._agents[domain] = agent
+        self._vocab[domain] = vocab
+        self._id_patterns[domain] = [re.compile(pattern) for pattern in id_patterns]
+        self._compile_weights()
+
+    def _compile_weights(self):
+        # A word shared by several domains ("order") is split between them in proportion
+        # to how strongly each one claims it, so a keyword outweighs a stray tool word
+        totals = Counter()
+        for vocab in self._vocab.values():
+            totals.update(vocab)
+        self._weights = {
+            domain: {word: weight * weight / totals[word] for word, weight in vocab.items()}
+            for domain, vocab in self._vocab.items()
+        }
+
+    def score(self, input_text: str) -> Dict[str, float]:
+        terms: Set[str] = set(_terms(input_text))
+        normalized = normalize_text(input_text)
+        scores = {}
+        for domain, weights in self._weights.items():
+            score = sum(weights[term] for term in terms if term in weights)
+            score += ID_WEIGHT * sum(len(pattern.findall(normalized)) for pattern in self._id_patterns[domain])
+            scores[domain] = score
+        return scores
+
+    def route(self, input_text: str) -> RouteDecision:
+        scores = self.score(input_text)
+        total = sum(scores.values())
+        domain = max(scores, key=scores.get) if total else None
+        confidence = scores[domain] / total if domain else 0.0
+
+        direct = domain is not None and scores[domain] >= self.min_score and confidence >= self.min_confidence
+        if direct:
+            decision = RouteDecision(self._agents[domain], domain, confidence, False, scores)
+            self._routed[domain] += 1
+        else:
+            decision = RouteDecision(self.fallback_agent, domain, confidence, True, scores)
+            self._fallbacks += 1
+        self._confidence_total += confidence
+        return decision
+
+    def metrics(self) -> Dict[str, Any]:
+        requests = sum(self._routed.values()) + self._fallbacks
+        return {
+            "requests": requests,
+            "routed_direct": dict(self._routed),
+            "fallbacks": self._fallbacks,
+            "fallback_rate": self._fallbacks / requests if requests else 0.0,
+            "mean_confidence": self._confidence_total / requests if requests else 0.0,
+            "min_confidence": self.min_confidence
+        }
+
+def create_intent_router(coordinator: Any, specialists: Dict[str, Any]) -> IntentRouter:
+    """Build a router over the specialist agents that falls back to the coordinator"""
+    router = IntentRouter(
+        coordinator,
+        min_confidence=float(get_env("ERP_ROUTER_MIN_CONFIDENCE", "0.8")),
+        min_score=float(get_env("ERP_ROUTER_MIN_SCORE", "1.0"))
+    )
+    for domain, agent in specialists.items():
+        router.add_route(domain, agent, DOMAIN_KEYWORDS.get(domain, []), DOMAIN_ID_PATTERNS.get(domain, []))
+    return router
@@ -0,0 +1,376 @@
+"""Background jobs for long-running ERP operations: payroll runs, reports and order batches.
+
+Jobs are kept in a local SQLite file (ERP_JOB_DB), so queued work survives a restart, and run
+in a pool of ERP_JOB_WORKERS separate processes. A month-end payroll run then neither holds
+the agent run that started it nor competes with the chat server's event loop and GIL: the
+tool call returns a job ID at once and the agent can check on it with get_job_status.
+
+Each worker process keeps its own event loop and database pool for every job it runs. Workers
+send progress back over a multiprocessing queue; the parent records it in the job store and
+passes every status change to the notify callback, which the chat server uses to push job
+events to the user who started the job.
+
+Jobs left running by a crash are queued again on start. Every job kind is safe to repeat:
+payroll skips employees already paid for the period, the order drain only claims pending
+orders and reports only read.
+"""
+import asyncio
+import contextvars
+import json
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from database import SQLiteBackend, create_database, set_database, to_jsonable
+from load_env import get_env
+from query_catalog import query_catalog
+from repository import RepositoryError, new_id
+
+JOB_DB_PATH = get_env("ERP_JOB_DB", "erp_jobs.db")
+JOB_WORKERS = int(get_env("ERP_JOB_WORKERS", "2"))
+MAX_JOB_LIST = 50
+
+JOB_STATUSES = ("queued", "running", "succeeded", "failed", "cancelled")
+
+JOBS_SCHEMA = """CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    params TEXT NOT NULL,
+    user_id TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    started_at TEXT,
+    finished_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user_id, created_at);"""
+
+# The chat user whose request is being handled; jobs submitted from tool calls belong to them
+current_user: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_user", default=None)
+
+ProgressCallback = Callable[[float, str], None]
+NotifyCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# ===== JOB HANDLERS (run in the worker processes) =====
+async def _payroll_job(params: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    from payroll_engine import payroll_engine
+    period_start = date.fromisoformat(params["period_start"]) if params.get("period_start") else None
+    progress(0.1, "Computing payroll")
+    return await payroll_engine.run_payroll(params.get("department"), period_start)
+
+async def _report_job(params: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    from financial_reports import report_engine
+    progress(0.1, f"Building the {params['report_type']} report")
+    report = await report_engine.generate_report(
+        params["report_type"], date.fromisoformat(params["start_date"]), date.fromisoformat(params["end_date"])
+    )
+    return {"report_type": params["report_type"], "report": report}
+
+async def _order_processing_job(params: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    from order_pipeline import order_pipeline
+    limit = params.get("limit")
+    pending = await order_pipeline.database.fetchrow(
+        "SELECT COUNT(*) AS count FROM sales_orders WHERE status IN ('draft', 'confirmed')"
+    )
+    total = min(pending["count"], limit) if limit else pending["count"]
+    counts: Dict[str, int] = {}
+    done = 0
+    while not limit or done < limit:
+        batch = order_pipeline.batch_size if not limit else min(order_pipeline.batch_size, limit - done)
+        outcomes = await order_pipeline.process_orders(limit=batch)
+        if not outcomes:
+            break
+        done += len(outcomes)
+        for outcome in outcomes:
+            counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+        # Orders placed meanwhile are drained too, so the total can grow
+        total = max(total, done)
+        progress(done / total, f"{done:,} of {total:,} orders processed")
+    return {"orders_processed": done, "counts": counts}
+
+JOB_HANDLERS: Dict[str, Callable[[Dict[str, Any], ProgressCallback], Awaitable[Dict[str, Any]]]] = {
+    "payroll": _payroll_job,
+    "financial_report": _report_job,
+    "process_orders": _order_processing_job
+}
+
+# Tables each kind writes; the server drops cached catalog results for them as a job commits work
+JOB_TABLES = {
+    "payroll": ("payroll",),
+    "financial_report": (),
+    "process_orders": ("sales_orders", "inventory", "stock_movements", "invoices")
+}
+
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_progress: Optional[Any] = None
+
+def _init_worker(progress_queue: Any, connection_string: Optional[str]):
+    global _worker_loop, _worker_progress
+    _worker_progress = progress_queue
+    _worker_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_worker_loop)
+    if connection_string:
+        set_database(create_database(connection_string))
+
+def _run_job(job_id: str, kind: str, params: Dict[str, Any]) -> str:
+    """Run one job in a worker process; the result comes back as JSON"""
+    def progress(fraction: float, message: str):
+        _worker_progress.put((job_id, min(max(fraction, 0.0), 1.0), message))
+
+    result = _worker_loop.run_until_complete(JOB_HANDLERS[kind](params, progress))
+    return json.dumps(result, default=to_jsonable)
+
+# ===== QUEUE (runs in the server process) =====
+class JobQueue:
+    """Durable job queue backed by SQLite, executed by a pool of worker processes"""
+    def __init__(self, path: str = JOB_DB_PATH, workers: int = JOB_WORKERS,
+                 connection_string: Optional[str] = None):
+        self.path = path
+        self.workers = max(1, workers)
+        # Database for the workers; by default each one reads ERP_DB_CONNECTION itself
+        self.connection_string = connection_string
+        self.notify: Optional[NotifyCallback] = None
+        self._store: Optional[SQLiteBackend] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._progress_queue: Optional[Any] = None
+        self._progress_reader: Optional[threading.Thread] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running: Dict[str, asyncio.Task] = {}
+        self._start_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._dispatcher is not None
+
+    async def start(self, notify: Optional[NotifyCallback] = None):
+        """Open the job store, requeue interrupted jobs and start the workers"""
+        if notify is not None:
+            self.notify = notify
+        async with self._start_lock:
+            if self.started:
+                return
+            self._store = SQLiteBackend(self.path, pool_size=1)
+            await self._store.execute_script(JOBS_SCHEMA)
+            requeued = await self._store.execute(
+                "UPDATE jobs SET status = 'queued', progress = 0, message = 'Requeued after a restart', started_at = NULL WHERE status = 'running'"
+            )
+            if requeued:
+                print(f"Requeued {requeued} interrupted job(s)")
+
+            loop = asyncio.get_running_loop()
+            context = multiprocessing.get_context("spawn")
+            self._progress_queue = context.Queue()
+            self._pool = self._create_pool(context)
+            self._progress_reader = threading.Thread(
+                target=self._read_progress, args=(loop,), name="erp-job-progress", daemon=True
+            )
+            self._progress_reader.start()
+            self._wakeup = asyncio.Event()
+            self._wakeup.set()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _create_pool(self, context: Any) -> ProcessPoolExecutor:
+        # spawn: workers never inherit the server's event loop, sockets or database pool
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=context,
+            initializer=_init_worker, initargs=(self._progress_queue, self.connection_string)
+        )
+
+    async def close(self):
+        """Stop dispatching; running jobs are left to be requeued on the next start"""
+        if not self.started:
+            return
+        self._dispatcher.cancel()
+        await asyncio.gather(self._dispatcher, return_exceptions=True)
+        self._dispatcher = None
+        for task in self._running.values():
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+        self._running.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        self._progress_queue.put(None)
+        self._progress_reader.join(timeout=5)
+        self._progress_queue.close()
+        await self._store.close()
+
+    async def submit(self, kind: str, params: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Queue a job, or return the user's identical job already queued or running"""
+        if kind not in JOB_HANDLERS:
+            raise RepositoryError(f"Unknown job kind {kind}, expected one of {', '.join(JOB_HANDLERS)}")
+        await self.start()
+        encoded = json.dumps(params, sort_keys=True, default=to_jsonable)
+        async with self._store.transaction() as db:
+            # Another user's identical job is theirs to watch and cancel, so it is not shared
+            existing = await db.fetch(
+                """SELECT * FROM jobs
+WHERE kind = :kind AND params = :params AND user_id IS :user_id AND status IN ('queued', 'running')
+ORDER BY created_at LIMIT 1""",
+                {"kind": kind, "params": encoded, "user_id": user_id}
+            )
+            if existing:
+                return self._job(existing[0])
+            job_id = new_id("JOB")
+            await db.execute(
+                """INSERT INTO jobs (job_id, kind, params, user_id, status, message, created_at)
+VALUES (:job_id, :kind, :params, :user_id, 'queued', 'Waiting for a worker', :now)""",
+                {"job_id": job_id, "kind": kind, "params": encoded, "user_id": user_id, "now": self._now()}
+            )
+        self._wakeup.set()
+        return await self._load(job_id)
+
+    async def get(self, job_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """A job submitted by user_id (jobs submitted without a user when it is None)"""
+        await self.start()
+        row = await self._store.fetchrow(
+            "SELECT * FROM jobs WHERE job_id = :job_id AND user_id IS :user_id",
+            {"job_id": job_id, "user_id": user_id}
+        )
+        return self._job(row) if row else None
+
+    async def _load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        row = await self._store.fetchrow("SELECT * FROM jobs WHERE job_id = :job_id", {"job_id": job_id})
+        return self._job(row) if row else None
+
+    async def list(self, user_id: Optional[str], status: Optional[str] = None,
+                   limit: int = 20) -> List[Dict[str, Any]]:
+        """A user's most recent jobs first, without their results"""
+        if not user_id:
+            raise RepositoryError("Jobs can only be listed for a user")
+        await self.start()
+        rows = await self._store.fetch(
+            """SELECT * FROM jobs
+WHERE user_id = :user_id AND (:status IS NULL OR status = :status)
+ORDER BY created_at DESC
+LIMIT :limit""",
+            {"user_id": user_id, "status": status, "limit": max(1, min(limit, MAX_JOB_LIST))}
+        )
+        return [self._job(row, with_result=False) for row in rows]
+
+    async def cancel(self, job_id: str, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Cancel a job of user_id's that has not started yet"""
+        await self.start()
+        cancelled = await self._store.execute(
+            """UPDATE jobs SET status = 'cancelled', message = 'Cancelled', finished_at = :now
+WHERE job_id = :job_id AND user_id IS :user_id AND status = 'queued'""",
+            {"job_id": job_id, "user_id": user_id, "now": self._now()}
+        )
+        job = await self.get(job_id, user_id)
+        if job is None:
+            raise RepositoryError(f"Job {job_id} not found")
+        if not cancelled:
+            raise RepositoryError(f"Job {job_id} is already {job['status']} and can no longer be cancelled")
+        await self._notify(job)
+        return job
+
+    async def _dispatch(self):
+        slots = asyncio.Semaphore(self.workers)
+        while True:
+            await slots.acquire()
+            job = await self._claim()
+            while job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                job = await self._claim()
+            task = asyncio.create_task(self._execute(job))
+            self._running[job["job_id"]] = task
+            task.add_done_callback(lambda _, job_id=job["job_id"]: (self._running.pop(job_id, None), slots.release()))
+
+    async def _claim(self) -> Optional[Dict[str, Any]]:
+        async with self._store.transaction() as db:
+            rows = await db.fetch("SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at, rowid LIMIT 1")
+            if not rows:
+                return None
+            await db.execute(
+                """UPDATE jobs SET status = 'running', message = 'Started', started_at = :now
+WHERE job_id = :job_id""",
+                {"job_id": rows[0]["job_id"], "now": self._now()}
+            )
+        job = {**self._job(rows[0]), "status": "running", "message": "Started"}
+        await self._notify(job)
+        return job
+
+    async def _execute(self, job: Dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        pool = self._pool
+        try:
+            result = await loop.run_in_executor(pool, _run_job, job["job_id"], job["kind"], job["params"])
+        except asyncio.CancelledError:
+            raise
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory) and took the pool with it; the first job to notice replaces it
+            if self._pool is pool:
+                self._pool = self._create_pool(multiprocessing.get_context("spawn"))
+            await self._finish(job["job_id"], "failed", error="The worker process running this job exited")
+        except Exception as e:
+            await self._finish(job["job_id"], "failed", error=f"{type(e).__name__}: {e}")
+        else:
+            await self._finish(job["job_id"], "succeeded", result=result)
+
+    async def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None):
+        await self._store.execute(
+            """UPDATE jobs SET status = :status, progress = CASE WHEN :status = 'succeeded' THEN 1 ELSE progress END,
+       message = :message, result = :result, error = :error, finished_at = :now
+WHERE job_id = :job_id""",
+            {
+                "job_id": job_id, "status": status, "result": result, "error": error, "now": self._now(),
+                "message": "Finished" if status == "succeeded" else "Failed"
+            }
+        )
+        job = await self._load(job_id)
+        query_catalog.invalidate_tables(*JOB_TABLES[job["kind"]])
+        await self._notify(job)
+
+    def _read_progress(self, loop: asyncio.AbstractEventLoop):
+        while True:
+            update = self._progress_queue.get()
+            if update is None:
+                return
+            try:
+                asyncio.run_coroutine_threadsafe(self._record_progress(*update), loop)
+            except RuntimeError:
+                # The event loop is closed; nothing is left to report to
+                return
+
+    async def _record_progress(self, job_id: str, progress: float, message: str):
+        updated = await self._store.execute(
+            "UPDATE jobs SET progress = :progress, message = :message WHERE job_id = :job_id AND status = 'running'",
+            {"job_id": job_id, "progress": progress, "message": message}
+        )
+        if updated:
+            job = await self._load(job_id)
+            query_catalog.invalidate_tables(*JOB_TABLES[job["kind"]])
+            await self._notify(job)
+
+    async def _notify(self, job: Optional[Dict[str, Any]]):
+        if job is None or self.notify is None or not job["user_id"]:
+            return
+        event = {"type": "job", "timestamp": datetime.now().isoformat(), **job}
+        try:
+            await self.notify(job["user_id"], event)
+        except Exception as e:
+            # A closed websocket must not stop the job bookkeeping
+            print(f"Could not notify {job['user_id']} about job {job['job_id']}: {e}")
+
+    @staticmethod
+    def _job(row: Dict[str, Any], with_result: bool = True) -> Dict[str, Any]:
+        job = {key: row[key] for key in (
+            "job_id", "kind", "user_id", "status", "progress", "message", "error", "created_at", "started_at", "finished_at"
+        )}
+        job["params"] = json.loads(row["params"])
+        if with_result:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        return job
+
+    @staticmethod
+    def _now() -> str:
+        return datetime.now().isoformat(timespec="milliseconds")
+
+# Shared by the job tools and the chat server; started on first use
+job_queue = JobQueue()
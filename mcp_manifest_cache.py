@@ -0,0 +1,54 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, List, Optional
+from load_env import get_env
+
+def config_fingerprint(package_spec: str, config: Dict[str, Any]) -> str:
+    """Hash of an MCP server's package and generated config, used as the manifest cache key"""
+    payload = json.dumps({"package": package_spec, "config": config}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def tool_definition(tool: Any) -> Dict[str, Any]:
+    """Plain JSON form of an MCP tool, whether it came from list_tools() or the cache"""
+    if isinstance(tool, dict):
+        return tool
+    return {
+        "name": tool.name,
+        "description": getattr(tool, "description", None),
+        "inputSchema": getattr(tool, "inputSchema", None)
+    }
+
+class ToolManifestCache:
+    """On-disk cache of the tools each MCP server exposes, keyed by config fingerprint"""
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def _path(self, server_name: str, fingerprint: str) -> str:
+        return os.path.join(self.cache_dir, f"{server_name}-{fingerprint}.json")
+
+    def load(self, server_name: str, fingerprint: str) -> Optional[List[Dict[str, Any]]]:
+        try:
+            with open(self._path(server_name, fingerprint), "r") as f:
+                return json.load(f)["tools"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: ignoring unreadable MCP manifest for '{server_name}': {e}")
+            return None
+
+    def save(self, server_name: str, fingerprint: str, tools: List[Dict[str, Any]]):
+        """Write the manifest atomically so concurrent workers never read a partial file"""
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f".{server_name}-", suffix=".tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"server": server_name, "fingerprint": fingerprint, "tools": tools}, f)
+            os.replace(temp_path, self._path(server_name, fingerprint))
+        except Exception as e:
+            print(f"Warning: could not write MCP manifest for '{server_name}': {e}")
+
+manifest_cache = ToolManifestCache(
+    get_env("ERP_MCP_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "erp-ai-system", "mcp"))
+)
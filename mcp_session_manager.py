@@ -0,0 +1,242 @@
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+class MCPSessionPool:
+    """A fixed-size pool of warm sessions to one MCP server.
+
+    Sessions are started once and reused for every tool call. Idle sessions are health
+    checked in the background, and a session that fails a check or a call is replaced
+    with a fresh one, retrying with exponential backoff. A pool that fails to start keeps
+    reconnecting in the background; callers wait at most acquire_timeout for a session.
+    """
+    def __init__(self, name: str, server_factory: Callable[[], Any], size: int = 2,
+                 health_check_interval: float = 30.0, health_check_timeout: float = 10.0,
+                 max_backoff: float = 30.0, acquire_timeout: float = 30.0):
+        self.name = name
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self.health_check_timeout = health_check_timeout
+        self.max_backoff = max_backoff
+        self.acquire_timeout = acquire_timeout
+        self._server_factory = server_factory
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._sessions: List[Any] = []
+        self._tasks: List[asyncio.Task] = []
+        self._closed = False
+        self._ready = asyncio.Event()
+        self.reconnects = 0
+        self.cancelled_calls = 0
+        self.status = "stopped"
+        self.error: Optional[str] = None
+
+    async def _connect(self, max_attempts: Optional[int] = None) -> Any:
+        """Start a new session, retrying with exponential backoff"""
+        attempt = 0
+        while True:
+            server = self._server_factory()
+            try:
+                await server.connect()
+                return server
+            except asyncio.CancelledError:
+                await self._cleanup(server)
+                raise
+            except Exception as e:
+                await self._cleanup(server)
+                attempt += 1
+                if max_attempts is not None and attempt >= max_attempts:
+                    raise
+                delay = min(self.max_backoff, 0.5 * 2 ** attempt) * (0.5 + random.random() / 2)
+                print(f"Warning: MCP server '{self.name}' failed to start ({e}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def _cleanup(self, server: Any):
+        try:
+            await server.cleanup()
+        except Exception as e:
+            print(f"Warning: error closing MCP session for '{self.name}': {e}")
+
+    async def _add_session(self, max_attempts: Optional[int] = None):
+        server = await self._connect(max_attempts)
+        if self._closed:
+            await self._cleanup(server)
+            return
+        self._sessions.append(server)
+        self._idle.put_nowait(server)
+        if self.status == "failed":
+            # Reconnected after a failed start
+            print(f"MCP server '{self.name}' is back after: {self.error}")
+            self.status, self.error = "ready", None
+        self._ready.set()
+
+    def _replace(self, server: Any):
+        """Drop a broken session and start a replacement in the background"""
+        if server in self._sessions:
+            self._sessions.remove(server)
+        self.reconnects += 1
+
+        async def replace():
+            await self._cleanup(server)
+            if not self._closed:
+                await self._add_session()
+        self._spawn(replace())
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self._tasks.append(task)
+        task.add_done_callback(lambda done: self._tasks.remove(done) if done in self._tasks else None)
+
+    async def start(self, max_attempts: int = 3):
+        """Open every session up front; fails if the server cannot be started at all"""
+        tasks = [asyncio.ensure_future(self._add_session(max_attempts)) for _ in range(self.size)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            # After a failure, stop the sessions still starting; reconnect() opens what is missing
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._spawn(self._health_loop())
+
+    def reconnect(self):
+        """Keep opening the missing sessions of a pool that failed to start, with backoff"""
+        async def reconnect():
+            await asyncio.gather(*(self._add_session() for _ in range(self.size - len(self._sessions))))
+        self._spawn(reconnect())
+        self._spawn(self._health_loop())
+
+    async def wait_ready(self):
+        """Wait until the pool has a session, e.g. after reconnecting from a failed start"""
+        await self._ready.wait()
+
+    @asynccontextmanager
+    async def session(self):
+        """Borrow a warm session for the duration of the block"""
+        if self._closed:
+            raise RuntimeError(f"MCP session pool '{self.name}' is closed")
+        # Waits for the first session if the server is still starting or reconnecting
+        try:
+            server = await asyncio.wait_for(self._idle.get(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            reason = f": the server failed to start ({self.error}) and is reconnecting" if self.error else ""
+            raise RuntimeError(f"No MCP session for '{self.name}' became free within {self.acquire_timeout:g}s{reason}") from None
+        if server is None:
+            # Closed while we were waiting; pass the wake-up on to the next waiter
+            self._idle.put_nowait(None)
+            raise RuntimeError(f"MCP session pool '{self.name}' is closed")
+        healthy = False
+        try:
+            yield server
+            healthy = True
+        except asyncio.CancelledError:
+            # The request was cancelled or its client went away; the call is abandoned
+            self.cancelled_calls += 1
+            raise
+        finally:
+            # Errors or cancellation mid-call leave the stdio stream in an unknown state
+            if healthy and not self._closed:
+                self._idle.put_nowait(server)
+            elif not self._closed:
+                self._replace(server)
+
+    async def list_tools(self) -> List[Any]:
+        async with self.session() as server:
+            return await server.list_tools()
+
+    async def call_tool(self, tool_name: str, arguments: Optional[Dict[str, Any]] = None) -> Any:
+        async with self.session() as server:
+            return await server.call_tool(tool_name, arguments or {})
+
+    async def _health_loop(self):
+        while not self._closed:
+            await asyncio.sleep(self.health_check_interval)
+            # Only check sessions that are idle right now; busy ones are proving themselves
+            for _ in range(self._idle.qsize()):
+                server = self._idle.get_nowait()
+                if server is None:
+                    return
+                try:
+                    await asyncio.wait_for(server.list_tools(), timeout=self.health_check_timeout)
+                    self._idle.put_nowait(server)
+                except asyncio.CancelledError:
+                    self._idle.put_nowait(server)
+                    raise
+                except Exception as e:
+                    print(f"Warning: MCP session for '{self.name}' failed health check: {e}")
+                    self._replace(server)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "size": self.size,
+            "open": len(self._sessions),
+            "idle": self._idle.qsize(),
+            "reconnects": self.reconnects,
+            "cancelled_calls": self.cancelled_calls
+        }
+
+    async def close(self):
+        self._closed = True
+        if self.status != "failed":
+            self.status = "closed"
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        sessions, self._sessions = self._sessions, []
+        await asyncio.gather(*(self._cleanup(server) for server in sessions))
+        self._idle.put_nowait(None)
+
+class MCPSessionManager:
+    """Owns the MCP session pools for the lifetime of the application"""
+    def __init__(self):
+        self.pools: Dict[str, MCPSessionPool] = {}
+
+    def add_server(self, name: str, server_factory: Callable[[], Any], size: int = 2, **pool_options):
+        self.pools[name] = MCPSessionPool(name, server_factory, size=size, **pool_options)
+
+    async def start_server(self, name: str, timeout: Optional[float] = None):
+        """Start one server's pool; after the timeout it fails and keeps reconnecting in the background"""
+        pool = self.pools[name]
+        pool.status = "starting"
+        try:
+            await asyncio.wait_for(pool.start(), timeout)
+        except asyncio.CancelledError:
+            await pool.close()
+            raise
+        except Exception as e:
+            pool.status = "failed"
+            pool.error = "timed out" if isinstance(e, asyncio.TimeoutError) else str(e)
+            pool.reconnect()
+            raise
+        pool.status = "ready"
+
+    async def start(self, timeouts: Optional[Dict[str, float]] = None):
+        """Start every server concurrently, so cold start costs the slowest one, not the sum"""
+        timeouts = timeouts or {}
+        results = await asyncio.gather(
+            *(self.start_server(name, timeouts.get(name)) for name in self.pools),
+            return_exceptions=True
+        )
+        for name, result in zip(list(self.pools), results):
+            if isinstance(result, BaseException):
+                print(f"Warning: MCP server '{name}' did not start: {self.pools[name].error}")
+
+    def status(self) -> Dict[str, str]:
+        return {name: pool.status for name, pool in self.pools.items()}
+
+    async def list_tools(self, server_name: str) -> List[Any]:
+        return await self.pools[server_name].list_tools()
+
+    async def call_tool(self, server_name: str, tool_name: str, arguments: Optional[Dict[str, Any]] = None) -> Any:
+        return await self.pools[server_name].call_tool(tool_name, arguments)
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    async def stop(self):
+        pools, self.pools = self.pools, {}
+        await asyncio.gather(*(pool.close() for pool in pools.values()))
+
+# Shared by the app so tool calls reuse warm sessions instead of spawning npx per call
+mcp_manager = MCPSessionManager()
@@ -0,0 +1,35 @@
+-- Performance indexes for the ERP schema
+-- Covers foreign keys and the filters, joins and groupings used by the query catalog,
+-- the repository and the ERP functions. Safe to run more than once.
+-- Verify plans with: python check_query_plans.py
+
+SET search_path TO erp;
+
+-- Finance: ledger lookups per account, in date order
+CREATE INDEX IF NOT EXISTS idx_transactions_account_date ON transactions (account_id, transaction_date);
+
+-- Inventory: valuation and low stock per warehouse, movement history per product
+CREATE INDEX IF NOT EXISTS idx_inventory_warehouse ON inventory (warehouse_id);
+CREATE INDEX IF NOT EXISTS idx_inventory_low_stock ON inventory (warehouse_id, product_id)
+    WHERE quantity < reorder_point;
+CREATE INDEX IF NOT EXISTS idx_stock_movements_product_date ON stock_movements (product_id, movement_date);
+CREATE INDEX IF NOT EXISTS idx_stock_movements_warehouse ON stock_movements (warehouse_id);
+CREATE INDEX IF NOT EXISTS idx_purchase_orders_status ON purchase_orders (status, order_date);
+
+-- Sales: order lines, sales per customer and per period, unpaid invoices by due date
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items (order_id);
+CREATE INDEX IF NOT EXISTS idx_order_items_product ON order_items (product_id);
+CREATE INDEX IF NOT EXISTS idx_sales_orders_customer ON sales_orders (customer_id, total_amount);
+CREATE INDEX IF NOT EXISTS idx_sales_orders_date ON sales_orders (order_date, total_amount);
+CREATE INDEX IF NOT EXISTS idx_invoices_order ON invoices (order_id);
+CREATE INDEX IF NOT EXISTS idx_invoices_unpaid_due ON invoices (due_date)
+    WHERE status != 'paid';
+CREATE INDEX IF NOT EXISTS idx_payments_invoice ON payments (invoice_id);
+
+-- HR: active staff per department, payroll runs per employee and period
+CREATE INDEX IF NOT EXISTS idx_employees_department ON employees (department_id)
+    WHERE is_active;
+CREATE INDEX IF NOT EXISTS idx_positions_department ON positions (department_id);
+CREATE INDEX IF NOT EXISTS idx_payroll_employee_period ON payroll (employee_id, pay_period_start);
+
+ANALYZE;
@@ -0,0 +1,91 @@
+-- Sales rollups maintained incrementally from sales_orders
+-- get_top_customers and get_monthly_sales read these instead of aggregating every order,
+-- so their cost depends on the number of customers and months, not orders.
+-- Row triggers also fire for COPY and bulk loads. Safe to run more than once.
+
+SET search_path TO erp;
+
+CREATE TABLE IF NOT EXISTS sales_by_customer (
+    customer_id VARCHAR(20) PRIMARY KEY REFERENCES customers(customer_id),
+    order_count INT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS sales_by_month (
+    month DATE PRIMARY KEY,
+    order_count INT NOT NULL DEFAULT 0,
+    total_amount DECIMAL(15, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sales_by_customer_total ON sales_by_customer (total_amount DESC);
+
+-- Add one order's contribution (or remove it, with negative deltas) to both rollups
+CREATE OR REPLACE FUNCTION apply_sales_rollup(
+    customer_id_param VARCHAR, order_date_param DATE, orders_delta INT, amount_delta DECIMAL
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO sales_by_customer (customer_id, order_count, total_amount)
+    VALUES (customer_id_param, orders_delta, amount_delta)
+    ON CONFLICT (customer_id) DO UPDATE
+    SET order_count = sales_by_customer.order_count + EXCLUDED.order_count,
+        total_amount = sales_by_customer.total_amount + EXCLUDED.total_amount,
+        updated_at = NOW();
+
+    INSERT INTO sales_by_month (month, order_count, total_amount)
+    VALUES (DATE_TRUNC('month', order_date_param)::DATE, orders_delta, amount_delta)
+    ON CONFLICT (month) DO UPDATE
+    SET order_count = sales_by_month.order_count + EXCLUDED.order_count,
+        total_amount = sales_by_month.total_amount + EXCLUDED.total_amount,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION maintain_sales_rollups()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.customer_id = OLD.customer_id
+       AND NEW.order_date = OLD.order_date
+       AND NEW.total_amount = OLD.total_amount THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM apply_sales_rollup(OLD.customer_id, OLD.order_date, -1, -OLD.total_amount);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM apply_sales_rollup(NEW.customer_id, NEW.order_date, 1, NEW.total_amount);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sales_orders_rollups ON sales_orders;
+CREATE TRIGGER sales_orders_rollups
+AFTER INSERT OR DELETE OR UPDATE OF customer_id, order_date, total_amount ON sales_orders
+FOR EACH ROW EXECUTE FUNCTION maintain_sales_rollups();
+
+-- Rebuild both rollups from sales_orders, e.g. after this migration or a manual repair
+CREATE OR REPLACE FUNCTION refresh_sales_rollups()
+RETURNS VOID AS $$
+BEGIN
+    -- Blocks writers (and so the triggers) while the rollups are rebuilt
+    LOCK TABLE sales_orders IN SHARE MODE;
+    DELETE FROM sales_by_customer;
+    DELETE FROM sales_by_month;
+
+    INSERT INTO sales_by_customer (customer_id, order_count, total_amount)
+    SELECT customer_id, COUNT(*), SUM(total_amount)
+    FROM sales_orders
+    GROUP BY customer_id;
+
+    INSERT INTO sales_by_month (month, order_count, total_amount)
+    SELECT DATE_TRUNC('month', order_date)::DATE, COUNT(*), SUM(total_amount)
+    FROM sales_orders
+    GROUP BY 1;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_sales_rollups();
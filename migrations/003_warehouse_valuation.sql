@@ -0,0 +1,124 @@
+-- Warehouse valuation summary maintained incrementally from inventory
+-- calculate_inventory_value() reads one row per warehouse instead of summing
+-- quantity * unit_cost over all of inventory. Safe to run more than once.
+-- Verify against a full recompute with: python reconcile_valuation.py
+
+SET search_path TO erp;
+
+CREATE TABLE IF NOT EXISTS warehouse_valuation (
+    warehouse_id VARCHAR(10) PRIMARY KEY REFERENCES warehouses(warehouse_id),
+    item_count INT NOT NULL DEFAULT 0,
+    total_quantity BIGINT NOT NULL DEFAULT 0,
+    total_value DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- Add one inventory row's contribution (or remove it, with negative deltas)
+CREATE OR REPLACE FUNCTION apply_warehouse_valuation(
+    warehouse_id_param VARCHAR, items_delta INT, quantity_delta BIGINT, value_delta DECIMAL
+)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO warehouse_valuation (warehouse_id, item_count, total_quantity, total_value)
+    VALUES (warehouse_id_param, items_delta, quantity_delta, value_delta)
+    ON CONFLICT (warehouse_id) DO UPDATE
+    SET item_count = warehouse_valuation.item_count + EXCLUDED.item_count,
+        total_quantity = warehouse_valuation.total_quantity + EXCLUDED.total_quantity,
+        total_value = warehouse_valuation.total_value + EXCLUDED.total_value,
+        updated_at = NOW();
+END;
+$$ LANGUAGE plpgsql;
+
+-- Apply the net change of one inventory statement, one upsert per warehouse in warehouse_id
+-- order. Every writer locks its inventory rows first and the valuation rows after them, in
+-- the same order, so concurrent statements queue on a valuation row instead of deadlocking,
+-- and a bulk statement updates each warehouse once rather than once per inventory row.
+CREATE OR REPLACE FUNCTION maintain_warehouse_valuation()
+RETURNS TRIGGER AS $$
+DECLARE
+    changes TEXT;
+    delta RECORD;
+BEGIN
+    -- Each new row version adds its contribution, each old one takes it away again
+    changes := CASE TG_OP
+        WHEN 'INSERT' THEN
+            'SELECT warehouse_id, 1 AS items, quantity, quantity * unit_cost AS value FROM new_rows'
+        WHEN 'DELETE' THEN
+            'SELECT warehouse_id, -1 AS items, -quantity AS quantity, -(quantity * unit_cost) AS value FROM old_rows'
+        ELSE
+            'SELECT warehouse_id, 1 AS items, quantity, quantity * unit_cost AS value FROM new_rows
+             UNION ALL
+             SELECT warehouse_id, -1, -quantity, -(quantity * unit_cost) FROM old_rows'
+    END;
+    FOR delta IN EXECUTE
+        'SELECT warehouse_id, SUM(items)::INT AS items, SUM(quantity)::BIGINT AS quantity, SUM(value) AS value
+         FROM (' || changes || ') c
+         GROUP BY warehouse_id
+         HAVING SUM(items) != 0 OR SUM(quantity) != 0 OR SUM(value) != 0
+         ORDER BY warehouse_id'
+    LOOP
+        PERFORM apply_warehouse_valuation(delta.warehouse_id, delta.items, delta.quantity, delta.value);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level, with the changed rows as transition tables. PostgreSQL allows one event
+-- per trigger with transition tables and no column list, so updates of other columns
+-- arrive too and net out to no change.
+DROP TRIGGER IF EXISTS inventory_valuation ON inventory;
+DROP TRIGGER IF EXISTS inventory_valuation_insert ON inventory;
+CREATE TRIGGER inventory_valuation_insert
+AFTER INSERT ON inventory
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION maintain_warehouse_valuation();
+
+DROP TRIGGER IF EXISTS inventory_valuation_update ON inventory;
+CREATE TRIGGER inventory_valuation_update
+AFTER UPDATE ON inventory
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION maintain_warehouse_valuation();
+
+DROP TRIGGER IF EXISTS inventory_valuation_delete ON inventory;
+CREATE TRIGGER inventory_valuation_delete
+AFTER DELETE ON inventory
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION maintain_warehouse_valuation();
+
+-- Rebuild the summary from inventory, e.g. after this migration or a failed reconciliation
+CREATE OR REPLACE FUNCTION refresh_warehouse_valuation()
+RETURNS VOID AS $$
+BEGIN
+    -- Blocks writers (and so the trigger) while the summary is rebuilt
+    LOCK TABLE inventory IN SHARE MODE;
+    DELETE FROM warehouse_valuation;
+    INSERT INTO warehouse_valuation (warehouse_id, item_count, total_quantity, total_value)
+    SELECT warehouse_id, COUNT(*), SUM(quantity), SUM(quantity * unit_cost)
+    FROM inventory
+    GROUP BY warehouse_id;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_warehouse_valuation();
+
+-- Same signature as before, now reading the maintained summary
+CREATE OR REPLACE FUNCTION calculate_inventory_value(warehouse_id_param VARCHAR DEFAULT NULL)
+RETURNS TABLE (
+    warehouse_id VARCHAR,
+    warehouse_name VARCHAR,
+    total_value DECIMAL(15, 2)
+) AS $$
+BEGIN
+    RETURN QUERY
+    SELECT 
+        w.warehouse_id,
+        w.name,
+        COALESCE(v.total_value, 0)::DECIMAL(15, 2) AS total_value
+    FROM 
+        warehouses w
+    LEFT JOIN 
+        warehouse_valuation v ON w.warehouse_id = v.warehouse_id
+    WHERE 
+        (warehouse_id_param IS NULL OR w.warehouse_id = warehouse_id_param);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,51 @@
+-- Ledger balances: closing balance snapshots per account at each financial period close
+-- A balance as of any date is the last snapshot on or before it plus the transactions
+-- since, read through idx_transactions_account_date, so it costs one period of ledger
+-- at most. Snapshots are written by ERPRepository.close_financial_period().
+-- Safe to run more than once.
+
+SET search_path TO erp;
+
+CREATE TABLE IF NOT EXISTS account_balance_snapshots (
+    account_id VARCHAR(20) NOT NULL REFERENCES accounts(account_id),
+    as_of_date DATE NOT NULL,
+    period_id INT REFERENCES financial_periods(period_id),
+    closing_balance DECIMAL(15, 2) NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (account_id, as_of_date)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_financial_periods_end ON financial_periods (end_date);
+
+-- Opening balances: what accounts.balance holds beyond the recorded transactions
+INSERT INTO account_balance_snapshots (account_id, as_of_date, closing_balance)
+SELECT a.account_id, DATE '1900-01-01', a.balance - COALESCE(SUM(t.amount), 0)
+FROM accounts a
+LEFT JOIN transactions t ON t.account_id = a.account_id
+WHERE NOT EXISTS (SELECT 1 FROM account_balance_snapshots s WHERE s.account_id = a.account_id)
+GROUP BY a.account_id, a.balance;
+
+CREATE OR REPLACE FUNCTION get_account_balance_as_of(account_id_param VARCHAR, as_of_param DATE)
+RETURNS DECIMAL(15, 2) AS $$
+    SELECT COALESCE(s.closing_balance, 0) + COALESCE((
+        SELECT SUM(t.amount)
+        FROM transactions t
+        WHERE t.account_id = a.account_id
+          AND t.transaction_date > COALESCE(s.as_of_date, DATE '1900-01-01')
+          AND t.transaction_date <= as_of_param
+    ), 0)
+    FROM accounts a
+    LEFT JOIN account_balance_snapshots s ON s.account_id = a.account_id AND s.as_of_date = (
+        SELECT MAX(as_of_date) FROM account_balance_snapshots
+        WHERE account_id = a.account_id AND as_of_date <= as_of_param
+    )
+    WHERE a.account_id = account_id_param;
+$$ LANGUAGE sql STABLE;
+
+-- Same signature as before, now derived from the ledger
+CREATE OR REPLACE FUNCTION get_account_balance(account_id_param VARCHAR)
+RETURNS DECIMAL(15, 2) AS $$
+BEGIN
+    RETURN COALESCE(get_account_balance_as_of(account_id_param, 'infinity'::DATE), 0);
+END;
+$$ LANGUAGE plpgsql;
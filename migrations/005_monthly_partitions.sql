@@ -0,0 +1,238 @@
+-- Monthly range partitioning for the append-heavy, date-queried tables: transactions,
+-- stock_movements and attendance. Queries that filter on the date only read the matching
+-- months, and vacuum and index maintenance only have work to do in recent partitions.
+-- Partitions are named <table>_pYYYYMM; rows outside every partition land in <table>_default
+-- until create_monthly_partitions() moves them into their own month.
+-- Primary keys include the partition date, as PostgreSQL requires; transaction IDs stay
+-- unique across every month, archived ones included, through the transaction_ids table.
+-- Converting a large existing table copies it once, so run this in a maintenance window.
+-- Safe to run more than once.
+
+SET search_path TO erp;
+
+-- Create the partitions for every month from from_month through months_ahead months from now.
+-- Without from_month it starts at the current month, or earlier if the default partition
+-- holds older rows. Returns the partitions it created.
+CREATE OR REPLACE FUNCTION create_monthly_partitions(
+    parent_table TEXT,
+    from_month DATE DEFAULT NULL,
+    months_ahead INT DEFAULT 3
+)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    key_column TEXT;
+    default_partition TEXT := parent_table || '_default';
+    part_month DATE;
+    last_month DATE;
+    part_name TEXT;
+    oldest_default DATE;
+BEGIN
+    SELECT a.attname INTO key_column
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = parent_table::regclass;
+
+    part_month := date_trunc('month', COALESCE(from_month, CURRENT_DATE))::DATE;
+    IF from_month IS NULL AND to_regclass(default_partition) IS NOT NULL THEN
+        EXECUTE format('SELECT date_trunc(''month'', MIN(%I))::DATE FROM %I', key_column, default_partition)
+        INTO oldest_default;
+        part_month := LEAST(part_month, COALESCE(oldest_default, part_month));
+    END IF;
+    last_month := date_trunc('month', CURRENT_DATE + make_interval(months => months_ahead))::DATE;
+
+    WHILE part_month <= last_month LOOP
+        part_name := format('%s_p%s', parent_table, to_char(part_month, 'YYYYMM'));
+        IF to_regclass(part_name) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part_name, parent_table);
+            -- The default partition must not keep rows of a month that gets its own partition
+            IF to_regclass(default_partition) IS NOT NULL THEN
+                EXECUTE format(
+                    'WITH moved AS (DELETE FROM %I WHERE %I >= $1 AND %I < $2 RETURNING *) INSERT INTO %I SELECT * FROM moved',
+                    default_partition, key_column, key_column, part_name
+                ) USING part_month, (part_month + INTERVAL '1 month')::DATE;
+            END IF;
+            EXECUTE format(
+                'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                parent_table, part_name, part_month, (part_month + INTERVAL '1 month')::DATE
+            );
+            RETURN NEXT part_name;
+        END IF;
+        part_month := (part_month + INTERVAL '1 month')::DATE;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Detach the partitions of months that ended more than keep_months ago and move them to
+-- archive_schema, where they stay queryable until they are dumped and dropped. Ledger months
+-- are only archived once a closed financial period covers them, because balances are the
+-- latest closing snapshot plus the transactions after it. Returns the archived tables.
+CREATE OR REPLACE FUNCTION archive_monthly_partitions(
+    parent_table TEXT,
+    keep_months INT,
+    archive_schema TEXT DEFAULT 'erp_archive'
+)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    cutoff DATE := (date_trunc('month', CURRENT_DATE) - make_interval(months => keep_months))::DATE;
+    closed_through DATE;
+    part_name TEXT;
+BEGIN
+    IF parent_table = 'transactions' THEN
+        SELECT MAX(end_date) + 1 INTO closed_through FROM financial_periods WHERE status = 'closed';
+        cutoff := LEAST(cutoff, COALESCE(closed_through, DATE '1900-01-01'));
+    END IF;
+
+    EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', archive_schema);
+    FOR part_name IN
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = parent_table::regclass
+          AND c.relname ~ ('^' || parent_table || '_p[0-9]{6}$')
+          AND (to_date(right(c.relname, 6), 'YYYYMM') + INTERVAL '1 month')::DATE <= cutoff
+        ORDER BY c.relname
+    LOOP
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent_table, part_name);
+        EXECUTE format('ALTER TABLE %I SET SCHEMA %I', part_name, archive_schema);
+        RETURN NEXT archive_schema || '.' || part_name;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Turn a plain table into one partitioned by month on key_column, keeping its data,
+-- defaults, checks, foreign keys, unique constraints, indexes and serial sequences.
+CREATE OR REPLACE FUNCTION partition_by_month(parent_table TEXT, key_column TEXT, primary_key TEXT)
+RETURNS VOID AS $$
+DECLARE
+    legacy_table TEXT := parent_table || '_unpartitioned';
+    first_month DATE;
+    definitions TEXT[];
+    definition TEXT;
+    owned RECORD;
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(parent_table)) THEN
+        RETURN;
+    END IF;
+
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', parent_table, legacy_table);
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (%I)',
+        parent_table, legacy_table, key_column
+    );
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', parent_table || '_default', parent_table);
+    EXECUTE format('SELECT MIN(%I)::DATE FROM %I', key_column, legacy_table) INTO first_month;
+    PERFORM create_monthly_partitions(parent_table, COALESCE(first_month, CURRENT_DATE));
+    EXECUTE format('INSERT INTO %I SELECT * FROM %I', parent_table, legacy_table);
+
+    -- Constraints and indexes are recreated once the old table and its index names are gone
+    SELECT array_agg(format('ALTER TABLE %I ADD CONSTRAINT %I %s', parent_table, conname, pg_get_constraintdef(oid)))
+    INTO definitions
+    FROM pg_constraint
+    WHERE conrelid = legacy_table::regclass AND contype IN ('u', 'f');
+    SELECT definitions || array_agg(
+        regexp_replace(pg_get_indexdef(i.indexrelid), ' ON (\S+\.)?' || legacy_table || ' USING ', ' ON ' || parent_table || ' USING ')
+    )
+    INTO definitions
+    FROM pg_index i
+    WHERE i.indrelid = legacy_table::regclass
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid);
+
+    -- Serial columns keep their sequence, which would otherwise be dropped with the old table
+    FOR owned IN
+        SELECT s.relname AS sequence_name, a.attname AS column_name
+        FROM pg_depend d
+        JOIN pg_class s ON s.oid = d.objid AND s.relkind = 'S'
+        JOIN pg_attribute a ON a.attrelid = d.refobjid AND a.attnum = d.refobjsubid
+        WHERE d.refobjid = legacy_table::regclass AND d.deptype = 'a'
+    LOOP
+        EXECUTE format('ALTER SEQUENCE %I OWNED BY %I.%I', owned.sequence_name, parent_table, owned.column_name);
+    END LOOP;
+
+    EXECUTE format('DROP TABLE %I', legacy_table);
+    EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (%s)', parent_table, primary_key);
+    FOREACH definition IN ARRAY COALESCE(definitions, ARRAY[]::TEXT[]) LOOP
+        EXECUTE definition;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT partition_by_month('transactions', 'transaction_date', 'transaction_id, transaction_date');
+
+-- The partitioned primary key only makes (transaction_id, transaction_date) unique. Every ID
+-- is also registered here, once per insert statement, so the same ID on another date fails
+-- with a unique violation as it did before partitioning. IDs of archived months stay
+-- registered, so they cannot be reused either.
+CREATE TABLE IF NOT EXISTS transaction_ids (
+    transaction_id VARCHAR(20) PRIMARY KEY,
+    transaction_date DATE NOT NULL
+);
+
+INSERT INTO transaction_ids (transaction_id, transaction_date)
+SELECT transaction_id, transaction_date FROM transactions
+ON CONFLICT (transaction_id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION register_transaction_ids()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO transaction_ids (transaction_id, transaction_date)
+        SELECT transaction_id, transaction_date FROM new_rows;
+    ELSE
+        DELETE FROM transaction_ids r USING old_rows o WHERE r.transaction_id = o.transaction_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Statement-level, so bulk inserts and COPY register their IDs in one pass. Rows moved
+-- between partitions by create_monthly_partitions() bypass the parent and keep their IDs.
+DROP TRIGGER IF EXISTS transactions_register_ids ON transactions;
+CREATE TRIGGER transactions_register_ids
+AFTER INSERT ON transactions
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION register_transaction_ids();
+
+DROP TRIGGER IF EXISTS transactions_unregister_ids ON transactions;
+CREATE TRIGGER transactions_unregister_ids
+AFTER DELETE ON transactions
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION register_transaction_ids();
+
+SELECT partition_by_month('stock_movements', 'movement_date', 'movement_id, movement_date');
+SELECT partition_by_month('attendance', 'date', 'attendance_id, date');
+
+-- First day whose rows are still attached to parent_table: the day after the last month
+-- archived by archive_monthly_partitions(), or NULL when nothing is archived. Reports refuse
+-- ranges that would need rows from before it.
+CREATE OR REPLACE FUNCTION archived_through(parent_table TEXT, archive_schema TEXT DEFAULT 'erp_archive')
+RETURNS DATE AS $$
+    SELECT (MAX(to_date(right(c.relname, 6), 'YYYYMM')) + INTERVAL '1 month')::DATE
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = archive_schema
+      AND c.relkind = 'r'
+      AND c.relname ~ ('^' || parent_table || '_p[0-9]{6}$');
+$$ LANGUAGE sql STABLE;
+
+-- Scheduled upkeep for every partitioned table: create the coming months and, when
+-- keep_months is given, archive the old ones. Run by partition_maintenance.py.
+CREATE OR REPLACE FUNCTION maintain_partitions(months_ahead INT DEFAULT 3, keep_months INT DEFAULT NULL)
+RETURNS TABLE (partitioned_table TEXT, action TEXT, partition_name TEXT) AS $$
+DECLARE
+    parent TEXT;
+BEGIN
+    FOREACH parent IN ARRAY ARRAY['transactions', 'stock_movements', 'attendance'] LOOP
+        partitioned_table := parent;
+        action := 'created';
+        FOR partition_name IN SELECT * FROM create_monthly_partitions(parent, NULL, months_ahead) LOOP
+            RETURN NEXT;
+        END LOOP;
+        IF keep_months IS NOT NULL THEN
+            action := 'archived';
+            FOR partition_name IN SELECT * FROM archive_monthly_partitions(parent, keep_months) LOOP
+                RETURN NEXT;
+            END LOOP;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,18 @@
+-- Idempotency keys for recorded transactions, so a retried tool call or a duplicated
+-- websocket message cannot post the same transaction twice. Each key remembers the
+-- transaction it produced and what it posted; ERPRepository.record_transactions() looks
+-- keys up before writing and prunes those older than ERP_IDEMPOTENCY_KEY_DAYS.
+-- Safe to run more than once.
+
+SET search_path TO erp;
+
+CREATE TABLE IF NOT EXISTS transaction_idempotency_keys (
+    idempotency_key VARCHAR(100) PRIMARY KEY,
+    transaction_id VARCHAR(20) NOT NULL,
+    account_id VARCHAR(20) NOT NULL,
+    amount DECIMAL(15, 2) NOT NULL,
+    transaction_date DATE NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_transaction_idempotency_keys_created ON transaction_idempotency_keys (created_at);
@@ -0,0 +1,9 @@
+-- Index of the sales orders still waiting to be processed, in the order the batched order
+-- pipeline (order_pipeline.py) claims them. Processed orders drop out of it, so each claim
+-- reads a small index however many orders have been shipped.
+-- Safe to run more than once.
+
+SET search_path TO erp;
+
+CREATE INDEX IF NOT EXISTS idx_sales_orders_pending ON sales_orders (order_date, order_id)
+    WHERE status IN ('draft', 'confirmed');
@@ -8,6 +8,7 @@ class FinancialTransaction(BaseModel):
     account_code: str
     description: str
     date: str
+    idempotency_key: Optional[str] = Field(default=None, max_length=100)  # defaults to transaction_id
 
 class InventoryItem(BaseModel):
     item_id: str
@@ -15,6 +16,7 @@ class InventoryItem(BaseModel):
     quantity: int
     reorder_point: int
     unit_cost: float
+    warehouse_id: Optional[str] = None
 
 class SalesOrder(BaseModel):
     order_id: str
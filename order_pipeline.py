@@ -0,0 +1,200 @@
+"""Batched sales order processing: reserve stock, record the movements, raise the invoices.
+
+Each batch runs in one database transaction:
+
+1. Claim up to ORDER_BATCH_SIZE confirmed or draft orders with FOR UPDATE SKIP LOCKED, so
+   concurrent workers take different orders instead of queueing behind each other.
+2. Lock the inventory rows of every product in the batch in (product_id, warehouse_id) order.
+   Every writer takes them in that order, so workers contending for the same hot SKUs wait
+   for each other but never deadlock.
+3. Allocate the orders in memory, oldest first: each line ships whole from the single
+   warehouse holding the most remaining stock, and an order is only reserved if every line
+   can be. Lines are deliberately never split across warehouses (one shipment per line), so
+   a line no single warehouse can fill backorders its order even when the warehouses hold
+   enough between them.
+4. Write the stock_movements, invoices and order statuses in bulk, then the inventory changes
+   in a single statement. On PostgreSQL the warehouse valuation trigger fires once for it,
+   locking the summary rows in warehouse_id order after every inventory row is held, as for
+   every other inventory writer, and keeping them only until the commit.
+
+Orders that cannot be filled are marked backordered, so they leave the queue instead of being
+claimed again by every batch; process them by ID to retry after a restock. On SQLite, which has no row locks, the transaction holds the database write lock instead.
+"""
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from database import DatabaseBackend, get_database
+from load_env import get_env
+from repository import INVOICE_TERMS_DAYS, RepositoryError, money, new_id
+
+ORDER_BATCH_SIZE = int(get_env("ERP_ORDER_BATCH_SIZE", "200"))
+
+# The queue takes draft and confirmed orders; backordered ones are only retried when asked for by ID
+PROCESSABLE_STATUSES = ("draft", "confirmed", "backordered")
+
+# Row locks that skip orders another worker holds; SQLite serializes writers instead
+CLAIM_LOCKS = {"postgres": "FOR UPDATE SKIP LOCKED", "sqlite": ""}
+INVENTORY_LOCKS = {"postgres": "FOR UPDATE", "sqlite": ""}
+
+# The queue's status list is literal so the planner can use idx_sales_orders_pending
+QUEUE_FILTER = "status IN ('draft', 'confirmed')"
+BY_ID_FILTER = "status IN ('draft', 'confirmed', 'backordered')"
+
+# Templates formatted per dialect with match_any() conditions, locks and zip_lists() rows;
+# check_query_plans.py EXPLAINs the same strings
+CLAIM_SQL = """SELECT order_id, total_amount, tax_amount FROM sales_orders
+WHERE {filters}
+ORDER BY order_date, order_id
+LIMIT :limit
+{locks}"""
+ORDER_LINES_SQL = """SELECT order_id, product_id, quantity FROM order_items
+WHERE {orders}
+ORDER BY order_id, item_id"""
+LOCK_INVENTORY_SQL = """SELECT inventory_id, product_id, warehouse_id, quantity FROM inventory
+WHERE {products}
+ORDER BY product_id, warehouse_id
+{locks}"""
+TAKE_STOCK_SQL = """UPDATE inventory SET quantity = inventory.quantity - r.quantity, updated_at = CURRENT_TIMESTAMP
+FROM {rows}
+WHERE inventory.inventory_id = r.inventory_id"""
+TAKE_STOCK_ROWS = (("inventory_id", "inventory_ids", "INT"), ("quantity", "quantities", "INT"))
+SET_STATUS_SQL = """UPDATE sales_orders SET status = :status, updated_at = CURRENT_TIMESTAMP
+WHERE {orders}"""
+ORDER_STATUSES_SQL = "SELECT order_id, status FROM sales_orders WHERE {orders}"
+
+class OrderPipeline:
+    """Processes sales orders in batches, one transaction per batch"""
+    def __init__(self, database_provider: Callable[[], DatabaseBackend] = get_database,
+                 batch_size: int = ORDER_BATCH_SIZE):
+        self._database_provider = database_provider
+        self.batch_size = batch_size
+
+    @property
+    def database(self) -> DatabaseBackend:
+        return self._database_provider()
+
+    async def process_orders(self, order_ids: Optional[List[str]] = None,
+                             limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Process the given orders, or up to limit of the oldest pending ones; one outcome per order"""
+        if order_ids is not None:
+            order_ids = list(dict.fromkeys(order_ids))
+            if len(order_ids) > self.batch_size:
+                raise RepositoryError(f"At most {self.batch_size} orders can be processed at once")
+        if limit is not None and limit < 1:
+            raise RepositoryError("limit must be at least 1")
+        limit = min(limit or self.batch_size, self.batch_size)
+
+        async with self.database.transaction() as db:
+            orders = await self._claim(db, order_ids, limit)
+            outcomes: Dict[str, Dict[str, Any]] = {}
+            if orders:
+                await self._reserve(db, orders, outcomes)
+            if order_ids is not None:
+                await self._explain_unclaimed(db, [order_id for order_id in order_ids if order_id not in orders], outcomes)
+        if order_ids is not None:
+            return [outcomes[order_id] for order_id in order_ids]
+        return [outcomes[order_id] for order_id in orders]
+
+    async def _claim(self, db: DatabaseBackend, order_ids: Optional[List[str]], limit: int) -> Dict[str, Dict[str, Any]]:
+        if order_ids is None:
+            filters = QUEUE_FILTER
+        else:
+            filters = f"{BY_ID_FILTER} AND {db.match_any('order_id', 'order_ids')}"
+        rows = await db.fetch(
+            CLAIM_SQL.format(filters=filters, locks=CLAIM_LOCKS[db.dialect]),
+            {"order_ids": order_ids, "limit": limit}
+        )
+        return {row["order_id"]: row for row in rows}
+
+    async def _reserve(self, db: DatabaseBackend, orders: Dict[str, Dict[str, Any]], outcomes: Dict[str, Dict[str, Any]]):
+        lines: Dict[str, List[Tuple[str, int]]] = {order_id: [] for order_id in orders}
+        for row in await db.fetch(
+            ORDER_LINES_SQL.format(orders=db.match_any("order_id", "order_ids")),
+            {"order_ids": list(orders)}
+        ):
+            lines[row["order_id"]].append((row["product_id"], row["quantity"]))
+
+        products = sorted({product_id for order_lines in lines.values() for product_id, _ in order_lines})
+        stock: Dict[str, List[List[Any]]] = {}
+        for row in await db.fetch(
+            LOCK_INVENTORY_SQL.format(products=db.match_any("product_id", "products"), locks=INVENTORY_LOCKS[db.dialect]),
+            {"products": products}
+        ):
+            stock.setdefault(row["product_id"], []).append([row["inventory_id"], row["warehouse_id"], row["quantity"]])
+
+        taken: Dict[int, int] = {}
+        backordered: List[str] = []
+        movements: List[Tuple[Any, ...]] = []
+        invoices: List[Tuple[Any, ...]] = []
+        today = date.today()
+        due_date = today + timedelta(days=INVOICE_TERMS_DAYS)
+        for order_id, order in orders.items():
+            allocation = self._allocate(stock, lines[order_id])
+            if isinstance(allocation, str):
+                backordered.append(order_id)
+                outcomes[order_id] = {"order_id": order_id, "status": "backordered", "message": f"{allocation}; order backordered"}
+                continue
+            for entry, product_id, quantity in allocation:
+                taken[entry[0]] = taken.get(entry[0], 0) + quantity
+                movements.append((product_id, entry[1], -quantity, "sale", order_id))
+            invoice_id = new_id("INV")
+            total = money(order["total_amount"]) + money(order["tax_amount"])
+            invoices.append((invoice_id, order_id, today, due_date, total))
+            outcomes[order_id] = {"order_id": order_id, "status": "processed", "invoice_id": invoice_id, "total_amount": float(total)}
+
+        if movements:
+            await db.copy_records(
+                "stock_movements", ("product_id", "warehouse_id", "quantity", "movement_type", "reference_id"), movements
+            )
+        if invoices:
+            await db.copy_records("invoices", ("invoice_id", "order_id", "invoice_date", "due_date", "total_amount"), invoices)
+        for status, order_ids in (("processed", [invoice[1] for invoice in invoices]), ("backordered", backordered)):
+            if order_ids:
+                await db.execute(
+                    SET_STATUS_SQL.format(orders=db.match_any("order_id", "order_ids")),
+                    {"status": status, "order_ids": order_ids}
+                )
+        if taken:
+            # One statement, last: the valuation trigger then locks each warehouse's summary row
+            # once, in warehouse_id order, and holds it only until the commit
+            inventory_ids = sorted(taken)
+            await db.execute(
+                TAKE_STOCK_SQL.format(rows=db.zip_lists("r", TAKE_STOCK_ROWS)),
+                {"inventory_ids": inventory_ids, "quantities": [taken[inventory_id] for inventory_id in inventory_ids]}
+            )
+
+    def _allocate(self, stock: Dict[str, List[List[Any]]], lines: List[Tuple[str, int]]):
+        """Take every line from the warehouse with the most stock left, or nothing and a reason"""
+        allocation = []
+        for product_id, quantity in lines:
+            entries = stock.get(product_id, [])
+            entry = max(entries, key=lambda entry: entry[2], default=None)
+            if entry is None or entry[2] < quantity:
+                for taken_entry, _, taken_quantity in allocation:
+                    taken_entry[2] += taken_quantity
+                return f"Insufficient stock of {product_id} in any one warehouse"
+            entry[2] -= quantity
+            allocation.append((entry, product_id, quantity))
+        return allocation
+
+    async def _explain_unclaimed(self, db: DatabaseBackend, order_ids: List[str], outcomes: Dict[str, Dict[str, Any]]):
+        if not order_ids:
+            return
+        statuses = {
+            row["order_id"]: row["status"]
+            for row in await db.fetch(
+                ORDER_STATUSES_SQL.format(orders=db.match_any("order_id", "order_ids")),
+                {"order_ids": order_ids}
+            )
+        }
+        for order_id in order_ids:
+            status = statuses.get(order_id)
+            if status is None:
+                outcomes[order_id] = {"order_id": order_id, "status": "not_found", "message": f"Sales order {order_id} not found"}
+            elif status in PROCESSABLE_STATUSES:
+                # Claimed by a concurrent batch, which reports its outcome
+                outcomes[order_id] = {"order_id": order_id, "status": "in_progress", "message": f"Sales order {order_id} is being processed"}
+            else:
+                outcomes[order_id] = {"order_id": order_id, "status": "already_processed", "message": f"Sales order {order_id} is already {status}"}
+
+# Shared by the sales order tools
+order_pipeline = OrderPipeline()
@@ -0,0 +1,43 @@
+"""Create upcoming monthly partitions and archive old ones.
+
+    python partition_maintenance.py                       # partitions for the next 3 months
+    python partition_maintenance.py --archive-after 24    # also archive months older than 24
+
+Runs maintain_partitions() from migrations/005_monthly_partitions.sql against
+ERP_DB_CONNECTION. Schedule it (for example monthly with cron) so inserts never fall into
+the default partitions. Archived partitions are moved to the erp_archive schema, from where
+they can be dumped with pg_dump and dropped.
+"""
+import argparse
+import asyncio
+import sys
+from typing import Optional
+from database import close_database, get_database
+
+async def main(months_ahead: int, archive_after: Optional[int]) -> int:
+    database = get_database()
+    try:
+        if database.dialect != "postgres":
+            print("Only the PostgreSQL schema is partitioned, nothing to do")
+            return 0
+        async with database.transaction() as db:
+            # Moving rows out of a default partition can take longer than the pool-wide timeout
+            await db.execute("SET LOCAL statement_timeout = 0")
+            rows = await db.fetch(
+                "SELECT * FROM maintain_partitions(:months_ahead, :keep_months)",
+                {"months_ahead": months_ahead, "keep_months": archive_after}
+            )
+    finally:
+        await close_database()
+
+    for row in rows:
+        print(f"{row['action']:<9} {row['partition_name']}")
+    print(f"✅ {len(rows)} partition change(s)")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of the ERP ledger tables")
+    parser.add_argument("--months-ahead", type=int, default=3, help="future months to create partitions for")
+    parser.add_argument("--archive-after", type=int, help="archive partitions of months older than this many months")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.months_ahead, args.archive_after)))
@@ -0,0 +1,266 @@
+"""Payroll for a pay period, computed for every employee at once with NumPy.
+
+Active employees and their attendance totals for the period are loaded into columnar arrays,
+every amount is computed in integer cents (rounded half up) one department per worker
+thread, and the payroll rows are written with one bulk insert (COPY on PostgreSQL).
+
+Pay rules:
+- basic_salary: salary / 12, prorated by calendar day for employees hired during the period
+- allowances: overtime, the minutes worked past PAYROLL_STANDARD_MINUTES on a day, paid at
+  PAYROLL_OVERTIME_RATE times the hourly rate (salary / 2080)
+- deductions: basic_salary / working days for each unpaid absence, plus PAYROLL_TAX_RATE
+  withheld from the rest of gross pay
+- net_pay: basic_salary + allowances - deductions
+
+reference_payroll() applies the same rules one employee at a time in Decimal; compute_payroll()
+must agree with it to the cent (benchmark_payroll.py checks this).
+"""
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, fields
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from database import DatabaseBackend, get_database
+from load_env import get_env
+
+PAYROLL_TAX_RATE = Decimal(get_env("ERP_PAYROLL_TAX_RATE", "0.20"))
+PAYROLL_OVERTIME_RATE = Decimal(get_env("ERP_PAYROLL_OVERTIME_RATE", "1.5"))
+PAYROLL_STANDARD_MINUTES = int(get_env("ERP_PAYROLL_STANDARD_MINUTES", "480"))
+# Threads computing departments in parallel; NumPy releases the GIL inside array operations
+PAYROLL_WORKERS = int(get_env("ERP_PAYROLL_WORKERS", str(os.cpu_count() or 1)))
+
+# Attendance statuses that are not paid
+UNPAID_STATUSES = ["absent", "unpaid_leave"]
+# Working hours in a year, for the hourly rate overtime is paid at
+ANNUAL_HOURS = 2080
+
+PAYROLL_COLUMNS = (
+    "payroll_id", "employee_id", "pay_period_start", "pay_period_end",
+    "basic_salary", "allowances", "deductions", "net_pay", "payment_date"
+)
+
+# Minutes between time_in and time_out of an attendance day. SQLite stores times as 'HH:MM:SS'
+# text; slicing it is several times faster than strftime() over a month of attendance
+WORKED_MINUTES_SQL = {
+    "postgres": "CAST(EXTRACT(EPOCH FROM (a.time_out - a.time_in)) / 60 AS INTEGER)",
+    "sqlite": """(CAST(substr(a.time_out, 1, 2) AS INTEGER) * 60 + CAST(substr(a.time_out, 4, 2) AS INTEGER))
+                  - (CAST(substr(a.time_in, 1, 2) AS INTEGER) * 60 + CAST(substr(a.time_in, 4, 2) AS INTEGER))"""
+}
+
+# Active employees not yet paid for the period, with their attendance totals; salaries in cents
+PAYROLL_INPUTS_SQL = """SELECT e.employee_id, e.department_id, CAST(ROUND(e.salary * 100) AS BIGINT) AS salary_cents,
+       e.hire_date, COALESCE(t.absent_days, 0) AS absent_days, COALESCE(t.overtime_minutes, 0) AS overtime_minutes
+FROM employees e
+JOIN departments d ON d.department_id = e.department_id
+LEFT JOIN (
+    SELECT a.employee_id,
+           SUM(CASE WHEN {unpaid} THEN 1 ELSE 0 END) AS absent_days,
+           SUM(CASE WHEN a.worked_minutes > :standard_minutes THEN a.worked_minutes - :standard_minutes ELSE 0 END) AS overtime_minutes
+    FROM (
+        SELECT a.employee_id, a.status, {worked} AS worked_minutes
+        FROM attendance a
+        WHERE a.date BETWEEN :period_start AND :period_end
+    ) a
+    GROUP BY a.employee_id
+) t ON t.employee_id = e.employee_id
+WHERE e.is_active
+  AND e.hire_date <= :period_end
+  AND (CAST(:department AS VARCHAR(100)) IS NULL OR d.name = :department OR d.department_id = :department)
+  AND NOT EXISTS (
+      SELECT 1 FROM payroll pr
+      WHERE pr.employee_id = e.employee_id AND pr.pay_period_start = :period_start
+  )"""
+
+def period_end_for(period_start: date) -> date:
+    """Last day of the month period_start falls in"""
+    return (period_start.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+@dataclass
+class PayrollInputs:
+    """A pay period's inputs as columns, one entry per employee"""
+    period_start: date
+    period_end: date
+    employee_ids: np.ndarray      # object
+    department_ids: np.ndarray    # object
+    salary_cents: np.ndarray      # int64, annual salary
+    hire_dates: np.ndarray        # datetime64[D]
+    absent_days: np.ndarray       # int64, unpaid absences in the period
+    overtime_minutes: np.ndarray  # int64, minutes past the standard day in the period
+
+    @classmethod
+    def from_rows(cls, period_start: date, period_end: date, rows: Sequence[Dict[str, Any]]) -> "PayrollInputs":
+        count = len(rows)
+        return cls(
+            period_start=period_start,
+            period_end=period_end,
+            employee_ids=np.array([row["employee_id"] for row in rows], dtype=object),
+            department_ids=np.array([row["department_id"] for row in rows], dtype=object),
+            salary_cents=np.fromiter((row["salary_cents"] for row in rows), dtype=np.int64, count=count),
+            # SQLite hands dates back as ISO strings, which datetime64 parses as well
+            hire_dates=np.array([row["hire_date"] for row in rows], dtype="datetime64[D]"),
+            absent_days=np.fromiter((row["absent_days"] for row in rows), dtype=np.int64, count=count),
+            overtime_minutes=np.fromiter((row["overtime_minutes"] for row in rows), dtype=np.int64, count=count)
+        )
+
+    def __len__(self) -> int:
+        return len(self.employee_ids)
+
+    def take(self, index: np.ndarray) -> "PayrollInputs":
+        return PayrollInputs(
+            self.period_start, self.period_end,
+            *(getattr(self, name)[index] for name in _INPUT_COLUMNS)
+        )
+
+_INPUT_COLUMNS = ("employee_ids", "department_ids", "salary_cents", "hire_dates", "absent_days", "overtime_minutes")
+
+@dataclass
+class PayrollAmounts:
+    """Pay in cents, aligned with the PayrollInputs it was computed from"""
+    basic_salary: np.ndarray
+    allowances: np.ndarray
+    deductions: np.ndarray
+    net_pay: np.ndarray
+
+    @classmethod
+    def zeros(cls, count: int) -> "PayrollAmounts":
+        return cls(*(np.zeros(count, dtype=np.int64) for _ in fields(cls)))
+
+    def put(self, index: np.ndarray, part: "PayrollAmounts"):
+        for column in fields(self):
+            getattr(self, column.name)[index] = getattr(part, column.name)
+
+    def totals(self) -> Dict[str, Decimal]:
+        return {f"total_{column.name}": cents_to_decimal(getattr(self, column.name).sum()) for column in fields(self)}
+
+def cents_to_decimal(cents: int) -> Decimal:
+    return Decimal(int(cents)).scaleb(-2)
+
+def _round_div(numerator, denominator):
+    """numerator / denominator rounded half up, for non-negative integers or int64 arrays"""
+    return (2 * numerator + denominator) // (2 * denominator)
+
+def _period_days(period_start: date, period_end: date) -> Tuple[int, int]:
+    """Calendar days and working days (Monday to Friday) in a period"""
+    start, end = np.datetime64(period_start, "D"), np.datetime64(period_end, "D")
+    return int((end - start).astype(np.int64)) + 1, max(int(np.busday_count(start, end + 1)), 1)
+
+def compute_payroll(inputs: PayrollInputs) -> PayrollAmounts:
+    """Pay for every employee in inputs, with whole-array integer operations"""
+    period_days, working_days = _period_days(inputs.period_start, inputs.period_end)
+    employed_days = np.clip((np.datetime64(inputs.period_end, "D") - inputs.hire_dates).astype(np.int64) + 1, 0, period_days)
+    basic = _round_div(_round_div(inputs.salary_cents, 12) * employed_days, period_days)
+
+    numerator, denominator = PAYROLL_OVERTIME_RATE.as_integer_ratio()
+    allowances = _round_div(inputs.salary_cents * inputs.overtime_minutes * numerator, ANNUAL_HOURS * 60 * denominator)
+
+    absence = _round_div(basic * np.minimum(inputs.absent_days, working_days), working_days)
+    numerator, denominator = PAYROLL_TAX_RATE.as_integer_ratio()
+    tax = _round_div((basic + allowances - absence) * numerator, denominator)
+    deductions = absence + tax
+    return PayrollAmounts(basic, allowances, deductions, basic + allowances - deductions)
+
+def compute_by_department(inputs: PayrollInputs, workers: int = PAYROLL_WORKERS) -> PayrollAmounts:
+    """compute_payroll() run for each department on its own thread"""
+    amounts = PayrollAmounts.zeros(len(inputs))
+    if not len(inputs):
+        return amounts
+    _, group, counts = np.unique(inputs.department_ids, return_inverse=True, return_counts=True)
+    departments = np.split(np.argsort(group, kind="stable"), np.cumsum(counts)[:-1])
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(departments))), thread_name_prefix="erp-payroll") as executor:
+        for index, part in zip(departments, executor.map(lambda index: compute_payroll(inputs.take(index)), departments)):
+            amounts.put(index, part)
+    return amounts
+
+def _cents(value: Decimal) -> int:
+    return int(value.quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+def reference_payroll(inputs: PayrollInputs) -> PayrollAmounts:
+    """The pay rules applied one employee at a time in Decimal, to check compute_payroll against"""
+    period_days = (inputs.period_end - inputs.period_start).days + 1
+    working_days = max(sum(1 for n in range(period_days) if (inputs.period_start + timedelta(days=n)).weekday() < 5), 1)
+    columns: Dict[str, List[int]] = {column.name: [] for column in fields(PayrollAmounts)}
+    for salary, hire_date, absent_days, overtime in zip(
+        inputs.salary_cents.tolist(), inputs.hire_dates.tolist(),
+        inputs.absent_days.tolist(), inputs.overtime_minutes.tolist()
+    ):
+        employed_days = min(max((inputs.period_end - hire_date).days + 1, 0), period_days)
+        basic = _cents(Decimal(_cents(Decimal(salary) / 12) * employed_days) / period_days)
+        allowances = _cents(Decimal(salary * overtime) * PAYROLL_OVERTIME_RATE / (ANNUAL_HOURS * 60))
+        absence = _cents(Decimal(basic * min(absent_days, working_days)) / working_days)
+        deductions = absence + _cents((basic + allowances - absence) * PAYROLL_TAX_RATE)
+        columns["basic_salary"].append(basic)
+        columns["allowances"].append(allowances)
+        columns["deductions"].append(deductions)
+        columns["net_pay"].append(basic + allowances - deductions)
+    return PayrollAmounts(**{name: np.array(values, dtype=np.int64) for name, values in columns.items()})
+
+def payroll_id(period_start: date, employee_id: str) -> str:
+    """Payroll ID for an employee and period, within payroll_id's 20 characters.
+
+    Derived from both, so a second run for the same period collides on the primary key
+    instead of paying anyone twice; the employee part is hashed since it can be 20 long.
+    """
+    digest = hashlib.sha1(employee_id.encode()).hexdigest()[:11].upper()
+    return f"PR{period_start:%Y%m}-{digest}"
+
+def payroll_records(inputs: PayrollInputs, amounts: PayrollAmounts) -> List[Tuple[Any, ...]]:
+    """Payroll rows in PAYROLL_COLUMNS order, paid on the last day of the period"""
+    start, end = inputs.period_start, inputs.period_end
+    return [
+        (payroll_id(start, employee_id), employee_id, start, end,
+         cents_to_decimal(basic), cents_to_decimal(allowances), cents_to_decimal(deductions), cents_to_decimal(net_pay), end)
+        for employee_id, basic, allowances, deductions, net_pay in zip(
+            inputs.employee_ids.tolist(), amounts.basic_salary.tolist(), amounts.allowances.tolist(),
+            amounts.deductions.tolist(), amounts.net_pay.tolist()
+        )
+    ]
+
+class PayrollEngine:
+    """Runs payroll for a pay period against the ERP database"""
+    def __init__(self, database_provider: Callable[[], DatabaseBackend] = get_database, workers: int = PAYROLL_WORKERS):
+        self._database_provider = database_provider
+        self.workers = workers
+
+    @property
+    def database(self) -> DatabaseBackend:
+        return self._database_provider()
+
+    async def load_inputs(self, db: DatabaseBackend, period_start: date, department: Optional[str] = None) -> PayrollInputs:
+        """Active employees not yet paid for the period starting period_start, as columns"""
+        period_end = period_end_for(period_start)
+        sql = PAYROLL_INPUTS_SQL.format(
+            unpaid=db.match_any("a.status", "unpaid_statuses"),
+            worked=WORKED_MINUTES_SQL[db.dialect]
+        )
+        rows = await db.fetch(sql, {
+            "period_start": period_start,
+            "period_end": period_end,
+            "department": department,
+            "unpaid_statuses": UNPAID_STATUSES,
+            "standard_minutes": PAYROLL_STANDARD_MINUTES
+        })
+        return PayrollInputs.from_rows(period_start, period_end, rows)
+
+    async def run_payroll(self, department: Optional[str] = None, period_start: Optional[date] = None) -> Dict[str, Any]:
+        """Create the month's payroll rows for active employees who have not been paid yet"""
+        period_start = (period_start or date.today()).replace(day=1)
+        async with self.database.transaction() as db:
+            inputs = await self.load_inputs(db, period_start, department)
+            # The arrays are computed off the event loop so other requests keep being served
+            amounts = await asyncio.get_running_loop().run_in_executor(None, compute_by_department, inputs, self.workers)
+            if len(inputs):
+                await db.copy_records("payroll", PAYROLL_COLUMNS, payroll_records(inputs, amounts))
+        return {
+            "employees_paid": len(inputs),
+            "departments": len(set(inputs.department_ids.tolist())),
+            **{name: float(total) for name, total in amounts.totals().items()},
+            "pay_period_start": inputs.period_start.isoformat(),
+            "pay_period_end": inputs.period_end.isoformat()
+        }
+
+# Shared by the payroll tool
+payroll_engine = PayrollEngine()
@@ -0,0 +1,191 @@
+import asyncio
+import functools
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from database import get_database, jsonable_rows
+from load_env import get_env
+
+@dataclass(frozen=True)
+class CatalogQuery:
+    """A named, parameterized query and the tables its results depend on.
+
+    sql is either one statement for every backend or a {dialect: statement} dict.
+    Parameters are written as :name placeholders.
+    """
+    description: str
+    sql: Union[str, Dict[str, str]]
+    tables: Tuple[str, ...]
+    ttl: Optional[float] = None
+
+    def statement(self, dialect: str) -> str:
+        if isinstance(self.sql, str):
+            return self.sql
+        return self.sql[dialect]
+
+ERP_QUERIES = {
+    "get_low_stock_items": CatalogQuery(
+        description="Get inventory items that are below reorder point",
+        sql="""SELECT i.product_id, p.name, i.warehouse_id, i.quantity, i.reorder_point, i.unit_cost
+FROM inventory i JOIN products p ON p.product_id = i.product_id
+WHERE i.quantity < i.reorder_point
+  AND (CAST(:warehouse_id AS VARCHAR(10)) IS NULL OR i.warehouse_id = :warehouse_id)
+ORDER BY i.reorder_point - i.quantity DESC""",
+        tables=("inventory", "products")
+    ),
+    "get_overdue_invoices": CatalogQuery(
+        description="Get list of overdue invoices",
+        sql="""SELECT invoice_id, order_id, invoice_date, due_date, status, total_amount
+FROM invoices
+WHERE due_date < CURRENT_DATE AND status != 'paid'
+ORDER BY due_date""",
+        tables=("invoices",)
+    ),
+    # Sales rollups are maintained by triggers on sales_orders, see migrations/002_sales_rollups.sql
+    "get_top_customers": CatalogQuery(
+        description="Get top customers by sales volume",
+        sql="""SELECT customer_id, total_amount AS total
+FROM sales_by_customer
+WHERE order_count > 0
+ORDER BY total_amount DESC
+LIMIT :limit""",
+        tables=("sales_orders", "sales_by_customer")
+    ),
+    "get_monthly_sales": CatalogQuery(
+        description="Get monthly sales report",
+        sql="""SELECT month, total_amount AS total
+FROM sales_by_month
+WHERE order_count > 0
+ORDER BY month""",
+        tables=("sales_orders", "sales_by_month")
+    )
+}
+
+class QueryCatalog:
+    """Runs catalog queries through the database backend and caches their results.
+
+    Results are kept for a TTL and dropped early when a write touches one of the
+    query's tables, see invalidate_tables() and writes_tables().
+    """
+    def __init__(self, queries: Dict[str, CatalogQuery], database_provider: Callable = get_database,
+                 default_ttl: float = 60.0, max_entries: int = 1024):
+        self.queries = queries
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._database_provider = database_provider
+        self._cache: Dict[Tuple, Tuple[float, List[Dict[str, Any]]]] = {}
+        self._generations: Dict[str, int] = {}
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+
+    def _generation(self, query: CatalogQuery) -> Tuple[int, ...]:
+        return tuple(self._generations.get(table, 0) for table in query.tables)
+
+    async def run(self, name: str, **params) -> List[Dict[str, Any]]:
+        query = self.queries[name]
+        key = (name, tuple(sorted(params.items())))
+        now = time.monotonic()
+        cached = self._cache.get(key)
+        if cached is not None and cached[0] > now:
+            self.hits += 1
+            return cached[1]
+
+        # Identical concurrent requests share one database round trip
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.hits += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        generation = self._generation(query)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            database = self._database_provider()
+            rows = jsonable_rows(await database.fetch(query.statement(database.dialect), params))
+            future.set_result(rows)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved when nobody else was waiting on it
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+        # A write that landed while the query ran makes this result stale already
+        if generation == self._generation(query):
+            if len(self._cache) >= self.max_entries:
+                self._evict(now)
+            ttl = query.ttl if query.ttl is not None else self.default_ttl
+            self._cache[key] = (now + ttl, rows)
+        return rows
+
+    def _evict(self, now: float):
+        for key in [key for key, (expires, _) in self._cache.items() if expires <= now]:
+            del self._cache[key]
+        while len(self._cache) >= self.max_entries:
+            del self._cache[next(iter(self._cache))]
+
+    def invalidate_tables(self, *tables: str):
+        """Drop cached results of every query that reads one of these tables"""
+        tables = set(tables)
+        for table in tables:
+            self._generations[table] = self._generations.get(table, 0) + 1
+        for key in list(self._cache):
+            if tables.intersection(self.queries[key[0]].tables):
+                del self._cache[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._cache)
+        }
+
+query_catalog = QueryCatalog(ERP_QUERIES, default_ttl=float(get_env("ERP_QUERY_CACHE_TTL", "60")))
+
+def writes_tables(*tables: str):
+    """Decorate a write tool so cached catalog results for these tables are invalidated"""
+    def decorator(function):
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                try:
+                    return await function(*args, **kwargs)
+                finally:
+                    query_catalog.invalidate_tables(*tables)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            try:
+                return function(*args, **kwargs)
+            finally:
+                query_catalog.invalidate_tables(*tables)
+        return wrapper
+    return decorator
+
+# ===== CATALOG TOOLS =====
+async def get_low_stock_items(warehouse_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Get inventory items that are below their reorder point, optionally for one warehouse"""
+    return await query_catalog.run("get_low_stock_items", warehouse_id=warehouse_id)
+
+async def get_overdue_invoices() -> List[Dict[str, Any]]:
+    """Get unpaid invoices that are past their due date"""
+    return await query_catalog.run("get_overdue_invoices")
+
+async def get_top_customers(limit: int = 10) -> List[Dict[str, Any]]:
+    """Get the top customers by total sales volume"""
+    return await query_catalog.run("get_top_customers", limit=limit)
+
+async def get_monthly_sales() -> List[Dict[str, Any]]:
+    """Get total sales per month"""
+    return await query_catalog.run("get_monthly_sales")
+
+CATALOG_TOOLS = [get_low_stock_items, get_overdue_invoices, get_top_customers, get_monthly_sales]
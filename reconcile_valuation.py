@@ -0,0 +1,38 @@
+"""Verify the warehouse_valuation summary against a full recompute over inventory.
+
+    python reconcile_valuation.py            # report differences, exit 1 if any
+    python reconcile_valuation.py --repair   # also rebuild the summary
+
+Runs against ERP_DB_CONNECTION. Suitable for a nightly cron job.
+"""
+import argparse
+import asyncio
+import sys
+from database import close_database
+from repository import repository
+
+async def main(repair: bool) -> int:
+    try:
+        mismatches = await repository.reconcile_inventory_valuation(repair=repair)
+    finally:
+        await close_database()
+
+    if not mismatches:
+        print("✅ warehouse_valuation matches inventory")
+        return 0
+    for row in mismatches:
+        print(
+            f"❌ {row['warehouse_id']}: summary {row['summary_items']} items / {row['summary_quantity']} units / "
+            f"{row['summary_value']:.2f}, actual {row['actual_items']} items / {row['actual_quantity']} units / "
+            f"{row['actual_value']:.2f}"
+        )
+    if repair:
+        print(f"Rebuilt warehouse_valuation ({len(mismatches)} warehouse(s) were off)")
+        return 0
+    return 1
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconcile warehouse valuation with inventory")
+    parser.add_argument("--repair", action="store_true", help="rebuild the summary if it is off")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.repair)))
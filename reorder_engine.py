@@ -0,0 +1,178 @@
+"""Reorder recommendations for every product and warehouse, computed with NumPy.
+
+Inventory levels and each row's sales over the last REORDER_DEMAND_DAYS (from stock_movements)
+are loaded into columnar arrays in one pass. Whole-array operations then work out daily demand,
+days of cover, which rows are below their reorder point or will run out within the supplier
+lead time, and an order quantity: the economic order quantity (EOQ), raised if needed to cover
+the shortfall below the reorder point plus the demand over the lead time. Only the ranked
+shortlist leaves the engine, so one tool call answers "what should we reorder?" however many
+SKU x warehouse rows there are.
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence
+import numpy as np
+from database import DatabaseBackend, get_database
+from load_env import get_env
+from repository import money
+
+REORDER_DEMAND_DAYS = int(get_env("ERP_REORDER_DEMAND_DAYS", "90"))
+REORDER_LEAD_TIME_DAYS = int(get_env("ERP_REORDER_LEAD_TIME_DAYS", "7"))
+# EOQ inputs: fixed cost of placing an order, and yearly holding cost as a fraction of unit cost
+REORDER_ORDER_COST = float(get_env("ERP_REORDER_ORDER_COST", "50"))
+REORDER_HOLDING_RATE = float(get_env("ERP_REORDER_HOLDING_RATE", "0.25"))
+REORDER_BATCH_SIZE = int(get_env("ERP_REORDER_BATCH_SIZE", "10000"))
+REORDER_TIMEOUT_MS = int(get_env("ERP_REORDER_TIMEOUT_MS", "60000"))
+MAX_SHORTLIST = 200
+
+# Every inventory row with its units sold since :since. The date bound keeps the demand scan to
+# the recent stock_movements partitions (see migrations/005_monthly_partitions.sql).
+# {warehouses} is ONE_WAREHOUSE or ALL_WAREHOUSES: SQLite cannot use an index through
+# "CAST(:warehouse_id ...) IS NULL OR ...", so the condition is chosen before the query runs
+REORDER_INPUTS_SQL = """SELECT i.product_id, i.warehouse_id, i.quantity, i.reorder_point, i.unit_cost,
+       COALESCE(d.units_sold, 0) AS units_sold
+FROM inventory i
+LEFT JOIN (
+    SELECT m.product_id, m.warehouse_id, -SUM(m.quantity) AS units_sold
+    FROM stock_movements m
+    WHERE m.movement_type = 'sale' AND m.movement_date >= :since
+    GROUP BY m.product_id, m.warehouse_id
+) d ON d.product_id = i.product_id AND d.warehouse_id = i.warehouse_id
+WHERE {warehouses}"""
+ONE_WAREHOUSE = "i.warehouse_id = :warehouse_id"
+ALL_WAREHOUSES = "true"
+
+@dataclass
+class StockColumns:
+    """Inventory rows as columns, one entry per product and warehouse"""
+    product_ids: np.ndarray    # object
+    warehouse_ids: np.ndarray  # object
+    quantity: np.ndarray       # float64
+    reorder_point: np.ndarray  # float64
+    unit_cost: np.ndarray      # float64
+    units_sold: np.ndarray     # float64, over the demand window
+
+    @classmethod
+    def from_batches(cls, batches: Sequence[List[Dict[str, Any]]]) -> "StockColumns":
+        rows = [row for batch in batches for row in batch]
+        count = len(rows)
+
+        def numbers(key: str) -> np.ndarray:
+            return np.fromiter((float(row[key]) for row in rows), dtype=np.float64, count=count)
+
+        return cls(
+            product_ids=np.array([row["product_id"] for row in rows], dtype=object),
+            warehouse_ids=np.array([row["warehouse_id"] for row in rows], dtype=object),
+            quantity=numbers("quantity"),
+            reorder_point=numbers("reorder_point"),
+            unit_cost=numbers("unit_cost"),
+            units_sold=numbers("units_sold")
+        )
+
+    def __len__(self) -> int:
+        return len(self.product_ids)
+
+@dataclass
+class ReorderPlan:
+    """Computed columns, aligned with the StockColumns they came from"""
+    daily_demand: np.ndarray
+    days_of_cover: np.ndarray   # inf where nothing was sold
+    below_reorder_point: np.ndarray
+    needs_reorder: np.ndarray
+    suggested_quantity: np.ndarray
+    order_cost: np.ndarray
+    ranking: np.ndarray         # indices of the rows needing a reorder, most urgent first
+
+def plan_reorders(stock: StockColumns, demand_days: int = REORDER_DEMAND_DAYS,
+                  lead_time_days: int = REORDER_LEAD_TIME_DAYS) -> ReorderPlan:
+    """Reorder decisions for every row with whole-array operations"""
+    daily_demand = np.maximum(stock.units_sold, 0) / demand_days
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_of_cover = np.where(daily_demand > 0, np.maximum(stock.quantity, 0) / daily_demand, np.inf)
+        # EOQ = sqrt(2 * yearly demand * order cost / yearly holding cost per unit)
+        eoq = np.sqrt(np.where(
+            stock.unit_cost > 0,
+            2 * daily_demand * 365 * REORDER_ORDER_COST / (REORDER_HOLDING_RATE * stock.unit_cost),
+            0
+        ))
+    lead_time_demand = daily_demand * lead_time_days
+    below_reorder_point = stock.quantity < stock.reorder_point
+    needs_reorder = below_reorder_point | (days_of_cover < lead_time_days)
+
+    shortfall = np.maximum(stock.reorder_point - stock.quantity, 0) + lead_time_demand
+    suggested_quantity = np.where(needs_reorder, np.ceil(np.maximum(eoq, shortfall)), 0)
+    order_cost = suggested_quantity * stock.unit_cost
+
+    # Fewest days of cover first (stock-outs at 0), then the largest gap to the reorder point
+    candidates = np.flatnonzero(needs_reorder)
+    order = np.lexsort((
+        -(stock.reorder_point - stock.quantity)[candidates],
+        np.minimum(days_of_cover[candidates], np.finfo(np.float64).max)
+    ))
+    return ReorderPlan(
+        daily_demand, days_of_cover, below_reorder_point, needs_reorder,
+        suggested_quantity, order_cost, candidates[order]
+    )
+
+class ReorderEngine:
+    """Ranks products and warehouses by how urgently they need restocking"""
+    def __init__(self, database_provider: Callable[[], DatabaseBackend] = get_database):
+        self._database_provider = database_provider
+
+    @property
+    def database(self) -> DatabaseBackend:
+        return self._database_provider()
+
+    async def load_stock(self, db: DatabaseBackend, warehouse_id: Optional[str] = None,
+                         as_of: Optional[date] = None) -> StockColumns:
+        since = (as_of or date.today()) - timedelta(days=REORDER_DEMAND_DAYS)
+        batches = [
+            batch async for batch in db.stream(
+                REORDER_INPUTS_SQL.format(warehouses=ONE_WAREHOUSE if warehouse_id else ALL_WAREHOUSES),
+                {"since": since, "warehouse_id": warehouse_id}, REORDER_BATCH_SIZE
+            )
+        ]
+        return StockColumns.from_batches(batches)
+
+    async def recommend(self, warehouse_id: Optional[str] = None, limit: int = 25) -> Dict[str, Any]:
+        """The most urgent reorders with suggested quantities, plus totals over every row"""
+        limit = max(1, min(limit, MAX_SHORTLIST))
+        async with self.database.snapshot(REORDER_TIMEOUT_MS) as db:
+            stock = await self.load_stock(db, warehouse_id)
+            plan = plan_reorders(stock)
+            top = plan.ranking[:limit]
+            names = {
+                row["product_id"]: row["name"]
+                for row in await db.fetch(
+                    f"SELECT product_id, name FROM products WHERE {db.match_any('product_id', 'product_ids')}",
+                    {"product_ids": sorted(set(stock.product_ids[top].tolist()))}
+                )
+            }
+
+        shortlist = []
+        for index in top.tolist():
+            cover = plan.days_of_cover[index]
+            shortlist.append({
+                "item_id": stock.product_ids[index],
+                "name": names.get(stock.product_ids[index]),
+                "warehouse_id": stock.warehouse_ids[index],
+                "quantity": int(stock.quantity[index]),
+                "reorder_point": int(stock.reorder_point[index]),
+                "daily_demand": round(float(plan.daily_demand[index]), 2),
+                "days_of_cover": None if np.isinf(cover) else round(float(cover), 1),
+                "suggested_quantity": int(plan.suggested_quantity[index]),
+                "estimated_cost": float(money(plan.order_cost[index]))
+            })
+        return {
+            "rows_checked": len(stock),
+            "below_reorder_point": int(plan.below_reorder_point.sum()),
+            "out_of_stock": int((stock.quantity <= 0).sum()),
+            "needing_reorder": len(plan.ranking),
+            "total_estimated_cost": float(money(plan.order_cost.sum())),
+            "demand_window_days": REORDER_DEMAND_DAYS,
+            "lead_time_days": REORDER_LEAD_TIME_DAYS,
+            "shortlist": shortlist
+        }
+
+# Shared by the reorder tool
+reorder_engine = ReorderEngine()
@@ -0,0 +1,560 @@
+import time
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from database import DatabaseBackend, get_database, is_unique_violation, to_jsonable, jsonable_rows
+from dataloader import DataLoader
+from load_env import get_env
+from models import FinancialTransaction, InventoryItem, SalesOrder, EmployeeRecord, CustomerInfo
+
+DEFAULT_WAREHOUSE = get_env("ERP_DEFAULT_WAREHOUSE", "WH001")
+DEFAULT_SUPPLIER = get_env("ERP_DEFAULT_SUPPLIER", "SUP001")
+INVOICE_TERMS_DAYS = int(get_env("ERP_INVOICE_TERMS_DAYS", "30"))
+LOADER_MAX_BATCH = int(get_env("ERP_LOADER_MAX_BATCH", "500"))
+MAX_TRANSACTION_BATCH = int(get_env("ERP_MAX_TRANSACTION_BATCH", "1000"))
+IDEMPOTENCY_KEY_DAYS = int(get_env("ERP_IDEMPOTENCY_KEY_DAYS", "30"))
+
+# Date of the opening balance snapshot every account starts from
+LEDGER_EPOCH = date(1900, 1, 1)
+
+# Where every transaction ID ever posted is registered. On PostgreSQL `transactions` only
+# holds attached partitions, so IDs of archived months live on in transaction_ids
+# (see migrations/005_monthly_partitions.sql)
+TRANSACTION_ID_TABLES = {"postgres": "transaction_ids", "sqlite": "transactions"}
+
+# Employee fields the HR tools may change, mapped to their columns
+EMPLOYEE_FIELDS = {
+    "name": "name",
+    "email": "email",
+    "phone": "phone",
+    "address": "address",
+    "salary": "salary",
+    "department_id": "department_id",
+    "position_id": "position_id",
+    "is_active": "is_active"
+}
+
+# Every account's ledger balance as of :as_of: the latest closing snapshot on or before it
+# plus the transactions since (see migrations/004_ledger_balance_snapshots.sql)
+LEDGER_BALANCES_SQL = """SELECT a.account_id, a.account_name, a.account_type, a.currency,
+       COALESCE(s.closing_balance, 0) + COALESCE((
+           SELECT SUM(t.amount)
+           FROM transactions t
+           WHERE t.account_id = a.account_id
+             AND t.transaction_date > COALESCE(s.as_of_date, :epoch)
+             AND t.transaction_date <= :as_of
+       ), 0) AS balance
+FROM accounts a
+LEFT JOIN account_balance_snapshots s ON s.account_id = a.account_id AND s.as_of_date = (
+    SELECT MAX(as_of_date) FROM account_balance_snapshots
+    WHERE account_id = a.account_id AND as_of_date <= :as_of
+)"""
+
+class RepositoryError(Exception):
+    """A request the data layer refused, e.g. an unknown ID or insufficient stock"""
+
+CENT = Decimal("0.01")
+
+def money(value: Any) -> Decimal:
+    return Decimal(str(value)).quantize(CENT)
+
+def as_date(value: Any) -> Optional[date]:
+    # SQLite hands dates back as ISO strings
+    if value is None or isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def item_quantities(items: Iterable[Dict[str, int]]) -> List[Tuple[str, int]]:
+    """Flatten [{item_id: quantity}, ...] order lines into (item_id, quantity) pairs"""
+    return [(item_id, int(quantity)) for line in items for item_id, quantity in line.items()]
+
+def new_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:10].upper()}"
+
+class ERPRepository:
+    """Async data access for the ERP tools.
+
+    Every method runs against the pooled database backend, so concurrent chat sessions
+    share a bounded set of connections. Multi-statement writes run in one transaction.
+    Single-entity lookups go through DataLoaders, so lookups made in the same event-loop
+    tick (an agent fanning out, or many sessions at once) become one query.
+    """
+    def __init__(self, database_provider: Callable[[], DatabaseBackend] = get_database):
+        self._database_provider = database_provider
+        self._keys_pruned_at = float("-inf")
+        self.loaders = {
+            "customers": DataLoader("customers", self._fetch_customers, LOADER_MAX_BATCH),
+            "employees": DataLoader("employees", self._fetch_employees, LOADER_MAX_BATCH),
+            "inventory": DataLoader("inventory", self._fetch_inventory, LOADER_MAX_BATCH)
+        }
+
+    @property
+    def database(self) -> DatabaseBackend:
+        return self._database_provider()
+
+    # ===== FINANCE =====
+    async def get_account_balance(self, account_code: str, as_of: Optional[date] = None) -> Optional[Dict[str, Any]]:
+        """Ledger balance: the last closing snapshot on or before as_of plus the transactions since"""
+        row = await self.database.fetchrow(
+            LEDGER_BALANCES_SQL + """
+WHERE a.account_id = :account_id""",
+            {"account_id": account_code, "as_of": as_of or date.max, "epoch": LEDGER_EPOCH}
+        )
+        if row is None:
+            return None
+        return {
+            "account_code": row["account_id"],
+            "balance": float(money(row["balance"])),
+            "currency": row["currency"],
+            "as_of": (as_of or date.today()).isoformat()
+        }
+
+    async def record_transaction(self, transaction: FinancialTransaction) -> str:
+        """Record one transaction; a repeated idempotency key returns the original transaction_id"""
+        [result] = await self.record_transactions([transaction])
+        if result["status"] == "error":
+            raise RepositoryError(result["message"])
+        return result["transaction_id"]
+
+    async def record_transactions(self, transactions: List[FinancialTransaction],
+                                  atomic: bool = True) -> List[Dict[str, Any]]:
+        """Record many transactions in one database transaction, with a result per transaction.
+
+        Each transaction's idempotency_key (its transaction_id if unset) is checked against
+        the recent keys: a repeat is reported as a duplicate of the original instead of being
+        posted again. With atomic=True nothing is written unless every new transaction is
+        valid, so a journal entry posts whole or not at all.
+        """
+        if len(transactions) > MAX_TRANSACTION_BATCH:
+            raise RepositoryError(f"At most {MAX_TRANSACTION_BATCH} transactions can be recorded at once")
+        try:
+            results = await self._record_transactions(transactions, atomic)
+        except Exception as e:
+            if not is_unique_violation(e):
+                raise
+            # A concurrent call recorded one of the keys or IDs first; the retry reports it per transaction
+            results = await self._record_transactions(transactions, atomic)
+        await self._prune_idempotency_keys()
+        return results
+
+    async def _record_transactions(self, transactions: List[FinancialTransaction], atomic: bool) -> List[Dict[str, Any]]:
+        keys = [transaction.idempotency_key or transaction.transaction_id for transaction in transactions]
+        results: List[Dict[str, Any]] = [
+            {"transaction_id": transaction.transaction_id, "idempotency_key": key}
+            for transaction, key in zip(transactions, keys)
+        ]
+        async with self.database.transaction() as db:
+            existing = {
+                row["idempotency_key"]: row
+                for row in await db.fetch(
+                    f"""SELECT idempotency_key, transaction_id, account_id, amount, transaction_date
+FROM transaction_idempotency_keys WHERE {db.match_any("idempotency_key", "keys")}""",
+                    {"keys": keys}
+                )
+            }
+            closed_through = {
+                row["account_id"]: as_date(row["closed_through"])
+                for row in await db.fetch(
+                    f"""SELECT a.account_id,
+       (SELECT MAX(s.as_of_date) FROM account_balance_snapshots s WHERE s.account_id = a.account_id) AS closed_through
+FROM accounts a WHERE {db.match_any("a.account_id", "account_ids")}""",
+                    {"account_ids": sorted({transaction.account_code for transaction in transactions})}
+                )
+            }
+            taken = {
+                row["transaction_id"]
+                for row in await db.fetch(
+                    f"""SELECT transaction_id FROM {TRANSACTION_ID_TABLES[db.dialect]}
+WHERE {db.match_any('transaction_id', 'transaction_ids')}""",
+                    {"transaction_ids": [transaction.transaction_id for transaction in transactions]}
+                )
+            }
+
+            rows: List[Dict[str, Any]] = []
+            batch_keys: Dict[str, Dict[str, Any]] = {}
+            for transaction, key, result in zip(transactions, keys, results):
+                amount = money(transaction.amount)
+                try:
+                    transaction_date = date.fromisoformat(transaction.date)
+                except ValueError:
+                    result.update(status="error", message=f"Invalid date {transaction.date}, expected YYYY-MM-DD")
+                    continue
+                fingerprint = (transaction.account_code, amount, transaction_date)
+                previous = existing.get(key) or batch_keys.get(key)
+                if previous is not None:
+                    if (previous["account_id"], money(previous["amount"]), as_date(previous["transaction_date"])) != fingerprint:
+                        result.update(status="error", message=f"Idempotency key {key} was already used for a different transaction")
+                    else:
+                        result.update(status="duplicate", transaction_id=previous["transaction_id"])
+                    continue
+
+                if not amount:
+                    message = "Amount must not be 0"
+                elif transaction.account_code not in closed_through:
+                    message = f"Account {transaction.account_code} not found"
+                elif closed_through[transaction.account_code] is not None and transaction_date <= closed_through[transaction.account_code]:
+                    # Closed periods are summarized by snapshots, so their ledger must not change
+                    message = f"{transaction.date} falls in a closed financial period for {transaction.account_code}"
+                elif transaction.transaction_id in taken:
+                    message = f"Transaction {transaction.transaction_id} already exists"
+                else:
+                    message = None
+                if message:
+                    result.update(status="error", message=message)
+                    continue
+
+                taken.add(transaction.transaction_id)
+                row = {
+                    "idempotency_key": key,
+                    "transaction_id": transaction.transaction_id,
+                    "account_id": transaction.account_code,
+                    "amount": amount,
+                    "transaction_type": "credit" if amount > 0 else "debit",
+                    "description": transaction.description,
+                    "transaction_date": transaction_date
+                }
+                batch_keys[key] = row
+                rows.append(row)
+                result["status"] = "recorded"
+
+            failed = sum(1 for result in results if result["status"] == "error")
+            if atomic and failed:
+                for result in results:
+                    if result["status"] == "recorded":
+                        result.update(status="not_recorded", message=f"Batch not recorded: {failed} transaction(s) failed")
+                return results
+            if not rows:
+                return results
+
+            # Keys first: a concurrent call with the same key fails here, before anything is posted
+            await db.executemany(
+                """INSERT INTO transaction_idempotency_keys (idempotency_key, transaction_id, account_id, amount, transaction_date)
+VALUES (:idempotency_key, :transaction_id, :account_id, :amount, :transaction_date)""",
+                rows
+            )
+            await db.executemany(
+                """INSERT INTO transactions (transaction_id, account_id, amount, transaction_type, description, transaction_date)
+VALUES (:transaction_id, :account_id, :amount, :transaction_type, :description, :transaction_date)""",
+                rows
+            )
+            deltas: Dict[str, Decimal] = {}
+            for row in rows:
+                deltas[row["account_id"]] = deltas.get(row["account_id"], Decimal(0)) + row["amount"]
+            # Sorted so concurrent batches lock account rows in the same order
+            await db.executemany(
+                """UPDATE accounts SET balance = balance + :amount, updated_at = CURRENT_TIMESTAMP
+WHERE account_id = :account_id""",
+                [{"account_id": account_id, "amount": deltas[account_id]} for account_id in sorted(deltas)]
+            )
+        return results
+
+    async def _prune_idempotency_keys(self):
+        """Forget keys older than IDEMPOTENCY_KEY_DAYS, at most once an hour"""
+        now = time.monotonic()
+        if now - self._keys_pruned_at < 3600:
+            return
+        self._keys_pruned_at = now
+        await self.database.execute(
+            "DELETE FROM transaction_idempotency_keys WHERE created_at < :cutoff",
+            {"cutoff": date.today() - timedelta(days=IDEMPOTENCY_KEY_DAYS)}
+        )
+
+    async def create_financial_period(self, start_date: date, end_date: date) -> int:
+        row = await self.database.fetchrow(
+            """INSERT INTO financial_periods (start_date, end_date) VALUES (:start_date, :end_date)
+RETURNING period_id""",
+            {"start_date": start_date, "end_date": end_date}
+        )
+        return row["period_id"]
+
+    async def close_financial_period(self, period_id: int) -> Dict[str, Any]:
+        """Snapshot every account's closing balance at the period end and mark the period closed"""
+        async with self.database.transaction() as db:
+            if db.dialect == "postgres":
+                # Hold off new postings until the snapshots are in; SQLite's write lock does this already
+                await db.execute("LOCK TABLE transactions IN SHARE MODE")
+            period = await db.fetchrow(
+                "SELECT period_id, end_date, status FROM financial_periods WHERE period_id = :period_id",
+                {"period_id": period_id}
+            )
+            if period is None:
+                raise RepositoryError(f"Financial period {period_id} not found")
+            if period["status"] == "closed":
+                raise RepositoryError(f"Financial period {period_id} is already closed")
+            earlier = await db.fetchrow(
+                """SELECT period_id FROM financial_periods
+WHERE status != 'closed' AND end_date < :end_date
+ORDER BY end_date LIMIT 1""",
+                {"end_date": period["end_date"]}
+            )
+            if earlier is not None:
+                raise RepositoryError(f"Close financial period {earlier['period_id']} first")
+            accounts = await db.execute(
+                """INSERT INTO account_balance_snapshots (account_id, as_of_date, period_id, closing_balance)
+SELECT a.account_id, p.end_date, p.period_id,
+       COALESCE(s.closing_balance, 0) + COALESCE((
+           SELECT SUM(t.amount)
+           FROM transactions t
+           WHERE t.account_id = a.account_id
+             AND t.transaction_date > COALESCE(s.as_of_date, :epoch)
+             AND t.transaction_date <= p.end_date
+       ), 0)
+FROM financial_periods p
+CROSS JOIN accounts a
+LEFT JOIN account_balance_snapshots s ON s.account_id = a.account_id AND s.as_of_date = (
+    SELECT MAX(as_of_date) FROM account_balance_snapshots
+    WHERE account_id = a.account_id AND as_of_date <= p.end_date
+)
+WHERE p.period_id = :period_id""",
+                {"period_id": period_id, "epoch": LEDGER_EPOCH}
+            )
+            await db.execute(
+                "UPDATE financial_periods SET status = 'closed' WHERE period_id = :period_id",
+                {"period_id": period_id}
+            )
+        return {"period_id": period_id, "end_date": to_jsonable(period["end_date"]), "accounts": accounts}
+
+    # ===== INVENTORY =====
+    async def get_inventory(self, item_id: Optional[str] = None) -> List[InventoryItem]:
+        if item_id is not None:
+            return await self.loaders["inventory"].load(item_id) or []
+        rows = await self.database.fetch(
+            """SELECT i.product_id AS item_id, p.name, i.warehouse_id, i.quantity, i.reorder_point, i.unit_cost
+FROM inventory i JOIN products p ON p.product_id = i.product_id
+ORDER BY i.product_id, i.warehouse_id"""
+        )
+        return [InventoryItem(**row) for row in rows]
+
+    async def get_inventory_many(self, item_ids: List[str]) -> Dict[str, List[InventoryItem]]:
+        levels = await self.loaders["inventory"].load_many(item_ids)
+        return {item_id: items or [] for item_id, items in zip(item_ids, levels)}
+
+    async def _fetch_inventory(self, item_ids: List[str]) -> Dict[str, List[InventoryItem]]:
+        database = self.database
+        rows = await database.fetch(
+            f"""SELECT i.product_id AS item_id, p.name, i.warehouse_id, i.quantity, i.reorder_point, i.unit_cost
+FROM inventory i JOIN products p ON p.product_id = i.product_id
+WHERE {database.match_any("i.product_id", "item_ids")}
+ORDER BY i.product_id, i.warehouse_id""",
+            {"item_ids": item_ids}
+        )
+        levels: Dict[str, List[InventoryItem]] = {}
+        for row in rows:
+            levels.setdefault(row["item_id"], []).append(InventoryItem(**row))
+        return levels
+
+    async def get_inventory_value(self, warehouse_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Stock value per warehouse from the trigger-maintained warehouse_valuation summary"""
+        rows = await self.database.fetch(
+            """SELECT w.warehouse_id, w.name AS warehouse_name,
+       COALESCE(v.item_count, 0) AS item_count,
+       COALESCE(v.total_quantity, 0) AS total_quantity,
+       COALESCE(v.total_value, 0) AS total_value
+FROM warehouses w LEFT JOIN warehouse_valuation v ON v.warehouse_id = w.warehouse_id
+WHERE CAST(:warehouse_id AS VARCHAR(10)) IS NULL OR w.warehouse_id = :warehouse_id
+ORDER BY w.warehouse_id""",
+            {"warehouse_id": warehouse_id}
+        )
+        return jsonable_rows(rows)
+
+    async def reconcile_inventory_valuation(self, repair: bool = False) -> List[Dict[str, Any]]:
+        """Warehouses whose valuation summary differs from a full recompute over inventory.
+
+        With repair=True the summary is rebuilt afterwards.
+        """
+        rows = jsonable_rows(await self.database.fetch(
+            """SELECT w.warehouse_id,
+       COALESCE(v.item_count, 0) AS summary_items,
+       COALESCE(v.total_quantity, 0) AS summary_quantity,
+       COALESCE(v.total_value, 0) AS summary_value,
+       COALESCE(a.item_count, 0) AS actual_items,
+       COALESCE(a.total_quantity, 0) AS actual_quantity,
+       COALESCE(a.total_value, 0) AS actual_value
+FROM warehouses w
+LEFT JOIN warehouse_valuation v ON v.warehouse_id = w.warehouse_id
+LEFT JOIN (
+    SELECT warehouse_id, COUNT(*) AS item_count, SUM(quantity) AS total_quantity,
+           SUM(quantity * unit_cost) AS total_value
+    FROM inventory
+    GROUP BY warehouse_id
+) a ON a.warehouse_id = w.warehouse_id
+ORDER BY w.warehouse_id"""
+        ))
+        mismatches = [
+            row for row in rows
+            if row["summary_items"] != row["actual_items"]
+            or row["summary_quantity"] != row["actual_quantity"]
+            or abs(money(row["summary_value"]) - money(row["actual_value"])) >= CENT
+        ]
+        if mismatches and repair:
+            await self.refresh_inventory_valuation()
+        return mismatches
+
+    async def refresh_inventory_valuation(self):
+        """Rebuild warehouse_valuation from inventory"""
+        database = self.database
+        if database.dialect == "postgres":
+            # Takes a share lock on inventory so no write slips in between delete and rebuild
+            await database.fetch("SELECT refresh_warehouse_valuation()")
+            return
+        async with database.transaction() as db:
+            await db.execute("DELETE FROM warehouse_valuation")
+            await db.execute(
+                """INSERT INTO warehouse_valuation (warehouse_id, item_count, total_quantity, total_value)
+SELECT warehouse_id, COUNT(*), SUM(quantity), SUM(quantity * unit_cost)
+FROM inventory
+GROUP BY warehouse_id"""
+            )
+
+    async def create_purchase_order(self, items: List[Dict[str, int]], supplier_id: str = DEFAULT_SUPPLIER) -> Dict[str, Any]:
+        po_id = new_id("PO")
+        total = Decimal("0")
+        async with self.database.transaction() as db:
+            for item_id, quantity in item_quantities(items):
+                row = await db.fetchrow(
+                    """SELECT COALESCE(MAX(i.unit_cost), p.unit_price) AS unit_cost
+FROM products p LEFT JOIN inventory i ON i.product_id = p.product_id
+WHERE p.product_id = :product_id
+GROUP BY p.unit_price""",
+                    {"product_id": item_id}
+                )
+                if row is None:
+                    raise RepositoryError(f"Product {item_id} not found")
+                total += money(row["unit_cost"]) * quantity
+            await db.execute(
+                """INSERT INTO purchase_orders (po_id, supplier_id, order_date, status, total_amount)
+VALUES (:po_id, :supplier_id, :order_date, 'ordered', :total_amount)""",
+                {"po_id": po_id, "supplier_id": supplier_id, "order_date": date.today(), "total_amount": total}
+            )
+        return {"order_id": po_id, "total_amount": float(total)}
+
+    async def receive_inventory(self, purchase_order_id: str, items_received: List[Dict[str, int]],
+                                warehouse_id: str = DEFAULT_WAREHOUSE) -> int:
+        lines = item_quantities(items_received)
+        async with self.database.transaction() as db:
+            updated = await db.execute(
+                """UPDATE purchase_orders SET status = 'received', updated_at = CURRENT_TIMESTAMP
+WHERE po_id = :po_id AND status != 'received'""",
+                {"po_id": purchase_order_id}
+            )
+            if not updated:
+                raise RepositoryError(f"Purchase order {purchase_order_id} not found or already received")
+            received: Dict[str, int] = {}
+            for item_id, quantity in lines:
+                received[item_id] = received.get(item_id, 0) + quantity
+            product_ids = sorted(received)
+            rows = db.zip_lists("r", (("product_id", "product_ids", "VARCHAR"), ("quantity", "quantities", "INT")))
+            # One statement in product order, the order the sales order pipeline locks inventory
+            # rows in, so the valuation trigger only runs once every row is held
+            added = await db.execute(
+                f"""INSERT INTO inventory (product_id, warehouse_id, quantity, unit_cost)
+SELECT p.product_id, :warehouse_id, r.quantity, p.unit_price
+FROM {rows} JOIN products p ON p.product_id = r.product_id
+WHERE true
+ORDER BY p.product_id
+ON CONFLICT (product_id, warehouse_id)
+DO UPDATE SET quantity = inventory.quantity + excluded.quantity, updated_at = CURRENT_TIMESTAMP""",
+                {
+                    "product_ids": product_ids, "quantities": [received[item_id] for item_id in product_ids],
+                    "warehouse_id": warehouse_id
+                }
+            )
+            if added < len(product_ids):
+                found = {
+                    row["product_id"] for row in await db.fetch(
+                        f"SELECT product_id FROM products WHERE {db.match_any('product_id', 'product_ids')}",
+                        {"product_ids": product_ids}
+                    )
+                }
+                missing = next(item_id for item_id in product_ids if item_id not in found)
+                raise RepositoryError(f"Product {missing} not found")
+            await db.executemany(
+                """INSERT INTO stock_movements (product_id, warehouse_id, quantity, movement_type, reference_id)
+VALUES (:product_id, :warehouse_id, :quantity, 'receipt', :reference_id)""",
+                [
+                    {"product_id": item_id, "warehouse_id": warehouse_id, "quantity": quantity, "reference_id": purchase_order_id}
+                    for item_id, quantity in lines
+                ]
+            )
+        return len(lines)
+
+    # ===== SALES =====
+    async def get_customer(self, customer_id: str) -> Optional[CustomerInfo]:
+        return await self.loaders["customers"].load(customer_id)
+
+    async def get_customers(self, customer_ids: List[str]) -> List[Optional[CustomerInfo]]:
+        return await self.loaders["customers"].load_many(customer_ids)
+
+    async def _fetch_customers(self, customer_ids: List[str]) -> Dict[str, CustomerInfo]:
+        database = self.database
+        rows = await database.fetch(
+            f"""SELECT customer_id, name, email, phone, address FROM customers
+WHERE {database.match_any("customer_id", "customer_ids")}""",
+            {"customer_ids": customer_ids}
+        )
+        return {row["customer_id"]: CustomerInfo(**{key: value or "" for key, value in row.items()}) for row in rows}
+
+    async def create_sales_order(self, order: SalesOrder) -> Dict[str, Any]:
+        async with self.database.transaction() as db:
+            await db.execute(
+                """INSERT INTO sales_orders (order_id, customer_id, order_date, status)
+VALUES (:order_id, :customer_id, :order_date, :status)""",
+                {"order_id": order.order_id, "customer_id": order.customer_id, "order_date": date.today(), "status": order.status}
+            )
+            for item_id, quantity in item_quantities(order.items):
+                added = await db.execute(
+                    """INSERT INTO order_items (order_id, product_id, quantity, unit_price, line_total)
+SELECT :order_id, product_id, :quantity, unit_price, unit_price * CAST(:quantity AS INT)
+FROM products WHERE product_id = :product_id""",
+                    {"order_id": order.order_id, "product_id": item_id, "quantity": quantity}
+                )
+                if not added:
+                    raise RepositoryError(f"Product {item_id} not found")
+            row = await db.fetchrow(
+                """UPDATE sales_orders
+SET total_amount = (SELECT COALESCE(SUM(line_total), 0) FROM order_items WHERE order_id = :order_id)
+WHERE order_id = :order_id
+RETURNING total_amount""",
+                {"order_id": order.order_id}
+            )
+        return {"order_id": order.order_id, "total_amount": to_jsonable(row["total_amount"])}
+
+    # ===== HR =====
+    async def get_employee(self, employee_id: str) -> Optional[EmployeeRecord]:
+        return await self.loaders["employees"].load(employee_id)
+
+    async def get_employees(self, employee_ids: List[str]) -> List[Optional[EmployeeRecord]]:
+        return await self.loaders["employees"].load_many(employee_ids)
+
+    async def _fetch_employees(self, employee_ids: List[str]) -> Dict[str, EmployeeRecord]:
+        database = self.database
+        rows = await database.fetch(
+            f"""SELECT e.employee_id, e.name, d.name AS department, p.title AS position, e.salary
+FROM employees e
+JOIN departments d ON d.department_id = e.department_id
+JOIN positions p ON p.position_id = e.position_id
+WHERE {database.match_any("e.employee_id", "employee_ids")}""",
+            {"employee_ids": employee_ids}
+        )
+        return {row["employee_id"]: EmployeeRecord(**row) for row in rows}
+
+    async def update_employee(self, employee_id: str, field: str, value: Any) -> None:
+        column = EMPLOYEE_FIELDS.get(field)
+        if column is None:
+            raise RepositoryError(f"Field {field} cannot be updated; allowed: {', '.join(EMPLOYEE_FIELDS)}")
+        if column == "salary":
+            value = money(value)
+        # column comes from the allow-list above, never from the caller
+        updated = await self.database.execute(
+            f"UPDATE employees SET {column} = :value, updated_at = CURRENT_TIMESTAMP WHERE employee_id = :employee_id",
+            {"value": value, "employee_id": employee_id}
+        )
+        if not updated:
+            raise RepositoryError(f"Employee {employee_id} not found")
+
+    def loader_stats(self) -> Dict[str, Any]:
+        return {name: loader.stats() for name, loader in self.loaders.items()}
+
+# Shared by every tool call; the backend behind it owns the connection pool
+repository = ERPRepository()
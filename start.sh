@@ -25,6 +25,12 @@ else
     fi
 fi
 
+# Apply migrations (each one is safe to re-run)
+for migration in migrations/*.sql; do
+    echo "Applying $migration..."
+    psql -d erp -f "$migration"
+done
+
 # Ask which interface to start
 echo "Select the interface to start:"
 echo "1) Command-line interface"
@@ -1,87 +1,276 @@
-from typing import List, Dict, Optional, Any
+from datetime import date
+from database import is_unique_violation
+from typing import List, Dict, Optional, Any, Union
 from models import FinancialTransaction, InventoryItem, SalesOrder, EmployeeRecord, CustomerInfo
+from financial_reports import REPORT_TYPES, report_engine
+from job_queue import JOB_STATUSES, current_user, job_queue
+from order_pipeline import order_pipeline
+from payroll_engine import payroll_engine
+from reorder_engine import reorder_engine
+from query_catalog import writes_tables
+from repository import repository, RepositoryError, DEFAULT_WAREHOUSE, DEFAULT_SUPPLIER
+
+def _error(message: str) -> Dict[str, Any]:
+    return {"status": "error", "message": message}
+
+def _parse_date(value: str, name: str) -> date:
+    """Parse a YYYY-MM-DD argument from the model; the ValueError names the argument"""
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be YYYY-MM-DD, got {value!r}") from None
+
+def _parse_period(pay_period: str) -> date:
+    """First day of a YYYY-MM pay period"""
+    try:
+        return date.fromisoformat(f"{pay_period}-01")
+    except ValueError:
+        raise ValueError(f"pay_period must be YYYY-MM, got {pay_period!r}") from None
 
 # ===== FINANCE TOOLS =====
-def get_account_balance(account_code: str) -> Dict[str, Any]:
-    """Get current balance of a specific account"""
-    # Mock implementation
-    return {"account_code": account_code, "balance": 10000.0, "currency": "USD"}
+async def get_account_balance(account_code: str, as_of_date: Optional[str] = None) -> Dict[str, Any]:
+    """Get the balance of a specific account, currently or as of a date (YYYY-MM-DD)"""
+    try:
+        as_of = _parse_date(as_of_date, "as_of_date") if as_of_date else None
+    except ValueError as e:
+        return _error(str(e))
+    balance = await repository.get_account_balance(account_code, as_of)
+    return balance or _error(f"Account {account_code} not found")
 
-def record_transaction(transaction: FinancialTransaction) -> Dict[str, Any]:
+@writes_tables("transactions", "accounts")
+async def record_transaction(transaction: FinancialTransaction) -> Dict[str, Any]:
     """Record a financial transaction in the system"""
-    # Mock implementation
-    return {"status": "success", "transaction_id": transaction.transaction_id}
+    try:
+        transaction_id = await repository.record_transaction(transaction)
+    except RepositoryError as e:
+        return _error(str(e))
+    return {"status": "success", "transaction_id": transaction_id}
+
+@writes_tables("transactions", "accounts")
+async def record_transactions(transactions: List[FinancialTransaction], atomic: bool = True) -> Dict[str, Any]:
+    """Record several transactions at once; with atomic, all are recorded or none"""
+    try:
+        results = await repository.record_transactions(transactions, atomic)
+    except RepositoryError as e:
+        return _error(str(e))
+    counts: Dict[str, int] = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    if not counts.get("error"):
+        status = "success"
+    elif counts.get("recorded") or counts.get("duplicate"):
+        status = "partial"
+    else:
+        status = "error"
+    return {"status": status, "counts": counts, "results": results}
 
-def generate_financial_report(report_type: str, start_date: str, end_date: str) -> str:
-    """Generate financial reports (income statement, balance sheet, cash flow)"""
-    # Mock implementation
-    return f"Financial report of type {report_type} for period {start_date} to {end_date} generated"
+@writes_tables("financial_periods")
+async def create_financial_period(start_date: str, end_date: str) -> Dict[str, Any]:
+    """Open a new financial period (dates as YYYY-MM-DD)"""
+    try:
+        start, end = _parse_date(start_date, "start_date"), _parse_date(end_date, "end_date")
+    except ValueError as e:
+        return _error(str(e))
+    period_id = await repository.create_financial_period(start, end)
+    return {"status": "success", "period_id": period_id, "start_date": start_date, "end_date": end_date}
+
+@writes_tables("financial_periods", "account_balance_snapshots")
+async def close_financial_period(period_id: int) -> Dict[str, Any]:
+    """Close a financial period, recording every account's closing balance"""
+    try:
+        closed = await repository.close_financial_period(period_id)
+    except RepositoryError as e:
+        return _error(str(e))
+    return {"status": "success", **closed, "message": "Financial period closed"}
+
+async def generate_financial_report(report_type: str, start_date: str, end_date: str) -> Union[str, Dict[str, Any]]:
+    """Generate financial reports (income_statement, balance_sheet, cash_flow) for a period (YYYY-MM-DD)"""
+    try:
+        start, end = _parse_date(start_date, "start_date"), _parse_date(end_date, "end_date")
+    except ValueError as e:
+        return _error(str(e))
+    try:
+        return await report_engine.generate_report(report_type, start, end)
+    except RepositoryError as e:
+        return _error(str(e))
 
 # ===== INVENTORY TOOLS =====
-def check_inventory_levels(item_id: Optional[str] = None) -> List[InventoryItem]:
-    """Get inventory levels, optionally filtered by item_id"""
-    # Mock implementation
-    items = [
-        InventoryItem(item_id="ITM001", name="Laptop", quantity=15, reorder_point=10, unit_cost=1200.0),
-        InventoryItem(item_id="ITM002", name="Mouse", quantity=5, reorder_point=20, unit_cost=25.0)
-    ]
-    if item_id:
-        return [item for item in items if item.item_id == item_id]
-    return items
+async def check_inventory_levels(item_id: Optional[str] = None) -> List[InventoryItem]:
+    """Get inventory levels per warehouse, optionally filtered by item_id"""
+    return await repository.get_inventory(item_id)
 
-def create_purchase_order(items: List[Dict[str, int]]) -> Dict[str, Any]:
+async def check_inventory_levels_bulk(item_ids: List[str]) -> Dict[str, List[InventoryItem]]:
+    """Get inventory levels per warehouse for several items at once"""
+    return await repository.get_inventory_many(item_ids)
+
+async def get_reorder_recommendations(warehouse_id: Optional[str] = None, limit: int = 25) -> Dict[str, Any]:
+    """Rank the items most in need of reordering, with days of cover and suggested quantities"""
+    return await reorder_engine.recommend(warehouse_id, limit)
+
+async def get_inventory_value(warehouse_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Get the total stock value per warehouse, optionally for one warehouse"""
+    return await repository.get_inventory_value(warehouse_id)
+
+@writes_tables("purchase_orders")
+async def create_purchase_order(items: List[Dict[str, int]], supplier_id: str = DEFAULT_SUPPLIER) -> Dict[str, Any]:
     """Create a purchase order for specified items and quantities"""
-    # Mock implementation
-    order_id = "PO-12345"
-    return {"status": "success", "order_id": order_id, "message": "Purchase order created successfully"}
+    try:
+        order = await repository.create_purchase_order(items, supplier_id)
+    except RepositoryError as e:
+        return _error(str(e))
+    return {"status": "success", **order, "message": "Purchase order created successfully"}
 
-def receive_inventory(purchase_order_id: str, items_received: List[Dict[str, int]]) -> Dict[str, Any]:
+@writes_tables("inventory", "stock_movements", "purchase_orders")
+async def receive_inventory(purchase_order_id: str, items_received: List[Dict[str, int]],
+                            warehouse_id: str = DEFAULT_WAREHOUSE) -> Dict[str, Any]:
     """Record receipt of inventory against a purchase order"""
-    # Mock implementation
+    try:
+        await repository.receive_inventory(purchase_order_id, items_received, warehouse_id)
+    except RepositoryError as e:
+        return _error(str(e))
     return {"status": "success", "purchase_order_id": purchase_order_id, "message": "Inventory received"}
 
 # ===== SALES TOOLS =====
-def get_customer_info(customer_id: str) -> CustomerInfo:
+async def get_customer_info(customer_id: str) -> Union[CustomerInfo, Dict[str, Any]]:
     """Retrieve customer information by ID"""
-    # Mock implementation
-    return CustomerInfo(
-        customer_id=customer_id,
-        name="Acme Corp",
-        email="contact@acmecorp.com",
-        phone="555-123-4567",
-        address="123 Business St, Commerce City"
-    )
+    customer = await repository.get_customer(customer_id)
+    return customer or _error(f"Customer {customer_id} not found")
+
+async def get_customers(customer_ids: List[str]) -> List[Union[CustomerInfo, Dict[str, Any]]]:
+    """Retrieve information for several customers by ID"""
+    customers = await repository.get_customers(customer_ids)
+    return [
+        customer or _error(f"Customer {customer_id} not found")
+        for customer_id, customer in zip(customer_ids, customers)
+    ]
 
-def create_sales_order(order: SalesOrder) -> Dict[str, Any]:
+@writes_tables("sales_orders", "order_items")
+async def create_sales_order(order: SalesOrder) -> Dict[str, Any]:
     """Create a new sales order in the system"""
-    # Mock implementation
-    return {"status": "success", "order_id": order.order_id, "message": "Sales order created successfully"}
+    try:
+        created = await repository.create_sales_order(order)
+    except RepositoryError as e:
+        return _error(str(e))
+    return {"status": "success", **created, "message": "Sales order created successfully"}
 
-def process_sales_order(order_id: str) -> Dict[str, Any]:
+@writes_tables("sales_orders", "inventory", "stock_movements", "invoices")
+async def process_sales_order(order_id: str) -> Dict[str, Any]:
     """Process a sales order (check inventory, reserve items, generate invoice)"""
-    # Mock implementation
-    return {"status": "success", "order_id": order_id, "message": "Order processed successfully"}
+    try:
+        [outcome] = await order_pipeline.process_orders([order_id])
+    except RepositoryError as e:
+        return _error(str(e))
+    if outcome["status"] != "processed":
+        return _error(outcome["message"])
+    return {"status": "success", **outcome, "message": "Order processed successfully"}
+
+@writes_tables("sales_orders", "inventory", "stock_movements", "invoices")
+async def process_sales_orders(order_ids: Optional[List[str]] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+    """Process several sales orders in one batch, or up to limit of the oldest pending ones"""
+    try:
+        outcomes = await order_pipeline.process_orders(order_ids, limit)
+    except RepositoryError as e:
+        return _error(str(e))
+    counts: Dict[str, int] = {}
+    for outcome in outcomes:
+        counts[outcome["status"]] = counts.get(outcome["status"], 0) + 1
+    return {"status": "success", "counts": counts, "orders": outcomes}
 
 # ===== HR TOOLS =====
-def get_employee_data(employee_id: str) -> EmployeeRecord:
+async def get_employee_data(employee_id: str) -> Union[EmployeeRecord, Dict[str, Any]]:
     """Retrieve employee data by ID"""
-    # Mock implementation
-    return EmployeeRecord(
-        employee_id=employee_id,
-        name="John Doe",
-        department="IT",
-        position="Developer",
-        salary=85000.0
-    )
+    employee = await repository.get_employee(employee_id)
+    return employee or _error(f"Employee {employee_id} not found")
+
+async def get_employees(employee_ids: List[str]) -> List[Union[EmployeeRecord, Dict[str, Any]]]:
+    """Retrieve data for several employees by ID"""
+    employees = await repository.get_employees(employee_ids)
+    return [
+        employee or _error(f"Employee {employee_id} not found")
+        for employee_id, employee in zip(employee_ids, employees)
+    ]
 
-def update_employee_info(employee_id: str, field: str, value: Any) -> Dict[str, Any]:
+@writes_tables("employees")
+async def update_employee_info(employee_id: str, field: str, value: Any) -> Dict[str, Any]:
     """Update a specific field of employee information"""
-    # Mock implementation
+    try:
+        await repository.update_employee(employee_id, field, value)
+    except RepositoryError as e:
+        return _error(str(e))
     return {"status": "success", "employee_id": employee_id, "message": f"Updated {field} successfully"}
 
-def process_payroll(department: Optional[str] = None) -> Dict[str, Any]:
-    """Process payroll for all employees or a specific department"""
-    # Mock implementation
+@writes_tables("payroll")
+async def process_payroll(department: Optional[str] = None, pay_period: Optional[str] = None) -> Dict[str, Any]:
+    """Process payroll for all employees or a specific department, for this month or pay_period (YYYY-MM)"""
+    try:
+        period_start = _parse_period(pay_period) if pay_period else None
+    except ValueError as e:
+        return _error(str(e))
+    try:
+        result = await payroll_engine.run_payroll(department, period_start)
+    except Exception as e:
+        if not is_unique_violation(e):
+            raise
+        # A concurrent run paid some of the same employees first and its rows won
+        period = (period_start or date.today()).strftime("%Y-%m")
+        return _error(f"Payroll for {period} is already being processed or was already paid")
     if department:
-        return {"status": "success", "message": f"Payroll processed for department: {department}"}
-    return {"status": "success", "message": "Payroll processed for all employees"} 
\ No newline at end of file
+        return {"status": "success", **result, "message": f"Payroll processed for department: {department}"}
+    return {"status": "success", **result, "message": "Payroll processed for all employees"}
+
+# ===== JOB TOOLS =====
+async def start_payroll_job(department: Optional[str] = None, pay_period: Optional[str] = None) -> Dict[str, Any]:
+    """Run payroll in the background for all employees or a department, for this month or pay_period (YYYY-MM)"""
+    try:
+        period_start = _parse_period(pay_period) if pay_period else date.today().replace(day=1)
+    except ValueError as e:
+        return _error(str(e))
+    job = await job_queue.submit(
+        "payroll", {"department": department, "period_start": period_start.isoformat()}, current_user.get()
+    )
+    return {"status": "success", "job": job, "message": f"Payroll job {job['job_id']} is {job['status']}"}
+
+async def start_report_job(report_type: str, start_date: str, end_date: str) -> Dict[str, Any]:
+    """Generate a financial report (income_statement, balance_sheet, cash_flow) in the background"""
+    if report_type not in REPORT_TYPES:
+        return _error(f"Unknown report type {report_type}, expected one of {', '.join(REPORT_TYPES)}")
+    try:
+        start, end = _parse_date(start_date, "start_date"), _parse_date(end_date, "end_date")
+    except ValueError as e:
+        return _error(str(e))
+    if end < start:
+        return _error("end_date must not be before start_date")
+    job = await job_queue.submit(
+        "financial_report", {"report_type": report_type, "start_date": start_date, "end_date": end_date}, current_user.get()
+    )
+    return {"status": "success", "job": job, "message": f"Report job {job['job_id']} is {job['status']}"}
+
+async def start_order_processing_job(limit: Optional[int] = None) -> Dict[str, Any]:
+    """Process every pending sales order in the background, or up to limit of the oldest"""
+    if limit is not None and limit < 1:
+        return _error("limit must be at least 1")
+    job = await job_queue.submit("process_orders", {"limit": limit}, current_user.get())
+    return {"status": "success", "job": job, "message": f"Order processing job {job['job_id']} is {job['status']}"}
+
+async def get_job_status(job_id: str) -> Dict[str, Any]:
+    """Get the status, progress and, once finished, the result of one of the current user's background jobs"""
+    job = await job_queue.get(job_id, current_user.get())
+    return {"status": "success", "job": job} if job else _error(f"Job {job_id} not found")
+
+async def list_jobs(status: Optional[str] = None, limit: int = 20) -> Dict[str, Any]:
+    """List the current user's most recent background jobs, optionally with one status"""
+    if status is not None and status not in JOB_STATUSES:
+        return _error(f"Unknown job status {status}, expected one of {', '.join(JOB_STATUSES)}")
+    try:
+        jobs = await job_queue.list(current_user.get(), status, limit)
+    except RepositoryError as e:
+        return _error(str(e))
+    return {"status": "success", "jobs": jobs}
+
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    """Cancel one of the current user's background jobs that has not started yet"""
+    try:
+        job = await job_queue.cancel(job_id, current_user.get())
+    except RepositoryError as e:
+        return _error(str(e))
+    return {"status": "success", "job": job, "message": f"Job {job_id} cancelled"}